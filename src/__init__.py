@@ -32,6 +32,8 @@ from stickers_blender.common.version1_0_1.get_set_pops import (
     set_transparency,
       
 )
+from stickers_blender.common.version1_0_1.sticker_registry import StickerRegistryEntry
+from stickers_blender.common.version1_0_1.profiling import enable_profiling
 
 
 bl_info = {
@@ -62,7 +64,10 @@ _addon_properties = {
         "ScaleY": bpy.props.FloatProperty(options = {"ANIMATABLE"}, default = 1.0),
         "Rotate": bpy.props.IntProperty(options = {"ANIMATABLE"}, default = 1),
         
-    }   
+    },
+    bpy.types.Scene: {
+        "sticker_registry": bpy.props.CollectionProperty(type = StickerRegistryEntry),
+    },
 }
 
 
@@ -73,6 +78,11 @@ def register():
     auto_load.register()
     add_properties(_addon_properties)
 
+    # the profiling preference saved enabled
+    addon = bpy.context.preferences.addons.get(__addon_name__)
+    if addon is not None and addon.preferences.use_profiling:
+        enable_profiling(addon.preferences.profile_trace_file)
+
     print("{} addon is installed.".format(bl_info["name"]))
 
 
@@ -0,0 +1,282 @@
+"""
+[Blender and Python] Headless batch runner for Stickers Antaruxa
+Juan R Nouche - January 2025
+Email: juan.nouche@antaruxa.com
+Applies a sticker manifest to many .blend files without UI, using a
+pool of background Blender processes
+Antaruxa Stickers - Blender python headless batch runner
+Copyright (c) 2025 Antaruxa
+--------
+
+Usage (everything after -- belongs to the runner):
+
+    blender --background --python batch_runner.py -- \\
+        --manifest stickers.json --report-dir reports --workers 4 \\
+        shot_010.blend shot_020.blend ...
+
+The blend files can also be given in a text file, one per line, with
+--files-list. The runner starts one background Blender per file (at most
+--workers at the same time). Each worker opens its file, applies the
+manifest (create, update and remove actions, see sticker_batch) with the
+same code as the add-on operators, saves the file and writes
+<report-dir>/<file name>_<path hash>.json with its timings and errors
+(the hash keeps apart the files with the same name). A summary of
+all the files is written in <report-dir>/summary.json.
+
+Manifest entries with a "file" key are only applied to the blend file
+with that name.
+"""
+
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import importlib
+import importlib.util
+import subprocess
+import traceback
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+
+# == GLOBAL VARIABLES
+
+# the package name the add-on modules import each other with
+ADDON_PACKAGE = "stickers_blender"
+
+
+# ==== INTERNAL FUNCTIONS (AUX)
+
+def _runner_args(argv):
+    """Gets the runner arguments, the ones after -- when launched by blender
+    """
+    if "--" in argv:
+        return argv[argv.index("--") + 1:]
+    return argv[1:]
+
+
+def _parse_args(args):
+    parser = argparse.ArgumentParser(description = "Apply a sticker manifest to many .blend files")
+    parser.add_argument("files", nargs = "*", help = ".blend files to process")
+    parser.add_argument("--files-list", help = "text file with a .blend path per line")
+    parser.add_argument("--manifest", required = True, help = "JSON or CSV sticker manifest")
+    parser.add_argument("--report-dir", default = "sticker_reports", help = "folder for the JSON reports")
+    parser.add_argument("--workers", type = int, default = os.cpu_count() or 1,
+                        help = "number of Blender processes working at the same time")
+    parser.add_argument("--blender", help = "blender binary, the running one by default")
+    parser.add_argument("--timeout", type = float, default = None, help = "max seconds per file")
+    parser.add_argument("--no-save", action = "store_true", help = "don't save the processed files")
+    parser.add_argument("--image-cache-dir", help = "shared image cache folder, the images are packed if not given")
+    # internal, used by the processes launched by the runner
+    parser.add_argument("--worker", help = argparse.SUPPRESS)
+    return parser.parse_args(args)
+
+
+def _report_path(report_dir, blend_file):
+    """Gets the report file of a blend file, the hash of its full path keeps
+    apart the files with the same name in different folders
+    """
+    path_hash = hashlib.sha1(os.path.abspath(blend_file).encode("utf-8")).hexdigest()[:10]
+    return os.path.join(report_dir, f"{Path(blend_file).stem}_{path_hash}.json")
+
+
+def _write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent = 2)
+
+
+def _enable_addon():
+    """Makes sure the add-on is registered in the worker Blender
+    """
+    import bpy
+
+    if hasattr(bpy.types.Scene, "sticker_registry"):
+        return
+    # the add-on root is the package containing addons/ and common/, its
+    # __init__ is the add-on entry point. Its modules import each other as
+    # stickers_blender.*, whatever the name of its folder (src in a checkout)
+    root = Path(__file__).resolve().parents[2]
+    try:
+        addon = importlib.import_module(ADDON_PACKAGE)
+    except ImportError:
+        spec = importlib.util.spec_from_file_location(ADDON_PACKAGE, root / "__init__.py",
+                                                      submodule_search_locations = [str(root)])
+        addon = importlib.util.module_from_spec(spec)
+        sys.modules[ADDON_PACKAGE] = addon
+        spec.loader.exec_module(addon)
+    addon.register()
+
+
+# ==== WORKER
+
+def run_worker(blend_file, manifest, report_file, save = True, image_cache_dir = None):
+    """Opens a blend file, applies the manifest and saves it. Runs inside
+    a background Blender
+    blend_file      -- the .blend file to process
+    manifest        -- the JSON or CSV sticker manifest
+    report_file     -- where the JSON report of this file is written
+    save            -- if False the file is not saved
+    image_cache_dir -- shared image cache folder, None to pack the images
+    returns:
+    the report dict
+    """
+    import bpy
+
+    report = {"file": blend_file, "status": "OK", "timings": {}, "results": [], "errors": []}
+    timings = report["timings"]
+    start = time.perf_counter()
+
+    try:
+        _enable_addon()
+        from stickers_blender.common.version1_0_1.sticker_batch import (
+            read_sticker_manifest,
+            apply_sticker_manifest,
+        )
+
+        step = time.perf_counter()
+        bpy.ops.wm.open_mainfile(filepath = blend_file)
+        timings["open"] = time.perf_counter() - step
+
+        name = os.path.basename(blend_file)
+        entries = [entry for entry in read_sticker_manifest(manifest)
+                   if entry.get("file") in (None, name)]
+
+        step = time.perf_counter()
+        for sticker_name, action, error in apply_sticker_manifest(entries, image_cache_dir):
+            report["results"].append({"name": sticker_name, "action": action, "error": error})
+            if error is not None:
+                report["errors"].append(f"{action} {sticker_name}: {error}")
+        timings["stickers"] = time.perf_counter() - step
+
+        if save:
+            step = time.perf_counter()
+            bpy.ops.wm.save_mainfile()
+            timings["save"] = time.perf_counter() - step
+
+        if report["errors"]:
+            report["status"] = "ERRORS"
+    except Exception:
+        report["status"] = "FAILED"
+        report["errors"].append(traceback.format_exc())
+
+    timings["total"] = time.perf_counter() - start
+    _write_json(report_file, report)
+    return report
+
+
+# ==== COORDINATOR
+
+def process_file(blender, blend_file, manifest, report_dir, save = True, timeout = None, image_cache_dir = None):
+    """Launches a background Blender worker for one file and waits for it
+    blender         -- the blender binary
+    blend_file      -- the .blend file to process
+    manifest        -- the JSON or CSV sticker manifest
+    report_dir      -- folder for the JSON reports
+    save            -- if False the file is not saved
+    timeout         -- max seconds for the worker, None to wait forever
+    image_cache_dir -- shared image cache folder, None to pack the images
+    returns:
+    the report dict written by the worker (or one describing the failure)
+    """
+    report_file = _report_path(report_dir, blend_file)
+    # a report left by an earlier run must not pass for this one
+    if os.path.isfile(report_file):
+        os.remove(report_file)
+    command = [blender, "--background", "--python", os.path.abspath(__file__), "--",
+               "--worker", blend_file, "--manifest", manifest, "--report-dir", report_dir]
+    if not save:
+        command.append("--no-save")
+    if image_cache_dir:
+        command += ["--image-cache-dir", image_cache_dir]
+
+    start = time.perf_counter()
+    try:
+        process = subprocess.run(command, capture_output = True, text = True, timeout = timeout)
+        output = process.stdout[-4000:] + process.stderr[-4000:]
+    except subprocess.TimeoutExpired:
+        output = f"timeout after {timeout} seconds"
+
+    if os.path.isfile(report_file):
+        with open(report_file) as f:
+            return json.load(f)
+
+    # the worker died before writing its report
+    report = {"file": blend_file, "status": "FAILED", "results": [],
+              "timings": {"total": time.perf_counter() - start}, "errors": [output]}
+    _write_json(report_file, report)
+    return report
+
+
+def run_batch(blend_files, manifest, report_dir, workers = 1, blender = None, save = True, timeout = None, image_cache_dir = None):
+    """Applies a manifest to many blend files with a pool of Blender processes
+    blend_files     -- list of .blend files
+    manifest        -- the JSON or CSV sticker manifest
+    report_dir      -- folder for the JSON reports
+    workers         -- how many Blender processes work at the same time
+    blender         -- the blender binary, the running one if None
+    save            -- if False the files are not saved
+    timeout         -- max seconds per file, None to wait forever
+    image_cache_dir -- shared image cache folder, None to pack the images
+    returns:
+    the summary dict (also written in report_dir/summary.json)
+    """
+    if blender is None:
+        import bpy
+        blender = bpy.app.binary_path
+
+    os.makedirs(report_dir, exist_ok = True)
+    manifest = os.path.abspath(manifest)
+    blend_files = [os.path.abspath(blend_file) for blend_file in blend_files]
+    if image_cache_dir:
+        image_cache_dir = os.path.abspath(image_cache_dir)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = max(1, workers)) as pool:
+        reports = list(pool.map(
+            lambda blend_file: process_file(blender, blend_file, manifest, report_dir, save, timeout, image_cache_dir),
+            blend_files))
+
+    summary = {
+        "manifest": manifest,
+        "workers": workers,
+        "total_time": time.perf_counter() - start,
+        "files": [{"file": report["file"], "status": report["status"],
+                   "time": report["timings"].get("total"), "errors": len(report["errors"])}
+                  for report in reports],
+    }
+    _write_json(os.path.join(report_dir, "summary.json"), summary)
+    return summary
+
+
+def main(argv = None):
+    args = _parse_args(_runner_args(sys.argv if argv is None else argv))
+
+    if args.worker:
+        os.makedirs(args.report_dir, exist_ok = True)
+        report = run_worker(args.worker, args.manifest,
+                            _report_path(args.report_dir, args.worker), not args.no_save,
+                            args.image_cache_dir)
+        return 0 if report["status"] != "FAILED" else 1
+
+    blend_files = list(args.files)
+    if args.files_list:
+        with open(args.files_list) as f:
+            blend_files += [line.strip() for line in f if line.strip()]
+    if not blend_files:
+        print("No .blend files to process")
+        return 1
+
+    summary = run_batch(blend_files, args.manifest, args.report_dir,
+                        args.workers, args.blender, not args.no_save, args.timeout,
+                        args.image_cache_dir)
+    for item in summary["files"]:
+        print(f"{item['status']:7} {item['file']} ({item['errors']} errors)")
+    failed = [item for item in summary["files"] if item["status"] == "FAILED"]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
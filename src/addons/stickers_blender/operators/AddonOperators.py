@@ -23,12 +23,15 @@ from stickers_blender.addons.stickers_blender.preference.AddonPreferences import
 
 from stickers_blender.common.version1_0_1.sticker_class import (
     Sticker,
+    remove_sticker,
+    remove_stickers,
     NO_VERTEX_SELECTED,
     NO_MESH_SELECTED,
-    NO_EDITMODE,
     MORE_THAN_1_VTX_SELECTED,
     MORE_THAN_1_OBJ_SELECTED,
     SEL_SHOULD_BE_A_MESH,
+    STICKER_NOT_FOUND,
+    STICKER_NOT_CREATED,
     ALL_DONE,
 )
 
@@ -36,17 +39,131 @@ from stickers_blender.common.version1_0_1.sticker_funcs import (
     is_valid_image_extension,
     is_valid_image_imghdr,
     check_if_sticker_name_exists,
+    get_unique_sticker_name,
+    share_base_node_meshes,
+    get_sticker_collection,
+    show_sticker_collection,
+    is_sticker_collection_shown,
+    collect_sticker_helpers,
+)
+from stickers_blender.common.version1_0_1.raycast_funcs import raycast_object_surface
+from stickers_blender.common.version1_0_1.image_funcs import (
+    deduplicate_images,
+    get_image_sharing_report,
+    pack_sticker_images,
+)
+from stickers_blender.common.version1_0_1.sequence_validation import SequenceValidation
+from stickers_blender.common.version1_0_1.proxy_funcs import (
+    PROXY_FACTORS,
+    ProxyBuild,
+    get_sticker_image_nodes,
+    get_proxy_jobs,
+    assign_proxies,
+    clear_proxies,
+)
+from stickers_blender.common.version1_0_1.memory_funcs import (
+    get_sticker_memory_report,
+    fit_sticker_images_to_budget,
+)
+from stickers_blender.common.version1_0_1.sticker_registry import (
+    get_sticker,
+    find_stickers,
+)
+from stickers_blender.common.version1_0_1.surface_binding import (
+    bake_surface_bindings,
+    clear_surface_binding_cache,
+)
+from stickers_blender.common.version1_0_1.sticker_batch import (
+    read_sticker_manifest,
+    create_stickers_from_manifest,
 )
 from stickers_blender.common.version1_0_1.material_funcs import (
     check_image_file_sequence,
-    disconnect_sticker_material,
-    remove_all_the_nodes_from_sticker, 
     check_if_is_the_downmost,
     check_if_is_the_topmost,
     interchange_sticker_connections_and_positions,
+    move_sticker_to_position,
     get_all_shader_nodes_from_a_sticker,
     
 )
+from stickers_blender.common.version1_0_1.profiling import (
+    is_profiling_enabled,
+    write_profile_trace,
+)
+
+
+def report_sticker_profile(operator):
+    """Writes the trace of the stages timed by the operator and shows their
+    summary in the Info editor, if the profiling is enabled
+    operator -- the operator reporting
+    """
+    if not is_profiling_enabled():
+        return
+    try:
+        filepath, summary = write_profile_trace()
+    except OSError as error:
+        operator.report({'WARNING'}, f"Can't write the profile trace: {error}")
+        return
+    operator.report({'INFO'}, f"{summary} Trace: {filepath}")
+
+
+def get_sticker_options(addon_prefs):
+    """Gets the sticker creation options set in the add-on preferences
+    addon_prefs -- the add-on preferences
+    returns:
+    dict with the keyword arguments of Sticker.set_options
+    """
+    return {
+        "use_atlas": addon_prefs.use_atlas,
+        "use_sprite_sheet": addon_prefs.use_sprite_sheet,
+        "use_driver_free": addon_prefs.use_driver_free,
+        "use_surface_binding": addon_prefs.use_surface_binding,
+        "use_rigged": addon_prefs.use_rigged,
+        "image_cache_dir": addon_prefs.image_cache_dir or None,
+        "use_alpha_trim": addon_prefs.use_alpha_trim,
+        "trim_cache_dir": addon_prefs.trim_cache_dir,
+        "use_lean_rig": addon_prefs.use_lean_rig,
+    }
+
+
+def check_sticker_image_settings(addon_prefs, check_files = True):
+    """Checks the image settings of the add-on preferences before creating stickers
+    addon_prefs -- the add-on preferences
+    check_files -- if False the image header and the sequence files are not
+                   checked (SequenceValidation does it in background)
+    returns:
+    error          -- None if the settings are valid else a string with the error
+    img_offset     -- the number of images in the sequence (None for a still image)
+    img_firstframe -- the number of the first image (None for a still image)
+    """
+    img_filename = bpy.path.abspath(addon_prefs.img_filename)
+    is_seq = addon_prefs.is_image_sequence
+    is_control_anim = addon_prefs.is_anim_select
+
+    if  not os.path.exists(img_filename):
+        return f"The filename {img_filename} does not exist. Check the filename.", None, None
+
+    if not is_valid_image_extension(img_filename):
+        return "Selected image must have this extension: .png.", None, None
+
+    if is_seq and is_control_anim:
+        return "You can't select only one of these: Image Sequence or Controlled Anim.", None, None
+
+    if not check_files:
+        return None, None, None
+
+    if not is_valid_image_imghdr(img_filename):
+        return "The selected file is not an image or is corrupted.", None, None
+    
+    if is_seq or is_control_anim:
+        img_offset, img_firstframe, consecutive = check_image_file_sequence(img_filename)
+        if not img_offset:
+            return "Can't detect an Image Sequence. Check the File Name.", None, None
+        if not consecutive:
+            return "The images in the sequence must have consecutive numbers. Check image numbers.", None, None
+        return None, img_offset, img_firstframe
+
+    return None, None, None
 
 
 class AddNewSticker(bpy.types.Operator):
@@ -68,56 +185,94 @@ class AddNewSticker(bpy.types.Operator):
 
         addon_prefs = bpy.context.preferences.addons[__addon_name__].preferences
         assert isinstance(addon_prefs, StickerPreferences)        
+
+        error, img_offset, img_firstframe = check_sticker_image_settings(addon_prefs)
+        if error is not None:
+            self.report({'ERROR'}, error)
+            return{'CANCELLED'}
+
+        return self.create_sticker(addon_prefs, img_offset, img_firstframe)
+
+    def invoke(self, context, event):
+
+        addon_prefs = bpy.context.preferences.addons[__addon_name__].preferences
+        assert isinstance(addon_prefs, StickerPreferences)        
+
+        if not (addon_prefs.is_image_sequence or addon_prefs.is_anim_select):
+            return self.execute(context)
+
+        # the sequence frames are checked in background, Blender keeps responding
+        error, img_offset, img_firstframe = check_sticker_image_settings(addon_prefs, check_files = False)
+        if error is not None:
+            self.report({'ERROR'}, error)
+            return{'CANCELLED'}
+
+        if check_if_sticker_name_exists(addon_prefs.sticker_name):
+            self.report({'ERROR'}, "There is a sticker with this name yet. Write other name")
+            return{'CANCELLED'}            
+
+        self.validation = SequenceValidation(bpy.path.abspath(addon_prefs.img_filename))
+
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.1, window = context.window)
+        wm.progress_begin(0, 100)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+
+        validation = self.validation
+
+        if event.type == 'ESC':
+            validation.cancel()
+            self.end_validation(context)
+            self.report({'WARNING'}, "Sticker creation cancelled.")
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        if not validation.done:
+            context.window_manager.progress_update(int(validation.progress * 100))
+            context.workspace.status_text_set(
+                f"Checking the sequence frames: {validation.checked}/{validation.total or '?'} (Esc to cancel)")
+            return {'RUNNING_MODAL'}
+
+        self.end_validation(context)
+
+        error = validation.get_error_message()
+        if error is not None:
+            self.report({'ERROR'}, error)
+            return {'CANCELLED'}
+
+        addon_prefs = bpy.context.preferences.addons[__addon_name__].preferences
+        return self.create_sticker(addon_prefs, validation.scan["count"], validation.scan["first"])
+
+    def end_validation(self, context):
+
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+
+    def create_sticker(self, addon_prefs, img_offset, img_firstframe):
         
         stickername = addon_prefs.sticker_name 
         img_filename = bpy.path.abspath(addon_prefs.img_filename)
         is_seq = addon_prefs.is_image_sequence
         is_control_anim = addon_prefs.is_anim_select
-        img_offset = None
-        img_firstframe = None
-        
-    
-        if  not os.path.exists(img_filename):
-            self.report({'ERROR'}, f"The filename {img_filename} does not exist. Check the filename.")
-            return{'CANCELLED'}
 
-        if not is_valid_image_extension(img_filename):
-            self.report({'ERROR'}, "Selected image must have this extension: .png.")
-            return{'CANCELLED'}
-
-        if not is_valid_image_imghdr(img_filename):
-            self.report({'ERROR'}, "The selected file is not an image or is corrupted.")
-            return{'CANCELLED'}
-        
-        if is_seq and is_control_anim:
-            self.report({'ERROR'}, "You can't select only one of these: Image Sequence or Controlled Anim.")
-            return{'CANCELLED'}
-        
-        if is_seq or is_control_anim:
-            img_offset, img_firstframe, consecutive = check_image_file_sequence(img_filename)
-            if not img_offset:
-                self.report({'ERROR'}, "Can't detect an Image Sequence. Check the File Name.")
-                return{'CANCELLED'}
-            if not consecutive:
-                self.report({'ERROR'}, "The images in the sequence must have consecutive numbers. Check image numbers.")
-                return{'CANCELLED'}
-                
-            
-        
         if check_if_sticker_name_exists(stickername):
             self.report({'ERROR'}, "There is a sticker with this name yet. Write other name")
             return{'CANCELLED'}            
         
-        result=self.sticker.create_sticker(stickername, img_filename, is_seq, is_control_anim, img_offset, img_firstframe)
+        result=self.sticker.create_sticker(stickername, img_filename, is_seq, is_control_anim, img_offset, img_firstframe, **get_sticker_options(addon_prefs))
         
         if result == MORE_THAN_1_OBJ_SELECTED: 
             self.report({'ERROR'}, "More than one object selected, you need to select only one.")  
             return {'CANCELLED'}
         elif result == NO_MESH_SELECTED: 
-            self.report({'ERROR'}, "No MESH selected, you need to select one, switch to edit mode and select only one vertex.")  
-            return {'CANCELLED'}
-        elif result == NO_EDITMODE:
-            self.report({'ERROR'}, "You need to switch to Edit Mode and select one vertex.")  
+            self.report({'ERROR'}, "No MESH selected, you need to select one and only one of its vertices.")  
             return {'CANCELLED'}
         elif result == NO_VERTEX_SELECTED:
             self.report({'ERROR'}, "Must select one vertex.")  
@@ -125,11 +280,59 @@ class AddNewSticker(bpy.types.Operator):
         elif result == MORE_THAN_1_VTX_SELECTED:
             self.report({'ERROR'}, "Must select a vertex. Just one.")  
             return {'CANCELLED'}
+        elif result == STICKER_NOT_CREATED:
+            self.report({'ERROR'}, f"The sticker can't be created: {self.sticker.error}")
+            return {'CANCELLED'}
         else:
+            report_sticker_profile(self)
             self.report({'INFO'}, "Now you have a new sticker. Congratulations!!!")         
             return {'FINISHED'}
 
 
+class AddStickersFromManifest(bpy.types.Operator):
+    """Operator class to add all the stickers of a JSON or CSV manifest
+    in a single undo step
+    """    
+    
+    bl_idname = 'opr.sticker_batch_add'
+    bl_label = 'Add Stickers From Manifest'
+    bl_options = {'REGISTER','UNDO'}
+
+    
+    def execute(self, context):
+
+        addon_prefs = bpy.context.preferences.addons[__addon_name__].preferences
+        assert isinstance(addon_prefs, StickerPreferences)        
+        
+        manifest_filename = bpy.path.abspath(addon_prefs.manifest_filename)
+    
+        if not os.path.isfile(manifest_filename):
+            self.report({'ERROR'}, f"The manifest {manifest_filename} does not exist. Check the filename.")
+            return{'CANCELLED'}
+
+        try:
+            entries = read_sticker_manifest(manifest_filename)
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            self.report({'ERROR'}, f"Can't read the manifest: {error}")
+            return{'CANCELLED'}
+
+        results = create_stickers_from_manifest(entries, addon_prefs.image_cache_dir or None, addon_prefs.trim_cache_dir)
+        errors = [(name, error) for name, error in results if error is not None]
+        for name, error in errors:
+            print(f"Sticker {name}: {error}")
+
+        created = len(results) - len(errors)
+        report_sticker_profile(self)
+        if not created:
+            self.report({'ERROR'}, f"No sticker created, {len(errors)} errors. Check the console.")
+            return{'CANCELLED'}
+        if errors:
+            self.report({'WARNING'}, f"{created} stickers created, {len(errors)} errors. Check the console.")
+        else:
+            self.report({'INFO'}, f"{created} stickers created. Congratulations!!!")         
+        return {'FINISHED'}
+
+
 class RemoveSticker(bpy.types.Operator):
     """Operator class to remove a sticker
     """    
@@ -148,46 +351,41 @@ class RemoveSticker(bpy.types.Operator):
         stickername = addon_prefs.sticker_name 
        
  
-        if not check_if_sticker_name_exists(stickername):
+        if remove_sticker(stickername) == STICKER_NOT_FOUND:
             self.report({'ERROR'}, "Can't find the sticker in scene. Check the sticker name.")
             return{'CANCELLED'}            
 
-        sticker_objs = [
-            f"{stickername}_base_node",
-            f"{stickername}_normal_node",
-            f"{stickername}_projection_node",        
-            #for the plane deactivated in this version
-            #f"{stickername}_aux_plane",
-        ] 
-        
-        main_obj = bpy.data.objects[sticker_objs[0]].parent
-        main_material = main_obj.active_material
-        
-        sticker_shader_nodes = [
-            f"{stickername}_group",
-            f"{stickername}_image",
-            f"{stickername}_mapping",
-            f"{stickername}_obj_coords",
-            f"{stickername}_combine_XYZ",
-            f"{stickername}_mix_node",
-        ]
-
-        objs = bpy.data.objects
-
-        for obj_name in sticker_objs:
-            objs.remove(objs[obj_name], do_unlink=True)
-        
-        disconnect_sticker_material(stickername, main_material)
-        remove_all_the_nodes_from_sticker(stickername, main_material, sticker_shader_nodes, False)
-        for node in main_material.node_tree.nodes:
-            node.select = False
-            
-        bpy.ops.outliner.orphans_purge()        
-
         self.report({'INFO'}, f"The sticker {stickername} has been removed successfully !!!")         
         return {'FINISHED'}
 
 
+class RemoveStickers(bpy.types.Operator):
+    """Operator class to remove all the stickers matching the remove pattern
+    in a single step
+    """
+
+    bl_idname = 'opr.sticker_remove_many'
+    bl_label = 'Remove Many'
+    bl_options = {'REGISTER','UNDO'}
+
+
+    def execute(self, context):
+
+        addon_prefs = bpy.context.preferences.addons[__addon_name__].preferences
+        assert isinstance(addon_prefs, StickerPreferences)
+
+        stickernames = find_stickers(addon_prefs.remove_pattern)
+        if not stickernames:
+            self.report({'ERROR'}, "No sticker in scene matches the pattern. Check the remove pattern.")
+            return{'CANCELLED'}
+
+        removed = remove_stickers(stickernames)
+        report_sticker_profile(self)
+
+        self.report({'INFO'}, f"{len(removed)} stickers have been removed successfully !!!")
+        return {'FINISHED'}
+
+
 class StickerMatSelect(bpy.types.Operator):
     """Operator class to select the sticker materials
     in the node_tree
@@ -208,23 +406,16 @@ class StickerMatSelect(bpy.types.Operator):
         
         
  
-        if not check_if_sticker_name_exists(stickername):
+        sticker = get_sticker(stickername)
+        if sticker is None:
             addon_prefs.is_mat_selected = False
             self.report({'ERROR'}, "Can't find the sticker in scene. Check the sticker name.")
             return{'CANCELLED'} 
                    
 
-        sticker_objs = [
-            f"{stickername}_base_node",
-            f"{stickername}_normal_node",
-            f"{stickername}_projection_node",
-            #for the plane deactivated in this version
-            #f"{stickername}_aux_plane",
-        ] 
-        
-        main_obj = bpy.data.objects[sticker_objs[0]].parent
+        main_obj = sticker["main_obj"]
         main_obj.select_set(True)
-        main_material = main_obj.active_material
+        main_material = sticker["material"]
         node_tree = main_material.node_tree
  
         for node in node_tree.nodes:
@@ -266,23 +457,16 @@ class StickerMatUp(bpy.types.Operator):
             self.report({'ERROR'}, "You need to select the sticker materials first.")
             return{'CANCELLED'}            
 
-        if not check_if_sticker_name_exists(stickername):
+        sticker = get_sticker(stickername)
+        if sticker is None:
             addon_prefs.is_mat_selected = False
             self.report({'ERROR'}, "Can't find the sticker in scene. Check the sticker name.")
             return{'CANCELLED'} 
 
 
-        sticker_objs = [
-            f"{stickername}_base_node",
-            f"{stickername}_normal_node",
-            f"{stickername}_projection_node",
-            #for the plane deactivated in this version
-            #f"{stickername}_aux_plane",
-        ] 
-        
-        main_obj = bpy.data.objects[sticker_objs[0]].parent
+        main_obj = sticker["main_obj"]
         main_obj.select_set(True)
-        main_material = main_obj.active_material
+        main_material = sticker["material"]
         
         if check_if_is_the_topmost(main_material, stickername):
             self.report({'ERROR'}, "The sticker is the topmost yet. Can't move up.")
@@ -316,23 +500,16 @@ class StickerMatDown(bpy.types.Operator):
             self.report({'ERROR'}, "You need to select the sticker materials first.")
             return{'CANCELLED'}            
 
-        if not check_if_sticker_name_exists(stickername):
+        sticker = get_sticker(stickername)
+        if sticker is None:
             addon_prefs.is_mat_selected = False
             self.report({'ERROR'}, "Can't find the sticker in scene. Check the sticker name.")
             return{'CANCELLED'} 
 
 
-        sticker_objs = [
-            f"{stickername}_base_node",
-            f"{stickername}_normal_node",
-            f"{stickername}_projection_node",
-            #for the plane deactivated in this version
-            #f"{stickername}_aux_plane",
-        ] 
-        
-        main_obj = bpy.data.objects[sticker_objs[0]].parent
+        main_obj = sticker["main_obj"]
         main_obj.select_set(True)
-        main_material = main_obj.active_material
+        main_material = sticker["material"]
         
         if check_if_is_the_downmost(main_material, stickername):
             self.report({'ERROR'}, "The sticker is the downmost yet. Can't move down.")
@@ -344,3 +521,459 @@ class StickerMatDown(bpy.types.Operator):
         return {'FINISHED'}
 
 
+class StickerMatMoveTo(bpy.types.Operator):
+    """Operator class to move the sticker shadernodes to the top, the
+    bottom or any position of the node_tree in a single step
+    """    
+    
+    bl_idname = 'opr.sticker_move_to'
+    bl_label = 'Move To'
+    bl_options = {'REGISTER','UNDO'}
+
+    target: bpy.props.EnumProperty(
+        name="Target",
+        items=[
+            ('TOP', "Top", "Move the sticker to the topmost position"),
+            ('BOTTOM', "Bottom", "Move the sticker to the downmost position"),
+            ('POSITION', "Position", "Move the sticker to the Stack Position"),
+            ],
+        default='TOP',
+        )
+
+   
+    def execute(self, context):
+        
+        addon_prefs = bpy.context.preferences.addons[__addon_name__].preferences
+        assert isinstance(addon_prefs, StickerPreferences)
+
+        stickername = addon_prefs.sticker_name 
+        is_selected = addon_prefs.is_mat_selected
+ 
+        if not is_selected:
+            self.report({'ERROR'}, "You need to select the sticker materials first.")
+            return{'CANCELLED'}            
+
+        sticker = get_sticker(stickername)
+        if sticker is None:
+            addon_prefs.is_mat_selected = False
+            self.report({'ERROR'}, "Can't find the sticker in scene. Check the sticker name.")
+            return{'CANCELLED'} 
+
+        main_obj = sticker["main_obj"]
+        main_obj.select_set(True)
+        main_material = sticker["material"]
+
+        position = {'TOP': -1, 'BOTTOM': 0}.get(self.target, addon_prefs.stack_position - 1)
+        if not move_sticker_to_position(main_material, stickername, position):
+            self.report({'ERROR'}, "The sticker is at that position yet.")
+            return{'CANCELLED'}            
+        
+        self.report({'INFO'}, f"The sticker {stickername} has been moved !!!")         
+        return {'FINISHED'}
+
+
+class BakeStickerBindings(bpy.types.Operator):
+    """Operator class to bake the transforms of the bound and rigged
+    stickers of the scene frame range, one file per frame
+    """    
+    
+    bl_idname = 'opr.sticker_bake_bindings'
+    bl_label = 'Bake Bindings'
+    bl_options = {'REGISTER'}
+
+   
+    def execute(self, context):
+        
+        addon_prefs = bpy.context.preferences.addons[__addon_name__].preferences
+        assert isinstance(addon_prefs, StickerPreferences)
+
+        scene = context.scene
+        if not addon_prefs.binding_cache_dir:
+            self.report({'ERROR'}, "You need to choose a folder for the binding cache.")
+            return{'CANCELLED'}
+
+        try:
+            count, stale = bake_surface_bindings(scene, addon_prefs.binding_cache_dir, scene.frame_start, scene.frame_end)
+        except OSError as error:
+            self.report({'ERROR'}, f"Can't write the binding cache: {error}")
+            return{'CANCELLED'}
+
+        if stale:
+            objects = ", ".join(sorted({name for frame, name in stale}))
+            self.report({'WARNING'}, f"{len(stale)} frames not baked for the stickers on {objects}: "
+                                     "their modifiers change the number of vertices. Create them again.")
+            return {'FINISHED'}
+
+        self.report({'INFO'}, f"{count} frames baked. The scene reads them instead of the meshes.")
+        return {'FINISHED'}
+
+
+class ClearStickerBindingCache(bpy.types.Operator):
+    """Operator class to stop reading the baked sticker transforms
+    """    
+    
+    bl_idname = 'opr.sticker_clear_bindings'
+    bl_label = 'Clear Bake'
+    bl_options = {'REGISTER','UNDO'}
+
+   
+    def execute(self, context):
+
+        clear_surface_binding_cache(context.scene)
+        context.scene.frame_set(context.scene.frame_current)
+
+        self.report({'INFO'}, "The stickers follow the meshes again.")
+        return {'FINISHED'}
+
+
+class ShareStickerBaseMeshes(bpy.types.Operator):
+    """Operator class to make the base nodes of the stickers made by older
+    versions use the shared circle mesh
+    """
+
+    bl_idname = 'opr.sticker_share_base_mesh'
+    bl_label = 'Share Base Meshes'
+    bl_options = {'REGISTER','UNDO'}
+
+
+    def execute(self, context):
+
+        changed = share_base_node_meshes()
+
+        self.report({'INFO'}, f"{changed} base nodes use the shared mesh now.")
+        return {'FINISHED'}
+
+
+class ToggleStickerHelpers(bpy.types.Operator):
+    """Operator class to show or hide all the sticker helper objects of the
+    active object in a single step
+    """
+
+    bl_idname = 'opr.sticker_toggle_helpers'
+    bl_label = 'Show/Hide Helpers'
+    bl_options = {'REGISTER','UNDO'}
+
+
+    def execute(self, context):
+
+        obj = context.active_object
+        if obj is None or get_sticker_collection(obj, create = False) is None:
+            self.report({'ERROR'}, "The active object has no sticker collection. Select the object with the stickers.")
+            return{'CANCELLED'}
+
+        show = not is_sticker_collection_shown(obj)
+        if not show_sticker_collection(obj, show):
+            self.report({'ERROR'}, "The sticker collection is not in the view layer.")
+            return{'CANCELLED'}
+
+        self.report({'INFO'}, f"The sticker helpers of {obj.name} are {'shown' if show else 'hidden'}.")
+        return {'FINISHED'}
+
+
+class CollectStickerHelpers(bpy.types.Operator):
+    """Operator class to move the helper objects of the stickers made by older
+    versions into the sticker collection of their object
+    """
+
+    bl_idname = 'opr.sticker_collect_helpers'
+    bl_label = 'Collect Helpers'
+    bl_options = {'REGISTER','UNDO'}
+
+
+    def execute(self, context):
+
+        moved = collect_sticker_helpers()
+
+        self.report({'INFO'}, f"{moved} sticker helpers moved to the sticker collections.")
+        return {'FINISHED'}
+
+
+class DeduplicateStickerImages(bpy.types.Operator):
+    """Operator class to merge the images with the same content and report
+    the memory and .blend size saved sharing them
+    """    
+    
+    bl_idname = 'opr.sticker_dedup_images'
+    bl_label = 'Deduplicate Images'
+    bl_options = {'REGISTER','UNDO'}
+
+   
+    def execute(self, context):
+
+        merged = deduplicate_images()
+        shared = get_image_sharing_report()
+
+        mb = 1024 * 1024
+        self.report({'INFO'}, f"{merged['merged']} duplicated images merged "
+                              f"({merged['blend_saved'] / mb:.1f} MB .blend, {merged['memory_saved'] / mb:.1f} MB memory). "
+                              f"{shared['shared']} shared images save "
+                              f"{shared['blend_saved'] / mb:.1f} MB .blend and {shared['memory_saved'] / mb:.1f} MB memory.")
+        return {'FINISHED'}
+
+
+class BuildStickerProxies(bpy.types.Operator):
+    """Operator class to build the downscaled copies of the sticker images
+    in background and use them in the viewport
+    """    
+    
+    bl_idname = 'opr.sticker_build_proxies'
+    bl_label = 'Build Proxies'
+    bl_options = {'REGISTER','UNDO'}
+
+   
+    def invoke(self, context, event):
+
+        addon_prefs = bpy.context.preferences.addons[__addon_name__].preferences
+        assert isinstance(addon_prefs, StickerPreferences)
+
+        if not addon_prefs.proxy_dir:
+            self.report({'ERROR'}, "You need to choose a folder for the proxies.")
+            return{'CANCELLED'}
+
+        self.nodes_by_image = get_sticker_image_nodes(context.scene)
+        if not self.nodes_by_image:
+            self.report({'ERROR'}, "There are no sticker images to build proxies for.")
+            return{'CANCELLED'}
+
+        try:
+            self.jobs = get_proxy_jobs(self.nodes_by_image, addon_prefs.proxy_dir,
+                                       PROXY_FACTORS[addon_prefs.proxy_resolution])
+        except OSError as error:
+            self.report({'ERROR'}, f"Can't write in the proxy folder: {error}")
+            return{'CANCELLED'}
+
+        self.build = ProxyBuild(self.jobs, PROXY_FACTORS[addon_prefs.proxy_resolution], bpy.app.binary_path)
+
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.2, window = context.window)
+        wm.progress_begin(0, 100)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+
+        build = self.build
+
+        if event.type == 'ESC':
+            build.cancel()
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        if not build.done:
+            context.window_manager.progress_update(int(build.progress * 100))
+            context.workspace.status_text_set(
+                f"Building the sticker proxies: {build.built}/{build.total} (Esc to cancel)")
+            return {'RUNNING_MODAL'}
+
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+
+        count = assign_proxies(self.jobs, self.nodes_by_image)
+        if build.error is not None:
+            self.report({'WARNING'}, f"{build.error} {count} sticker images use a proxy.")
+        else:
+            self.report({'INFO'}, f"{count} sticker images use a proxy in the viewport.")
+        return {'FINISHED'}
+
+
+class ClearStickerProxies(bpy.types.Operator):
+    """Operator class to use the original sticker images in the viewport
+    """    
+    
+    bl_idname = 'opr.sticker_clear_proxies'
+    bl_label = 'Full Resolution'
+    bl_options = {'REGISTER','UNDO'}
+
+   
+    def execute(self, context):
+
+        count = clear_proxies(context.scene)
+
+        self.report({'INFO'}, f"{count} proxies removed, the viewport uses the original images.")
+        return {'FINISHED'}
+
+
+class StickerMemoryReport(bpy.types.Operator):
+    """Operator class to list the sticker images with the memory they use,
+    the list is shown in the Sticker Memory panel and the console
+    """    
+    
+    bl_idname = 'opr.sticker_memory_report'
+    bl_label = 'Memory Report'
+    bl_options = {'REGISTER'}
+
+   
+    def execute(self, context):
+
+        report = get_sticker_memory_report(context.scene)
+
+        mb = 1024 * 1024
+        for name, info in sorted(report["images"].items()):
+            print(f"{name}: {info['width']}x{info['height']} {info['channels']} channels "
+                  f"{info['bit_depth']} bits, {info['frames']} frames, "
+                  f"{info['packed_size'] / mb:.1f} MB packed, {info['decoded_size'] / mb:.1f} MB decoded "
+                  f"({', '.join(info['stickers'])})")
+        for name, size in sorted(report["materials"].items()):
+            print(f"Material {name}: {size / mb:.1f} MB")
+
+        self.report({'INFO'}, f"{len(report['images'])} sticker images: {report['total'] / mb:.1f} MB decoded, "
+                              f"{report['packed'] / mb:.1f} MB packed.")
+        return {'FINISHED'}
+
+
+class FitStickerMemoryBudget(bpy.types.Operator):
+    """Operator class to make smaller the sticker images over the budget
+    """    
+    
+    bl_idname = 'opr.sticker_fit_budget'
+    bl_label = 'Fit Budget'
+    bl_options = {'REGISTER','UNDO'}
+
+   
+    def execute(self, context):
+
+        addon_prefs = bpy.context.preferences.addons[__addon_name__].preferences
+        assert isinstance(addon_prefs, StickerPreferences)
+
+        mb = 1024 * 1024
+        changed = fit_sticker_images_to_budget(addon_prefs.memory_budget * mb, context.scene)
+        for name, before, after in changed:
+            print(f"{name}: {before / mb:.1f} MB -> {after / mb:.1f} MB")
+
+        saved = sum(before - after for name, before, after in changed)
+        self.report({'INFO'}, f"{len(changed)} sticker images made smaller, {saved / mb:.1f} MB saved.")
+        return {'FINISHED'}
+
+
+class PackStickerImages(bpy.types.Operator):
+    """Operator class to pack the sticker images read from the image cache,
+    so the .blend can be delivered without it
+    """    
+    
+    bl_idname = 'opr.sticker_pack_images'
+    bl_label = 'Make Self-Contained'
+    bl_options = {'REGISTER','UNDO'}
+
+   
+    def execute(self, context):
+
+        try:
+            count, size = pack_sticker_images()
+        except RuntimeError as error:
+            self.report({'ERROR'}, f"Can't pack the sticker images: {error}")
+            return{'CANCELLED'}
+
+        self.report({'INFO'}, f"{count} sticker images packed ({size / (1024 * 1024):.1f} MB).")
+        return {'FINISHED'}
+
+
+class PlaceStickerTool(bpy.types.Operator):
+    """Operator class to place stickers clicking on the surface of the
+    active mesh, one sticker per click until right click or Esc
+    """    
+    
+    bl_idname = 'opr.sticker_place'
+    bl_label = 'Place Stickers'
+    bl_options = {'REGISTER','UNDO'}
+
+
+    @classmethod
+    def poll(cls, context):
+        return context.area is not None and context.area.type == 'VIEW_3D'
+
+    def invoke(self, context, event):
+
+        addon_prefs = bpy.context.preferences.addons[__addon_name__].preferences
+        assert isinstance(addon_prefs, StickerPreferences)
+
+        obj = context.active_object
+        if obj is None or obj.type != 'MESH':
+            self.report({'ERROR'}, "The active object must be a mesh.")
+            return{'CANCELLED'}
+        if not obj.material_slots or obj.material_slots[0].material is None:
+            self.report({'ERROR'}, "The active object needs a material.")
+            return{'CANCELLED'}
+
+        error, self.img_offset, self.img_firstframe = check_sticker_image_settings(addon_prefs)
+        if error is not None:
+            self.report({'ERROR'}, error)
+            return{'CANCELLED'}
+
+        # the tool can be launched from the sidebar, the clicks are in the view
+        self.region = next(region for region in context.area.regions if region.type == 'WINDOW')
+        self.region_3d = context.space_data.region_3d
+        self.obj = obj
+        self.placed = []
+
+        # no edit mode at all, a single switch if needed
+        if obj.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+
+        context.window.cursor_modal_set('CROSSHAIR')
+        context.area.header_text_set("Click on the mesh to place a sticker, Right click or Esc to finish")
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+
+        if event.type in {'RIGHTMOUSE', 'ESC'} and event.value == 'PRESS':
+            return self.finish(context)
+
+        if event.type == 'LEFTMOUSE' and event.value == 'PRESS':
+            coord = (event.mouse_x - self.region.x, event.mouse_y - self.region.y)
+            if not (0 <= coord[0] < self.region.width and 0 <= coord[1] < self.region.height):
+                return {'PASS_THROUGH'}
+            location = raycast_object_surface(self.region, self.region_3d, coord, self.obj)
+            if location is not None:
+                error = self.place_sticker(location)
+                if error is not None:
+                    # the click is skipped, the tool goes on
+                    self.report({'ERROR'}, f"The sticker can't be placed: {error}")
+            return {'RUNNING_MODAL'}
+
+        # navigation and the rest of events
+        return {'PASS_THROUGH'}
+
+    def place_sticker(self, location):
+        """Builds a sticker with the preferences at a world location
+        returns:
+        None if it is placed else a string with the error
+        """
+
+        addon_prefs = bpy.context.preferences.addons[__addon_name__].preferences
+
+        sticker = Sticker('CREATE', self.obj)
+        sticker.sticker_name        = get_unique_sticker_name(addon_prefs.sticker_name)
+        sticker.is_seq              = addon_prefs.is_image_sequence
+        sticker.is_control_anim     = addon_prefs.is_anim_select
+        sticker.img_offset          = self.img_offset
+        sticker.img_firstframe      = self.img_firstframe
+        sticker.set_options(**get_sticker_options(addon_prefs))
+
+        try:
+            sticker.build_sticker(location, bpy.path.abspath(addon_prefs.img_filename))
+        except Exception as error:
+            # the sticker has been discarded
+            return sticker.error or str(error)
+        if sticker.error is not None:
+            return sticker.error
+
+        self.placed.append(sticker.sticker_name)
+        return None
+
+    def finish(self, context):
+
+        context.window.cursor_modal_restore()
+        context.area.header_text_set(None)
+
+        if not self.placed:
+            return {'CANCELLED'}
+
+        for node in self.obj.material_slots[0].material.node_tree.nodes:
+            node.select = False
+        report_sticker_profile(self)
+        self.report({'INFO'}, f"{len(self.placed)} stickers placed: {', '.join(self.placed)}")
+        return {'FINISHED'}
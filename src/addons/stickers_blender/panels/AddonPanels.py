@@ -12,8 +12,23 @@ Copyright (c) 2024 Antaruxa
 import bpy
 
 from stickers_blender.addons.stickers_blender.config import __addon_name__
+from stickers_blender.common.version1_0_1.memory_funcs import get_last_memory_report
 from stickers_blender.addons.stickers_blender.operators.AddonOperators import AddNewSticker
 from stickers_blender.addons.stickers_blender.operators.AddonOperators import RemoveSticker
+from stickers_blender.addons.stickers_blender.operators.AddonOperators import RemoveStickers
+from stickers_blender.addons.stickers_blender.operators.AddonOperators import PlaceStickerTool
+from stickers_blender.addons.stickers_blender.operators.AddonOperators import AddStickersFromManifest
+from stickers_blender.addons.stickers_blender.operators.AddonOperators import BakeStickerBindings
+from stickers_blender.addons.stickers_blender.operators.AddonOperators import ClearStickerBindingCache
+from stickers_blender.addons.stickers_blender.operators.AddonOperators import DeduplicateStickerImages
+from stickers_blender.addons.stickers_blender.operators.AddonOperators import PackStickerImages
+from stickers_blender.addons.stickers_blender.operators.AddonOperators import ShareStickerBaseMeshes
+from stickers_blender.addons.stickers_blender.operators.AddonOperators import ToggleStickerHelpers
+from stickers_blender.addons.stickers_blender.operators.AddonOperators import CollectStickerHelpers
+from stickers_blender.addons.stickers_blender.operators.AddonOperators import BuildStickerProxies
+from stickers_blender.addons.stickers_blender.operators.AddonOperators import ClearStickerProxies
+from stickers_blender.addons.stickers_blender.operators.AddonOperators import StickerMemoryReport
+from stickers_blender.addons.stickers_blender.operators.AddonOperators import FitStickerMemoryBudget
 
 
 class StickerObjectPanel(bpy.types.Panel):
@@ -51,14 +66,115 @@ class StickerObjectPanel(bpy.types.Panel):
         row = layout.row(align = True)
         layout.prop(addon_prefs, "is_image_sequence")
         layout.prop(addon_prefs, "is_anim_select")
+        layout.prop(addon_prefs, "use_atlas")
+        layout.prop(addon_prefs, "use_sprite_sheet")
+        layout.prop(addon_prefs, "use_driver_free")
+        layout.prop(addon_prefs, "use_surface_binding")
+        layout.prop(addon_prefs, "use_rigged")
+        layout.prop(addon_prefs, "use_lean_rig")
+        layout.prop(addon_prefs, "use_alpha_trim")
 
         row = layout.row(align = True)
         row.operator(AddNewSticker.bl_idname, text=AddNewSticker.bl_label)
         row.operator(RemoveSticker.bl_idname, text=RemoveSticker.bl_label)
+
+        row = layout.row()
+        layout.prop(addon_prefs, "remove_pattern")
+
+        row = layout.row(align = True)
+        row.operator(RemoveStickers.bl_idname, text=RemoveStickers.bl_label)
+
+        row = layout.row(align = True)
+        row.operator(PlaceStickerTool.bl_idname, text=PlaceStickerTool.bl_label)
+
+        row = layout.row(align = True)
+        row.operator(ToggleStickerHelpers.bl_idname, text=ToggleStickerHelpers.bl_label)
+        row.operator(CollectStickerHelpers.bl_idname, text=CollectStickerHelpers.bl_label)
+
+        row = layout.row()
+        layout.prop(addon_prefs, "manifest_filename")
+
+        row = layout.row(align = True)
+        row.operator(AddStickersFromManifest.bl_idname, text=AddStickersFromManifest.bl_label)
+
+        row = layout.row()
+        layout.prop(addon_prefs, "binding_cache_dir")
+
+        row = layout.row(align = True)
+        row.operator(BakeStickerBindings.bl_idname, text=BakeStickerBindings.bl_label)
+        row.operator(ClearStickerBindingCache.bl_idname, text=ClearStickerBindingCache.bl_label)
+
+        row = layout.row()
+        layout.prop(addon_prefs, "image_cache_dir")
+
+        row = layout.row(align = True)
+        row.operator(DeduplicateStickerImages.bl_idname, text=DeduplicateStickerImages.bl_label)
+        row.operator(PackStickerImages.bl_idname, text=PackStickerImages.bl_label)
+
+        row = layout.row(align = True)
+        row.operator(ShareStickerBaseMeshes.bl_idname, text=ShareStickerBaseMeshes.bl_label)
+
+        row = layout.row()
+        layout.prop(addon_prefs, "proxy_resolution")
+        layout.prop(addon_prefs, "proxy_dir")
+
+        row = layout.row(align = True)
+        row.operator(BuildStickerProxies.bl_idname, text=BuildStickerProxies.bl_label)
+        row.operator(ClearStickerProxies.bl_idname, text=ClearStickerProxies.bl_label)
+
+        row = layout.row()
+        layout.prop(addon_prefs, "use_profiling")
+        layout.prop(addon_prefs, "profile_trace_file")
         
       
 
 
+class StickerMemoryPanel(bpy.types.Panel):
+    """Panel Class in 3d-view with the memory used by the sticker images
+    """    
+    
+    bl_idname = 'VIEW3D_PT_sticker_memory_panel'
+    bl_label = 'Sticker Memory'
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Stickers'
+    bl_options = {'DEFAULT_CLOSED'}
+
+    
+    def draw(self, context: bpy.types.Context):
+
+        addon_prefs = context.preferences.addons[__addon_name__].preferences
+
+        layout = self.layout
+
+        row = layout.row()
+        layout.prop(addon_prefs, "memory_budget")
+
+        row = layout.row(align = True)
+        row.operator(StickerMemoryReport.bl_idname, text=StickerMemoryReport.bl_label)
+        row.operator(FitStickerMemoryBudget.bl_idname, text=FitStickerMemoryBudget.bl_label)
+
+        report = get_last_memory_report()
+        if report is None:
+            layout.label(text="Press Memory Report to list the sticker images")
+            return
+
+        mb = 1024 * 1024
+        budget = addon_prefs.memory_budget * mb
+        box = layout.box()
+        for name, info in sorted(report["images"].items()):
+            col = box.column(align = True)
+            col.label(text=name, icon='ERROR' if info["decoded_size"] > budget else 'IMAGE_DATA')
+            col.label(text=f"{info['width']}x{info['height']}  {info['channels']} ch  {info['bit_depth']} bits  "
+                           f"{info['frames']} frames")
+            col.label(text=f"{info['decoded_size'] / mb:.1f} MB decoded  {info['packed_size'] / mb:.1f} MB packed")
+
+        box = layout.box()
+        for name, size in sorted(report["materials"].items()):
+            box.label(text=f"{name}: {size / mb:.1f} MB", icon='MATERIAL')
+        box.label(text=f"Scene: {report['total'] / mb:.1f} MB decoded, {report['packed'] / mb:.1f} MB packed", icon='SCENE_DATA')
+
+
 class StickerMaterialPanel(bpy.types.Panel):
     
     bl_label = "Stickers"
@@ -92,6 +208,14 @@ class StickerMaterialPanel(bpy.types.Panel):
         row = layout.row(align = True)
         row.operator("opr.sticker_down", text="Move Down")
         row.operator("opr.sticker_up", text="Move Up")
+
+        row = layout.row(align = True)
+        row.operator("opr.sticker_move_to", text="To Bottom").target = 'BOTTOM'
+        row.operator("opr.sticker_move_to", text="To Top").target = 'TOP'
+
+        row = layout.row(align = True)
+        row.prop(addon_prefs, "stack_position")
+        row.operator("opr.sticker_move_to", text="Move To Position").target = 'POSITION'
                 
         
 
@@ -13,10 +13,21 @@ Copyright (c) 2024 Antaruxa
 import os
 
 import bpy
-from bpy.props import StringProperty, IntProperty, BoolProperty
+from bpy.props import StringProperty, IntProperty, BoolProperty, EnumProperty
 from bpy.types import AddonPreferences
 
 from stickers_blender.addons.stickers_blender.config import __addon_name__
+from stickers_blender.common.version1_0_1.profiling import (
+    enable_profiling,
+    disable_profiling,
+)
+
+
+def update_profiling(self, context):
+    if self.use_profiling:
+        enable_profiling(self.profile_trace_file)
+    else:
+        disable_profiling()
 
 
 class StickerPreferences(AddonPreferences):
@@ -32,6 +43,13 @@ class StickerPreferences(AddonPreferences):
         maxlen=1024,
         )
 
+    remove_pattern: StringProperty(
+        name="Remove Pattern",
+        default="",
+        description="Sticker names or wildcards separated by commas (tree_*, leaf_0?) removed by Remove Many",
+        maxlen=1024,
+        )
+
     img_filename: StringProperty(
         # IMAGE FILENAME
         name="Image Filename",
@@ -53,6 +71,134 @@ class StickerPreferences(AddonPreferences):
         default = False
     )
 
+    use_atlas: BoolProperty(
+        name="Atlas Mode",
+        description="Pack the still image stickers of a material into a single texture atlas",
+        default = False
+        )
+
+    use_sprite_sheet: BoolProperty(
+        name="Sprite Sheet",
+        description="Pack the images of a multi-pose sticker into a single sprite sheet, changing the pose doesn't load files",
+        default = False
+        )
+
+    use_driver_free: BoolProperty(
+        name="Driver-Free Facing",
+        description="Compute the sticker facing in the shader from the normal node coordinates instead of three location drivers",
+        default = False
+        )
+
+    use_surface_binding: BoolProperty(
+        name="Surface Binding",
+        description="Bind the sticker to a triangle of the mesh once instead of projecting it with a shrinkwrap constraint every frame",
+        default = False
+        )
+
+    use_rigged: BoolProperty(
+        name="Rigged Sticker",
+        description="Bind the sticker to a triangle of the deformed mesh, so it follows armatures and modifiers",
+        default = False
+        )
+
+    use_lean_rig: BoolProperty(
+        name="Lean Rig",
+        description="The sticker has only the base node, without normal and projection nodes, for scenes with many stickers",
+        default = False
+        )
+
+    use_alpha_trim: BoolProperty(
+        name="Alpha Trim",
+        description="Crop the transparent margin of the sticker images, the sticker looks the same with less texture memory",
+        default = False
+        )
+
+    trim_cache_dir: StringProperty(
+        # TRIMMED IMAGES FOLDER
+        name="Trim Cache",
+        default="//sticker_trim/",
+        subtype='DIR_PATH',
+        description="Folder where the cropped sticker images are kept, an image is cropped only once",
+        maxlen=1024,
+        )
+
+    binding_cache_dir: StringProperty(
+        # BAKED STICKER TRANSFORMS FOLDER
+        name="Binding Cache",
+        default="//sticker_cache/",
+        subtype='DIR_PATH',
+        description="Folder where the transforms of the bound stickers are baked, one file per frame",
+        maxlen=1024,
+        )
+
+    image_cache_dir: StringProperty(
+        # SHARED STICKER IMAGES FOLDER
+        name="Image Cache",
+        default="",
+        subtype='DIR_PATH',
+        description="Folder shared by many .blend files where the sticker images are stored by content instead of packed. Empty to pack them",
+        maxlen=1024,
+        )
+
+    proxy_resolution: EnumProperty(
+        name="Proxy Resolution",
+        description="Size of the sticker images in the viewport, the renders always use the original ones",
+        items=[
+            ('HALF', "1/2", "Half of the original size"),
+            ('QUARTER', "1/4", "A quarter of the original size"),
+            ],
+        default='HALF',
+        )
+
+    proxy_dir: StringProperty(
+        # VIEWPORT PROXIES FOLDER
+        name="Proxy Cache",
+        default="//sticker_proxies/",
+        subtype='DIR_PATH',
+        description="Folder where the downscaled copies of the sticker images are kept",
+        maxlen=1024,
+        )
+
+    memory_budget: IntProperty(
+        name="Image Budget (MB)",
+        description="Max memory of a sticker image, Fit Budget makes smaller the ones over it",
+        default=64,
+        min=1,
+        )
+
+    manifest_filename: StringProperty(
+        # MANIFEST FILENAME
+        name="Manifest Filename",
+        default="//",
+        subtype='FILE_PATH',
+        description="JSON or CSV file with the stickers to create in a single step",
+        maxlen=1024,
+        )
+
+    stack_position: IntProperty(
+        name="Stack Position",
+        description="Position where Move To Position puts the sticker shadernodes, 1 is the downmost",
+        default=1,
+        min=1,
+        )
+
+    use_profiling: BoolProperty(
+        name="Profile Stages",
+        description="Time the stages of the sticker creation and editing, the summary is shown in the Info editor",
+        default = False,
+        update = update_profiling,
+        )
+
+    profile_trace_file: StringProperty(
+        # CHROME TRACE FILE
+        name="Profile Trace",
+        default="//sticker_trace.json",
+        subtype='FILE_PATH',
+        description="Chrome trace (json) written with the stage times",
+        maxlen=1024,
+        update = update_profiling,
+        )
+
     is_mat_selected: BoolProperty(
         name="Select the sticker materials",
         description="Bool to select the sticker materials",
@@ -65,8 +211,26 @@ class StickerPreferences(AddonPreferences):
         layout = self.layout
         layout.label(text="Add-on Preferences View")
         layout.prop(self, "sticker_name")
+        layout.prop(self, "remove_pattern")
         layout.prop(self, "img_filename")
         layout.prop(self, "is_image_sequence")
         layout.prop(self, "is_anim_select")
+        layout.prop(self, "use_atlas")
+        layout.prop(self, "use_sprite_sheet")
+        layout.prop(self, "use_driver_free")
+        layout.prop(self, "use_surface_binding")
+        layout.prop(self, "use_rigged")
+        layout.prop(self, "use_lean_rig")
+        layout.prop(self, "use_alpha_trim")
+        layout.prop(self, "trim_cache_dir")
+        layout.prop(self, "binding_cache_dir")
+        layout.prop(self, "image_cache_dir")
+        layout.prop(self, "proxy_resolution")
+        layout.prop(self, "proxy_dir")
+        layout.prop(self, "memory_budget")
+        layout.prop(self, "manifest_filename")
+        layout.prop(self, "stack_position")
+        layout.prop(self, "use_profiling")
+        layout.prop(self, "profile_trace_file")
         layout.prop(self, "is_mat_selected")
 
@@ -0,0 +1,299 @@
+"""
+[Blender and Python] Atlas library for Stickers Antaruxa
+Juan R Nouche - January 2025
+Email: juan.nouche@antaruxa.com
+A Blender python functions library to pack the still image stickers
+of a material into a single texture atlas
+Antaruxa Stickers - Blender python atlas library
+Copyright (c) 2025 Antaruxa
+--------
+"""
+
+
+import json
+
+import bpy
+import numpy as np
+
+from stickers_blender.common.version1_0_1.material_funcs import insert_sticker_subrect_node
+from stickers_blender.common.version1_0_1.image_funcs import (
+    read_image_pixels,
+    write_image_pixels,
+)
+from stickers_blender.common.version1_0_1.material_edit import defer_material_finish
+
+
+# == GLOBAL VARIABLES
+
+# material custom property holding the atlas layout (json)
+ATLAS_PROPERTY = "sticker_atlas"
+
+ATLAS_MIN_SIZE = 256
+ATLAS_MAX_SIZE = 8192
+
+# transparent pixels around every sticker so the filtering doesn't mix them
+ATLAS_PADDING = 2
+
+# {atlas image name: pixels} changed by the edits being applied, written to
+# the images once when they are done (see _write_atlas_pixels)
+_atlas_pixels = {}
+
+
+# ==== INTERNAL FUNCTIONS (AUX)
+
+def _get_layout(material):
+    """Gets the atlas layout of a material
+    material -- the material with the stickers
+    returns:
+    dict with image (atlas image name), size [W, H], rects {sticker: [x, y, w, h]}
+    and free [[x, y, w, h], ...] or None if the material has no atlas
+    """
+    layout = material.get(ATLAS_PROPERTY)
+    if not layout:
+        return None
+    return json.loads(layout)
+
+
+def _set_layout(material, layout):
+    material[ATLAS_PROPERTY] = json.dumps(layout)
+
+
+def _allocate_rect(free, width, height):
+    """Finds room for a rectangle in the free rectangles (guillotine packing,
+    best short side fit) and splits the free rectangle used
+    free   -- list of free [x, y, w, h], it is modified
+    width  -- width needed
+    height -- height needed
+    returns:
+    [x, y, w, h] or None if there is no room
+    """
+    best = None
+    for ndx, (fx, fy, fw, fh) in enumerate(free):
+        if width <= fw and height <= fh:
+            score = min(fw - width, fh - height)
+            if best is None or score < best[0]:
+                best = (score, ndx)
+    if best is None:
+        return None
+
+    fx, fy, fw, fh = free.pop(best[1])
+    if fw - width > fh - height:
+        right = [fx + width, fy, fw - width, fh]
+        top = [fx, fy + height, width, fh - height]
+    else:
+        right = [fx + width, fy, fw - width, height]
+        top = [fx, fy + height, fw, fh - height]
+    free.extend(rect for rect in (right, top) if rect[2] > 0 and rect[3] > 0)
+    return [fx, fy, width, height]
+
+
+def _merge_free_rects(free):
+    """Merges the free rectangles sharing a whole side, so the places freed
+    next to each other can hold a bigger sticker again
+    free -- list of free [x, y, w, h], it is modified
+    """
+    merged = True
+    while merged:
+        merged = False
+        for ndx, (ax, ay, aw, ah) in enumerate(free):
+            for other in range(ndx + 1, len(free)):
+                bx, by, bw, bh = free[other]
+                if ax == bx and aw == bw and (ay + ah == by or by + bh == ay):
+                    free[ndx] = [ax, min(ay, by), aw, ah + bh]
+                elif ay == by and ah == bh and (ax + aw == bx or bx + bw == ax):
+                    free[ndx] = [min(ax, bx), ay, aw + bw, ah]
+                else:
+                    continue
+                del free[other]
+                merged = True
+                break
+            if merged:
+                break
+
+
+def _get_atlas_pixels(atlas):
+    """Gets the atlas pixels to change, read once for all the edits applied
+    together
+    """
+    pixels = _atlas_pixels.get(atlas.name)
+    width, height = atlas.size
+    if pixels is None or pixels.shape[:2] != (height, width):
+        pixels = read_image_pixels(atlas)
+    return pixels
+
+
+def _set_atlas_pixels(atlas, pixels):
+    """Keeps the changed atlas pixels, they are written (and packed) once
+    when the edits are done
+    """
+    _atlas_pixels[atlas.name] = pixels
+    defer_material_finish(("atlas", atlas.name), _write_atlas_pixels, atlas.name)
+
+
+def _write_atlas_pixels(atlas_name):
+    pixels = _atlas_pixels.pop(atlas_name, None)
+    atlas = bpy.data.images.get(atlas_name)
+    if pixels is not None and atlas is not None:
+        write_image_pixels(atlas, pixels)
+
+
+def _grow_layout(layout, width, height):
+    """Doubles the atlas size until a width x height rectangle fits. The
+    stickers packed keep their pixel position, only the new area is free
+    layout -- the atlas layout, it is modified
+    returns:
+    the rect allocated or None if the atlas would be bigger than ATLAS_MAX_SIZE
+    """
+    old_w, old_h = layout["size"]
+    new_w, new_h = old_w, old_h
+    while True:
+        if new_w <= new_h:
+            new_w *= 2
+        else:
+            new_h *= 2
+        if new_w > ATLAS_MAX_SIZE or new_h > ATLAS_MAX_SIZE:
+            return None
+
+        free = list(layout["free"])
+        if new_w > old_w:
+            free.append([old_w, 0, new_w - old_w, new_h])
+        if new_h > old_h:
+            free.append([0, old_h, old_w, new_h - old_h])
+        rect = _allocate_rect(free, width, height)
+        if rect is not None:
+            layout["size"] = [new_w, new_h]
+            layout["free"] = free
+            return rect
+
+
+def _update_subrect_nodes(material, layout):
+    """Sets the offset and size of every sticker _subrect node from the layout
+    """
+    atlas_w, atlas_h = layout["size"]
+    pad = ATLAS_PADDING
+    for sticker_name, (x, y, w, h) in layout["rects"].items():
+        offset = ((x + pad) / atlas_w, (y + pad) / atlas_h)
+        size = ((w - 2 * pad) / atlas_w, (h - 2 * pad) / atlas_h)
+        insert_sticker_subrect_node(material.node_tree, sticker_name, offset, size)
+
+
+# ==== EXTERNAL FUNCTIONS
+
+def get_material_atlas_image(material):
+    """Gets the atlas image of a material
+    material -- the material with the stickers
+    returns:
+    the image or None if the material has no atlas
+    """
+    layout = _get_layout(material)
+    if layout is None:
+        return None
+    return bpy.data.images.get(layout["image"])
+
+
+def add_sticker_to_atlas(material, sticker_name, image):
+    """Packs a still image into the material atlas and connects the sticker
+    image node to it. Only the new image pixels are copied, the stickers
+    packed before keep their place (the atlas grows if there is no room).
+    The atlas is read and written once for all the stickers added in a
+    sticker_material_edit block
+    material     -- the material with the sticker nodes
+    sticker_name -- the name of the sticker
+    image        -- the still image of the sticker
+    returns:
+    True if the sticker is in the atlas, False if it doesn't fit
+    """
+    src = read_image_pixels(image)
+    height, width = src.shape[:2]
+    need_w, need_h = width + 2 * ATLAS_PADDING, height + 2 * ATLAS_PADDING
+    if need_w > ATLAS_MAX_SIZE or need_h > ATLAS_MAX_SIZE:
+        return False
+
+    layout = _get_layout(material)
+    atlas = bpy.data.images.get(layout["image"]) if layout else None
+    if atlas is None:
+        size = ATLAS_MIN_SIZE
+        while size < max(need_w, need_h):
+            size *= 2
+        layout = {"image": "", "size": [size, size], "rects": {}, "free": [[0, 0, size, size]]}
+        old_pixels = None
+    else:
+        old_pixels = _get_atlas_pixels(atlas)
+
+    rect = _allocate_rect(layout["free"], need_w, need_h)
+    if rect is None:
+        rect = _grow_layout(layout, need_w, need_h)
+        if rect is None:
+            return False
+
+    atlas_w, atlas_h = layout["size"]
+    if old_pixels is not None and old_pixels.shape[:2] == (atlas_h, atlas_w):
+        pixels = old_pixels
+    else:
+        pixels = np.zeros((atlas_h, atlas_w, 4), dtype = np.float32)
+        if old_pixels is not None:
+            old_h, old_w = old_pixels.shape[:2]
+            pixels[:old_h, :old_w] = old_pixels
+        if atlas is not None:
+            atlas.scale(atlas_w, atlas_h)
+
+    if atlas is None:
+        atlas = bpy.data.images.new(f"{material.name}_sticker_atlas", atlas_w, atlas_h, alpha = True)
+        layout["image"] = atlas.name
+
+    # the place may keep the pixels of a sticker removed, the padding is cleared
+    rx, ry, rw, rh = rect
+    pixels[ry:ry + rh, rx:rx + rw] = 0.0
+    x, y = rx + ATLAS_PADDING, ry + ATLAS_PADDING
+    pixels[y:y + height, x:x + width] = src
+    _set_atlas_pixels(atlas, pixels)
+
+    layout["rects"][sticker_name] = rect
+    _set_layout(material, layout)
+
+    material.node_tree.nodes[f"{sticker_name}_image"].image = atlas
+    _update_subrect_nodes(material, layout)
+    return True
+
+
+def remove_sticker_from_atlas(material, sticker_name):
+    """Frees the sticker place in the material atlas. The other stickers are not
+    moved, the place is reused by the next stickers added. The atlas image is
+    removed with the last sticker
+    material     -- the material with the sticker nodes
+    sticker_name -- the name of the sticker
+    returns:
+    True if the sticker was in the atlas
+    """
+    return remove_stickers_from_atlas(material, [sticker_name]) > 0
+
+
+def remove_stickers_from_atlas(material, sticker_names):
+    """Frees the places of many stickers in the material atlas. Only the layout
+    changes, the pixels left are not sampled and are cleared when the place
+    is used again (see remove_sticker_from_atlas)
+    material      -- the material with the sticker nodes
+    sticker_names -- the names of the stickers
+    returns:
+    the number of stickers that were in the atlas
+    """
+    layout = _get_layout(material)
+    if layout is None:
+        return 0
+    rects = [layout["rects"].pop(name) for name in sticker_names if name in layout["rects"]]
+    if not rects:
+        return 0
+
+    atlas = bpy.data.images.get(layout["image"])
+
+    if not layout["rects"]:
+        _atlas_pixels.pop(layout["image"], None)
+        if atlas is not None:
+            bpy.data.images.remove(atlas)
+        del material[ATLAS_PROPERTY]
+        return len(rects)
+
+    layout["free"].extend(rects)
+    _merge_free_rects(layout["free"])
+    _set_layout(material, layout)
+    return len(rects)
@@ -0,0 +1,443 @@
+"""
+[Blender and Python] Image utils library for Stickers Antaruxa
+Juan R Nouche - January 2025
+Email: juan.nouche@antaruxa.com
+A Blender python functions library to read, write and build
+the images used by the stickers
+Antaruxa Stickers - Blender python image utils library
+Copyright (c) 2025 Antaruxa
+--------
+"""
+
+
+import os
+import json
+import math
+import shutil
+import hashlib
+
+import bpy
+import numpy as np
+
+
+# == GLOBAL VARIABLES
+
+# image custom property with the hash of the file content
+HASH_PROPERTY = "sticker_content_hash"
+# image custom property with the source (path, size and mtime) the hash was
+# computed from, the hash is computed again when it doesn't match
+HASH_SOURCE_PROPERTY = "sticker_content_hash_source"
+HASH_CHUNK_SIZE = 1 << 20
+
+# {absolute path: (mtime_ns, size, hash)}
+_file_hash_cache = {}
+
+# file written in every trim cache folder once all the frames are cropped
+TRIM_INFO_FILE = "trim.json"
+
+# transparent pixels kept around the trimmed artwork for the filtering
+TRIM_PADDING = 1
+
+
+# ==== INTERNAL FUNCTIONS (AUX)
+
+def _image_memory_size(image):
+    """Approximated memory used by the image pixels
+    """
+    width, height = image.size
+    bytes_per_channel = 4 if image.is_float else 1
+    return width * height * image.channels * bytes_per_channel
+
+
+def _is_still_file_image(image):
+    return image.source == 'FILE' and image.type == 'IMAGE'
+
+
+def _read_image_file(filepath):
+    """Reads the pixels of an image file without keeping its datablock
+    returns:
+    (RGBA pixels, True if the file has more than 8 bits per channel)
+    """
+    image = bpy.data.images.load(filepath = filepath, check_existing = False)
+    try:
+        return read_image_pixels(image), image.is_float
+    finally:
+        bpy.data.images.remove(image)
+
+
+def _get_trim_targets(folder, files, extension):
+    return [os.path.join(folder, f"{os.path.splitext(os.path.basename(filepath))[0]}{extension}")
+            for filepath in files]
+
+
+def _get_image_hash_source(image):
+    """Gets what the content hash of an image depends on: its packed data
+    size or its file path, size and mtime
+    returns:
+    a string or None if the image has no content to hash
+    """
+    filepath = os.path.normpath(bpy.path.abspath(image.filepath, library = image.library))
+    if image.packed_file is not None:
+        return f"packed|{filepath}|{image.packed_file.size}"
+    if not os.path.isfile(filepath):
+        return None
+    stat = os.stat(filepath)
+    return f"file|{filepath}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def _store_image_hash(image, content_hash):
+    """Keeps the content hash in the image with the source it comes from
+    """
+    image[HASH_PROPERTY] = content_hash
+    image[HASH_SOURCE_PROPERTY] = _get_image_hash_source(image) or ""
+
+
+# ==== EXTERNAL FUNCTIONS PIXELS
+
+def read_image_pixels(image):
+    """Reads the image pixels as a (height, width, 4) float32 array
+    image -- the image datablock
+    returns:
+    the RGBA pixels, the first row is the bottom one (as in blender)
+    """
+    width, height = image.size
+    channels = image.channels
+    pixels = np.empty(width * height * channels, dtype = np.float32)
+    image.pixels.foreach_get(pixels)
+    pixels = pixels.reshape(height, width, channels)
+    if channels == 4:
+        return pixels
+
+    rgba = np.ones((height, width, 4), dtype = np.float32)
+    if channels >= 3:
+        rgba[:, :, :3] = pixels[:, :, :3]
+    else:
+        rgba[:, :, :3] = pixels[:, :, :1]
+    return rgba
+
+
+def write_image_pixels(image, pixels, pack = True):
+    """Writes a (height, width, 4) array into the image pixels
+    image  -- the image datablock, it must have the same size
+    pixels -- the RGBA pixels
+    pack   -- if True the image is packed in the .blend
+    """
+    image.pixels.foreach_set(pixels.ravel())
+    image.update()
+    if pack:
+        image.pack()
+
+
+def read_image_file_pixels(filepath):
+    """Reads the pixels of an image file without keeping its datablock
+    filepath -- the path to the image
+    returns:
+    the RGBA pixels as a (height, width, 4) float32 array
+    """
+    return _read_image_file(filepath)[0]
+
+
+# ==== EXTERNAL FUNCTIONS DEDUPLICATION
+
+def hash_image_file(filepath):
+    """Hashes the content of a file reading it in chunks (blake2b), the
+    result is cached by path, mtime and size
+    filepath -- the path to the image
+    returns:
+    the hex digest
+    """
+    filepath = os.path.abspath(filepath)
+    stat = os.stat(filepath)
+    cached = _file_hash_cache.get(filepath)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+
+    content_hash = hashlib.blake2b(digest_size = 16)
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            content_hash.update(chunk)
+    digest = content_hash.hexdigest()
+    _file_hash_cache[filepath] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def hash_image(image):
+    """Gets the content hash of an image datablock, from its packed data or
+    its file, and keeps it in the image. The hash kept is used while the
+    packed data or the file (path, size and mtime) don't change. A painted
+    image not saved has no hash, its pixels are not the ones hashed
+    image -- the image datablock
+    returns:
+    the hex digest or None if the image has no content to hash
+    """
+    if image.is_dirty:
+        return None
+    source = _get_image_hash_source(image)
+    if source is None:
+        return None
+    content_hash = image.get(HASH_PROPERTY)
+    if content_hash and image.get(HASH_SOURCE_PROPERTY) == source:
+        return content_hash
+
+    if image.packed_file is not None:
+        data = memoryview(image.packed_file.data)
+        hasher = hashlib.blake2b(digest_size = 16)
+        for start in range(0, len(data), HASH_CHUNK_SIZE):
+            hasher.update(data[start:start + HASH_CHUNK_SIZE])
+        content_hash = hasher.hexdigest()
+    else:
+        content_hash = hash_image_file(bpy.path.abspath(image.filepath, library = image.library))
+
+    _store_image_hash(image, content_hash)
+    return content_hash
+
+
+def find_image_by_hash(content_hash):
+    """Finds a still image datablock with this content, the hash kept in the
+    images is checked again if their file changed
+    content_hash -- the hex digest
+    returns:
+    the image or None
+    """
+    for image in bpy.data.images:
+        if image.get(HASH_PROPERTY) != content_hash or not _is_still_file_image(image):
+            continue
+        if hash_image(image) == content_hash:
+            return image
+    return None
+
+
+def store_image_in_cache(filepath, cache_dir, content_hash = None):
+    """Copies an image into a content-addressed cache folder shared by many
+    .blend files, as {cache_dir}/{hash[:2]}/{hash}{ext}. A file already in
+    the cache is never copied again
+    filepath     -- the path to the image
+    cache_dir    -- the cache folder (it can be relative to the .blend)
+    content_hash -- the hash of the file if it is known
+    returns:
+    the absolute path of the cached copy
+    """
+    content_hash = content_hash or hash_image_file(filepath)
+    extension = os.path.splitext(filepath)[1].lower()
+    cached = os.path.join(bpy.path.abspath(cache_dir), content_hash[:2], f"{content_hash}{extension}")
+    if not os.path.isfile(cached):
+        os.makedirs(os.path.dirname(cached), exist_ok = True)
+        # other shots can be writing the same file, the copy appears complete
+        temporary = f"{cached}.{os.getpid()}.tmp"
+        shutil.copyfile(filepath, temporary)
+        os.replace(temporary, cached)
+    return cached
+
+
+def load_image_deduplicated(filepath, pack = True, cache_dir = None):
+    """Loads a still image sharing the datablock (and its packed data) with
+    every image with the same content, whatever its name or path
+    filepath  -- the path to the image
+    pack      -- if True the image is packed in the .blend
+    cache_dir -- if given the image is loaded from the shared cache folder
+                 with a path relative to the .blend, and it is not packed
+    returns:
+    the image datablock
+    """
+    content_hash = hash_image_file(filepath)
+    image = find_image_by_hash(content_hash)
+    if image is None:
+        if cache_dir:
+            filepath = store_image_in_cache(filepath, cache_dir, content_hash)
+        image = bpy.data.images.load(filepath = filepath, check_existing = False)
+        if cache_dir and bpy.data.is_saved:
+            image.filepath = bpy.path.relpath(filepath)
+    if pack and not cache_dir and image.packed_file is None:
+        image.pack()
+    if image.get(HASH_SOURCE_PROPERTY) != _get_image_hash_source(image):
+        _store_image_hash(image, content_hash)
+    return image
+
+
+def pack_sticker_images():
+    """Packs in the .blend the sticker still images read from files, so the
+    file doesn't need the image cache anymore
+    returns:
+    (number of images packed, bytes added to the .blend)
+    """
+    count = size = 0
+    for image in bpy.data.images:
+        if not image.get(HASH_PROPERTY) or image.packed_file is not None:
+            continue
+        if not _is_still_file_image(image) or image.library is not None:
+            continue
+        image.pack()
+        count += 1
+        size += image.packed_file.size
+    return count, size
+
+
+def deduplicate_images():
+    """Merges the still images with the same content into one datablock,
+    the users of the duplicates use the kept one. The images painted and not
+    saved are left apart
+    returns:
+    dict with merged (images removed), blend_saved and memory_saved (bytes)
+    """
+    report = {"merged": 0, "blend_saved": 0, "memory_saved": 0}
+    kept = {}
+    for image in list(bpy.data.images):
+        if not _is_still_file_image(image) or image.library is not None:
+            continue
+        content_hash = hash_image(image)
+        if content_hash is None:
+            continue
+        original = kept.setdefault(content_hash, image)
+        if original is image:
+            continue
+
+        if image.packed_file is not None:
+            report["blend_saved"] += image.packed_file.size
+        if image.has_data:
+            report["memory_saved"] += _image_memory_size(image)
+        image.user_remap(original)
+        bpy.data.images.remove(image)
+        report["merged"] += 1
+    return report
+
+
+def get_image_sharing_report():
+    """Computes what sharing the images saves compared to a copy per user
+    returns:
+    dict with shared (images used more than once), blend_saved and
+    memory_saved (bytes)
+    """
+    report = {"shared": 0, "blend_saved": 0, "memory_saved": 0}
+    for image in bpy.data.images:
+        if not image.get(HASH_PROPERTY) or image.users < 2:
+            continue
+        copies = image.users - 1
+        report["shared"] += 1
+        if image.packed_file is not None:
+            report["blend_saved"] += copies * image.packed_file.size
+        if image.has_data:
+            report["memory_saved"] += copies * _image_memory_size(image)
+    return report
+
+
+# ==== EXTERNAL FUNCTIONS ALPHA TRIM
+
+def get_alpha_bounds(pixels):
+    """Gets the bounding box of the pixels that are not transparent
+    pixels -- (height, width, 4) array
+    returns:
+    (x0, y0, x1, y1) with x1, y1 excluded or None if all are transparent
+    """
+    alpha = pixels[:, :, 3] > 0.0
+    cols = np.flatnonzero(alpha.any(axis = 0))
+    if not len(cols):
+        return None
+    rows = np.flatnonzero(alpha.any(axis = 1))
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def get_trim_box(bounds, width, height):
+    """Gets the crop of an image containing the bounds. The crop keeps the
+    proportions of the image, so the sticker mapping is compensated with a
+    uniform scale and the result is the same with any rotation
+    bounds -- (x0, y0, x1, y1) of the artwork
+    width  -- width of the image
+    height -- height of the image
+    returns:
+    (x, y, w, h) in pixels or None if the crop would be the whole image
+    """
+    x0, y0, x1, y1 = bounds
+    x0, y0 = max(0, x0 - TRIM_PADDING), max(0, y0 - TRIM_PADDING)
+    x1, y1 = min(width, x1 + TRIM_PADDING), min(height, y1 + TRIM_PADDING)
+
+    scale = max((x1 - x0) / width, (y1 - y0) / height)
+    w = min(width, math.ceil(scale * width))
+    h = min(height, math.ceil(scale * height))
+    if w == width and h == height:
+        return None
+
+    x = min(max(0, (x0 + x1 - w) // 2), width - w)
+    y = min(max(0, (y0 + y1 - h) // 2), height - h)
+    return x, y, w, h
+
+
+def trim_image_files(files, trim_dir):
+    """Crops all the frames of a sequence (or a single image) to the box of
+    the pixels that are not transparent in any of them. The cropped frames
+    keep the file names in a folder named by the hash of the source files,
+    so the same images are trimmed only once. They are png for 8 bit images
+    and float exr for deeper ones (16 bit, float), so nothing is quantized.
+    Each frame is decoded once, only its artwork is kept until it is written
+    files    -- the paths of the frames sorted by frame number
+    trim_dir -- the folder for the cropped images (it can be relative to the .blend)
+    returns:
+    (first cropped file, offset, size) with the offset and size of the crop
+    in the original image [0, 1], or None if the images can't be trimmed
+    """
+    key = hashlib.blake2b(digest_size = 16)
+    for filepath in files:
+        key.update(hash_image_file(filepath).encode())
+    folder = os.path.join(bpy.path.abspath(trim_dir), key.hexdigest())
+    info_file = os.path.join(folder, TRIM_INFO_FILE)
+
+    if os.path.isfile(info_file):
+        with open(info_file) as f:
+            info = json.load(f)
+    else:
+        info = {"box": None}
+        size = bounds = None
+        is_float = False
+        # [(frame bounds, artwork pixels) or None if transparent, ...]
+        artworks = []
+        for filepath in files:
+            pixels, frame_float = _read_image_file(filepath)
+            frame_size = pixels.shape[1], pixels.shape[0]
+            if size is not None and frame_size != size:
+                # frames of different size can't share the crop
+                bounds = None
+                break
+            size = frame_size
+            is_float = is_float or frame_float
+            frame_bounds = get_alpha_bounds(pixels)
+            if frame_bounds is None:
+                artworks.append(None)
+                continue
+            # out of its bounds the frame is transparent, the rest is not kept
+            x0, y0, x1, y1 = frame_bounds
+            artworks.append((frame_bounds, pixels[y0:y1, x0:x1].copy()))
+            bounds = frame_bounds if bounds is None else (
+                min(bounds[0], frame_bounds[0]), min(bounds[1], frame_bounds[1]),
+                max(bounds[2], frame_bounds[2]), max(bounds[3], frame_bounds[3]))
+
+        box = get_trim_box(bounds, *size) if bounds is not None else None
+        if bounds is not None:
+            os.makedirs(folder, exist_ok = True)
+        if box is not None:
+            x, y, w, h = box
+            extension = ".exr" if is_float else ".png"
+            cropped = bpy.data.images.new("sticker_trim", w, h, alpha = True, float_buffer = is_float)
+            try:
+                for artwork, target in zip(artworks, _get_trim_targets(folder, files, extension)):
+                    pixels = np.zeros((h, w, 4), dtype = np.float32)
+                    if artwork is not None:
+                        (x0, y0, x1, y1), artwork_pixels = artwork
+                        pixels[y0 - y:y1 - y, x0 - x:x1 - x] = artwork_pixels
+                    write_image_pixels(cropped, pixels, pack = False)
+                    cropped.filepath_raw = target
+                    cropped.file_format = 'OPEN_EXR' if is_float else 'PNG'
+                    cropped.save()
+            finally:
+                bpy.data.images.remove(cropped)
+            info = {"box": list(box), "size": list(size), "extension": extension}
+        if bounds is not None:
+            # the images that don't need a crop are remembered too
+            with open(info_file, "w") as f:
+                json.dump(info, f)
+
+    if not info["box"]:
+        return None
+    x, y, w, h = info["box"]
+    width, height = info["size"]
+    # the crops made before the exr output are png
+    first = _get_trim_targets(folder, files[:1], info.get("extension", ".png"))[0]
+    return first, (x / width, y / height), (w / width, h / height)
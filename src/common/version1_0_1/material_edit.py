@@ -0,0 +1,160 @@
+"""
+[Blender and Python] Deferred material edits for Stickers Antaruxa
+Juan R Nouche - January 2025
+Email: juan.nouche@antaruxa.com
+Collects the sticker shadernode edits (creates, removes and reorders)
+and applies them to the node trees in a single batch, so EEVEE compiles
+each material shader once instead of once per edit
+Antaruxa Stickers - Blender python deferred material edits
+Copyright (c) 2025 Antaruxa
+--------
+"""
+
+
+from contextlib import contextmanager
+
+
+# == GLOBAL VARIABLES
+
+# the edit session open, None when the edits are applied at once
+_session = None
+
+# the edit session applying its edits, the finishers they ask for run after them
+_committing = None
+
+
+# ==== INTERNAL FUNCTIONS (AUX)
+
+class _MaterialEditSession(object):
+    """The edits queued while a sticker_material_edit block is open
+    """
+
+    def __init__(self):
+        # [(function, args, kwargs), ...] in the order they were asked
+        self.edits = []
+        # [(function, args, kwargs), ...] undoing what the block did if it fails
+        self.rollbacks = []
+        # [(function, error), ...] of the edits that failed when committed
+        self.errors = []
+        # {key: (function, args, kwargs)} run once after all the edits
+        self.finishers = {}
+        self.depth = 0
+
+    def commit(self):
+        """Applies all the queued edits in a row. Nothing between them
+        evaluates the depsgraph, the materials are compiled once afterwards.
+        An edit failing doesn't stop the others, its error is kept in errors
+        """
+        global _committing
+
+        edits, self.edits = self.edits, []
+        self.rollbacks = []
+        _committing = self
+        try:
+            self._apply(edits)
+        finally:
+            _committing = None
+        finishers, self.finishers = self.finishers, {}
+        self._apply(finishers.values())
+
+    def _apply(self, edits):
+        """Calls the edits, keeping the errors instead of stopping
+        """
+        for function, args, kwargs in edits:
+            try:
+                function(*args, **kwargs)
+            except Exception as error:
+                print(f"Sticker material edit {function.__name__} failed: {error}")
+                self.errors.append((function, error))
+
+    def rollback(self):
+        """Drops the queued edits and undoes what the block did, the last
+        done first
+        """
+        rollbacks, self.rollbacks = self.rollbacks, []
+        self.edits = []
+        self.finishers = {}
+        for function, args, kwargs in reversed(rollbacks):
+            function(*args, **kwargs)
+
+
+# ==== EXTERNAL FUNCTIONS
+
+@contextmanager
+def sticker_material_edit():
+    """Opens a block where the sticker shadernode edits are queued and applied
+    together when it ends. The blocks can be nested, the edits are applied
+    when the outermost one ends. If the block fails the queued edits are
+    dropped and the rollbacks added (see add_material_edit_rollback) are run.
+    The edits failing when they are applied are kept in the errors of the
+    session yielded
+
+    with sticker_material_edit() as session:
+        remove_sticker("a")
+        remove_sticker("b")
+    print(session.errors)
+    """
+    global _session
+    if _session is None:
+        _session = _MaterialEditSession()
+    session = _session
+    session.depth += 1
+    try:
+        yield session
+    except BaseException:
+        session.depth -= 1
+        if not session.depth:
+            _session = None
+            session.rollback()
+        raise
+    session.depth -= 1
+    if not session.depth:
+        _session = None
+        session.commit()
+
+
+def is_material_edit_open():
+    """True when the edits are being queued by a sticker_material_edit block
+    """
+    return _session is not None
+
+
+def defer_material_edit(function, *args, **kwargs):
+    """Queues a shadernode edit in the open sticker_material_edit block, or
+    applies it at once if there is no block
+    function -- the function doing the edit, called with args and kwargs
+    returns:
+    the result of the function if it is applied at once else None
+    """
+    if _session is None:
+        return function(*args, **kwargs)
+    _session.edits.append((function, args, kwargs))
+    return None
+
+
+
+def add_material_edit_rollback(function, *args, **kwargs):
+    """Adds a function undoing an edit done in the open sticker_material_edit
+    block, it is run if the block fails before its edits are applied. Nothing
+    is added if there is no block
+    function -- the function undoing the edit, called with args and kwargs
+    """
+    if _session is not None:
+        _session.rollbacks.append((function, args, kwargs))
+
+
+def defer_material_finish(key, function, *args, **kwargs):
+    """Queues a function run once after all the edits of the block, or of the
+    block being applied, are done (writing an image many edits changed). It is
+    queued once per key, the first one asked is kept. Applied at once if
+    there is no block
+    key      -- what the function finishes, e.g. ("atlas", image name)
+    function -- the function, called with args and kwargs
+    returns:
+    the result of the function if it is applied at once else None
+    """
+    session = _committing or _session
+    if session is None:
+        return function(*args, **kwargs)
+    session.finishers.setdefault(key, (function, args, kwargs))
+    return None
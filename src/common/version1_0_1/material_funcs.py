@@ -10,15 +10,39 @@ Copyright (c) 2025 Antaruxa
 """
 
 
+import os
+from string import digits
+
 import bpy
 
+
+# == GLOBAL VARIABLES
+
+# suffixes of the shadernodes every sticker has
+STICKER_NODE_SUFFIXES = ("_group", "_image", "_mapping", "_obj_coords", "_mix_node")
+
+# suffixes of the shadernodes only some stickers have
+# _combine_XYZ  -- normal node world location copied by drivers (default)
+# _empty_coords -- normal node object coordinates (driver-free stickers)
+# _subrect      -- samples a sub-rectangle of a shared image (atlas mode)
+STICKER_OPTIONAL_NODE_SUFFIXES = ("_combine_XYZ", "_empty_coords", "_subrect")
+
+STICKER_GROUP_NAME = "Sticker Group Node"
+STICKER_LOCAL_GROUP_NAME = "Sticker Group Node Local"
+SUBRECT_GROUP_NAME = "Sticker SubRect Node"
+
+# {(directory, name without number, extension): (directory mtime, scan)}
+_sequence_scan_cache = {}
+
+
 # ==== CREATING AND REMOVE NODES (AUX)
 
 
 def create_sticker_material_nodes(main_material=None, node_tree = None, 
                                   sticker_name = "sticker", obj_to_attach = "", 
                                   img_file = None, input_conn = "Base Color",
-                                  is_seq = False, is_control_anim=False, img_offset = None, img_firstframe = None):
+                                  is_seq = False, is_control_anim=False, img_offset = None, img_firstframe = None,
+                                  relayout = True, driver_free = False, lean_rig = False):
     """Creates and conects all the nodes we will need for the sticker shader
     node_tree      -- the main node tree
     sticker_name   -- the name of the sticker
@@ -28,6 +52,14 @@ def create_sticker_material_nodes(main_material=None, node_tree = None,
     is_seq         -- true if an image sequence is selected
     img_offset     -- the number of images in de sequence if it is set
     img_firstframe -- the number of the first image
+    relayout       -- if False the connected nodes are not moved to make room
+                      for the new ones (the caller moves them once for many stickers)
+    driver_free    -- if True the facing is computed from the normal node object
+                      coordinates instead of three location drivers. The normal
+                      node world matrix must be a pure translation
+    lean_rig       -- if True the sticker has only the base node: it is projected
+                      with the base node object coordinates and the facing point
+                      is read from the base node world matrix
     
     
     returns:
@@ -47,22 +79,7 @@ def create_sticker_material_nodes(main_material=None, node_tree = None,
     # if not node connected create a mix and connect it to main base color
 
     if not main_node.inputs[input_conn].links: 
-        color = main_node.inputs[input_conn].default_value
-        print(color)
-        
-        default_node = node_tree.nodes.new( type = "ShaderNodeMix")
-                
-        default_node.name = f"{sticker_name}_default_node"
-        default_node.location.x = main_node.location.x - 220
-        default_node.location.y = main_node.location.y
-        
-        default_node.data_type = 'RGBA'
-        default_node.blend_type = 'MIX'
-        default_node.clamp_factor = True
-        default_node.inputs["Factor"].default_value = 0.0
-        default_node.inputs["A"].default_value = color
-        default_node.inputs["B"].default_value = (0, 0, 0, 0)
-        node_tree.links.new(default_node.outputs["Result"], main_node.inputs[input_conn])
+        create_default_base_color_node(node_tree, sticker_name, input_conn)
 
 
     #getting the node connected to Base Color input
@@ -75,7 +92,8 @@ def create_sticker_material_nodes(main_material=None, node_tree = None,
     base_coord[1] = main_node.location.y
     #move left and right to make space for the group
 
-    moving_all_nodes_connected(main_node, -600, 450)
+    if relayout:
+        moving_all_nodes_connected(main_node, -600, 450)
 
     """ Creating and positioning the mixer to transparency
     """
@@ -98,11 +116,11 @@ def create_sticker_material_nodes(main_material=None, node_tree = None,
      
     """ Creating and positioning de magical sticker group 
     """
-    sticker_node_group_name = "Sticker Group Node"
+    sticker_node_group_name = STICKER_LOCAL_GROUP_NAME if driver_free else STICKER_GROUP_NAME
     # first check if it exists yet
     if not sticker_node_group_name in bpy.data.node_groups:
         # if it doesn't we are defining a new kind of group node
-        sticker_group_def = create_sticker_shader_group(sticker_node_group_name)
+        sticker_group_def = create_sticker_shader_group(sticker_node_group_name, local = driver_free)
     
     ## add a new group to the material node tree
     sticker_group = node_tree.nodes.new('ShaderNodeGroup')
@@ -181,37 +199,53 @@ def create_sticker_material_nodes(main_material=None, node_tree = None,
     coord_node.location.x = base_coord[0]
     coord_node.location.y = base_coord[1]
     # conecting the object to use by the coord node
-    obj_to_attach = f"{sticker_name}_projection_node"
+    if lean_rig:
+        obj_to_attach = f"{sticker_name}_base_node"
+    else:
+        obj_to_attach = f"{sticker_name}_projection_node"
     coord_node.object = bpy.data.objects[obj_to_attach]
     
-    # add the combine XYZ node coordinate1
-    
-    xyz_node = node_tree.nodes.new(type = "ShaderNodeCombineXYZ")
-    xyz_node.name = f"{sticker_name}_combine_XYZ"
-    base_coord[1] -= 300
-    xyz_node.location.x = base_coord[0]
-    xyz_node.location.y = base_coord[1]
-    # conecting the xyz node to driver object an create drivers
-    obj_who_drives = f"{sticker_name}_normal_node"
-    xyz_driver = bpy.data.objects[obj_who_drives]
-    add_driver_to_material(xyz_node, 
-                           xyz_driver, 
-                           "location.x", "loc_x", "(loc_x) + 0.0", 
-                           0, ndx = -1, 
-                           transf_type = 'LOC_X', 
-                           space = 'WORLD_SPACE')
-    add_driver_to_material(xyz_node, 
-                           xyz_driver, 
-                           "location.y", "loc_y", "(loc_y) + 0.0", 
-                           1, ndx = -1, 
-                           transf_type = 'LOC_Y', 
-                           space = 'WORLD_SPACE')
-    add_driver_to_material(xyz_node, 
-                           xyz_driver, 
-                           "location.z", "loc_z", "(loc_z) + 0.0", 
-                           2, ndx = -1, 
-                           transf_type = 'LOC_Z', 
-                           space = 'WORLD_SPACE')
+    if driver_free:
+        # the normal node object coordinates are Position - normal node location
+        empty_node = node_tree.nodes.new(type = "ShaderNodeTexCoord")
+        empty_node.name = f"{sticker_name}_empty_coords"
+        base_coord[1] -= 300
+        empty_node.location.x = base_coord[0]
+        empty_node.location.y = base_coord[1]
+        empty_node.object = bpy.data.objects[f"{sticker_name}_normal_node"]
+    else:
+        # add the combine XYZ node coordinate1
+    
+        xyz_node = node_tree.nodes.new(type = "ShaderNodeCombineXYZ")
+        xyz_node.name = f"{sticker_name}_combine_XYZ"
+        base_coord[1] -= 300
+        xyz_node.location.x = base_coord[0]
+        xyz_node.location.y = base_coord[1]
+    if lean_rig:
+        # the point the normal node would have, one unit over the base node
+        set_driven_key_for_normal_location(xyz_node, bpy.data.objects[f"{sticker_name}_base_node"])
+    elif not driver_free:
+        # conecting the xyz node to driver object an create drivers
+        obj_who_drives = f"{sticker_name}_normal_node"
+        xyz_driver = bpy.data.objects[obj_who_drives]
+        add_driver_to_material(xyz_node, 
+                               xyz_driver, 
+                               "location.x", "loc_x", "(loc_x) + 0.0", 
+                               0, ndx = -1, 
+                               transf_type = 'LOC_X', 
+                               space = 'WORLD_SPACE')
+        add_driver_to_material(xyz_node, 
+                               xyz_driver, 
+                               "location.y", "loc_y", "(loc_y) + 0.0", 
+                               1, ndx = -1, 
+                               transf_type = 'LOC_Y', 
+                               space = 'WORLD_SPACE')
+        add_driver_to_material(xyz_node, 
+                               xyz_driver, 
+                               "location.z", "loc_z", "(loc_z) + 0.0", 
+                               2, ndx = -1, 
+                               transf_type = 'LOC_Z', 
+                               space = 'WORLD_SPACE')
     
 
     """ Now we are going to make the conections
@@ -231,7 +265,10 @@ def create_sticker_material_nodes(main_material=None, node_tree = None,
     node_tree.links.new(img_node.outputs["Color"], sticker_group.inputs["Sticker Color"]) 
 
     #conectar la salida del xyz a la entrada 3 del group Empty Location
-    node_tree.links.new(xyz_node.outputs["Vector"], sticker_group.inputs["Empty Location"]) 
+    if driver_free:
+        node_tree.links.new(empty_node.outputs["Object"], sticker_group.inputs["Empty Offset"])
+    else:
+        node_tree.links.new(xyz_node.outputs["Vector"], sticker_group.inputs["Empty Location"]) 
 
     #conectar la salida vector del map node a la entrada vector del img node
     node_tree.links.new(map_node.outputs["Vector"], img_node.inputs["Vector"])
@@ -243,9 +280,42 @@ def create_sticker_material_nodes(main_material=None, node_tree = None,
     node_tree.links.new(coord_node.outputs["Object"], map_node.inputs["Vector"])
 
 
-def create_sticker_shader_group(group_name):
+def create_default_base_color_node(node_tree = None, sticker_name = "sticker", input_conn = "Base Color"):
+    """Creates a mix node holding the main Base Color value and connects it
+    to the main node, so the stickers have a node to connect to
+    node_tree    -- the main node tree
+    sticker_name -- the name of the sticker that needs it
+    input_conn   -- name of the input_connection on the base_material
+    returns:
+    default_node -- the mix node created
+    """
+
+    main_node = node_tree.nodes[0]
+    color = main_node.inputs[input_conn].default_value
+    
+    default_node = node_tree.nodes.new( type = "ShaderNodeMix")
+            
+    default_node.name = f"{sticker_name}_default_node"
+    default_node.location.x = main_node.location.x - 220
+    default_node.location.y = main_node.location.y
+    
+    default_node.data_type = 'RGBA'
+    default_node.blend_type = 'MIX'
+    default_node.clamp_factor = True
+    default_node.inputs["Factor"].default_value = 0.0
+    default_node.inputs["A"].default_value = color
+    default_node.inputs["B"].default_value = (0, 0, 0, 0)
+    node_tree.links.new(default_node.outputs["Result"], main_node.inputs[input_conn])
+
+    return default_node
+
+
+def create_sticker_shader_group(group_name, local = False):
     """Creates the sticker shader group that is doing the magic
     group_name    -- the name for this kind of group
+    local         -- if True the group gets the shading point relative to the
+                     normal node (Empty Offset) instead of the normal node
+                     world location, so it needs no drivers
     returns:
     sticker_group -- the new shader group created
     """     
@@ -263,7 +333,10 @@ def create_sticker_shader_group(group_name):
     sticker_group.interface.new_socket(name = "Base Color", in_out = 'INPUT', socket_type = 'NodeSocketColor')
     sticker_group.interface.new_socket(name = "Sticker Color", in_out = 'INPUT', socket_type = 'NodeSocketColor')
     sticker_group.interface.new_socket(name = "Alpha", in_out = 'INPUT', socket_type = 'NodeSocketFloat')
-    sticker_group.interface.new_socket(name = "Empty Location", in_out = 'INPUT', socket_type = 'NodeSocketVector')
+    if local:
+        sticker_group.interface.new_socket(name = "Empty Offset", in_out = 'INPUT', socket_type = 'NodeSocketVector')
+    else:
+        sticker_group.interface.new_socket(name = "Empty Location", in_out = 'INPUT', socket_type = 'NodeSocketVector')
  
     # Creating and set location for the output node
     group_out = sticker_group.nodes.new('NodeGroupOutput')
@@ -298,7 +371,9 @@ def create_sticker_shader_group(group_name):
     facing_node = sticker_group.nodes.new(type = 'ShaderNodeMath')
     facing_node.location = (200,-300)
     facing_node.use_clamp = True
-    facing_node.operation = 'GREATER_THAN'
+    # the local offset points from the normal node to the shading point,
+    # the opposite of the incidence vector
+    facing_node.operation = 'LESS_THAN' if local else 'GREATER_THAN'
     facing_node.inputs[1].default_value = 0  #REALLY IMPORTANT FOR SCALE
 
     # filter_mix_node ShaderNodeMixRGB - Filter by Facing (400,100) 
@@ -327,8 +402,13 @@ def create_sticker_shader_group(group_name):
     # Guardamos la operación new() para usar mas facil
     link = sticker_group.links.new
     
-    # group_in - Empty Location , vinc_node [0]
-    link(group_in.outputs["Empty Location"], vinc_node.inputs[0])
+    if local:
+        # group_in - Empty Offset, norm_node [0] (the incidence is not needed)
+        sticker_group.nodes.remove(vinc_node)
+        link(group_in.outputs["Empty Offset"], norm_node.inputs[0])
+    else:
+        # group_in - Empty Location , vinc_node [0]
+        link(group_in.outputs["Empty Location"], vinc_node.inputs[0])
 
     # group_in - Alpha - mask_mix_node - Factor
     link(group_in.outputs["Alpha"], mask_mix_node.inputs["Factor"])
@@ -342,15 +422,16 @@ def create_sticker_shader_group(group_name):
     # group_in - Base Color, mask_mix_node A
     link(group_in.outputs["Base Color"], mask_mix_node.inputs["A"])
 
-    # geo_node - Position, vinc_node [1]
-    link(geo_node.outputs["Position"], vinc_node.inputs[1])
+    if not local:
+        # geo_node - Position, vinc_node [1]
+        link(geo_node.outputs["Position"], vinc_node.inputs[1])
+
+        # vinc_node - Vector, norm_node [0]
+        link(vinc_node.outputs["Vector"], norm_node.inputs[0])
 
     # geo_node - Normal, ang_node [1]
     link(geo_node.outputs["Normal"], ang_node.inputs[0])
 
-    # vinc_node - Vector, norm_node [0]
-    link(vinc_node.outputs["Vector"], norm_node.inputs[0])
-
     # norm_node - Vector, ang_node [1]
     link(norm_node.outputs["Vector"], ang_node.inputs[1])
 
@@ -369,6 +450,135 @@ def create_sticker_shader_group(group_name):
     return sticker_group
 
 
+def create_sticker_subrect_group(group_name = SUBRECT_GROUP_NAME):
+    """Creates the group that maps the sticker coordinates into a sub-rectangle
+    of a shared image. The coordinates out of the sticker [0, 1] square are
+    sent out of the image so the CLIP extension makes them transparent
+    group_name    -- the name for this kind of group
+    returns:
+    subrect_group -- the new shader group created
+    """
+
+    subrect_group = bpy.data.node_groups.new(group_name, 'ShaderNodeTree')
+
+    group_in = subrect_group.nodes.new('NodeGroupInput')
+    group_in.location = (-800, 0)
+    subrect_group.interface.new_socket(name = "Vector", in_out = 'INPUT', socket_type = 'NodeSocketVector')
+    subrect_group.interface.new_socket(name = "Offset", in_out = 'INPUT', socket_type = 'NodeSocketVector')
+    size_socket = subrect_group.interface.new_socket(name = "Size", in_out = 'INPUT', socket_type = 'NodeSocketVector')
+    size_socket.default_value = (1.0, 1.0, 1.0)
+
+    group_out = subrect_group.nodes.new('NodeGroupOutput')
+    group_out.location = (600, 0)
+    subrect_group.interface.new_socket(name = "Vector", in_out = 'OUTPUT', socket_type = 'NodeSocketVector')
+
+    # one_minus_node - (1, 1, 1) - Vector
+    one_minus_node = subrect_group.nodes.new(type = 'ShaderNodeVectorMath')
+    one_minus_node.location = (-550, -200)
+    one_minus_node.operation = 'SUBTRACT'
+    one_minus_node.inputs[0].default_value = (1.0, 1.0, 1.0)
+
+    # min_node - distance to the nearest border (negative when out)
+    min_node = subrect_group.nodes.new(type = 'ShaderNodeVectorMath')
+    min_node.location = (-300, -200)
+    min_node.operation = 'MINIMUM'
+
+    sep_node = subrect_group.nodes.new(type = 'ShaderNodeSeparateXYZ')
+    sep_node.location = (-100, -200)
+
+    min_xy_node = subrect_group.nodes.new(type = 'ShaderNodeMath')
+    min_xy_node.location = (100, -200)
+    min_xy_node.operation = 'MINIMUM'
+
+    # inside_node - 1 inside the sticker square, 0 out
+    inside_node = subrect_group.nodes.new(type = 'ShaderNodeMath')
+    inside_node.location = (250, -200)
+    inside_node.operation = 'GREATER_THAN'
+    inside_node.inputs[1].default_value = 0.0
+
+    # remap_node - Vector * Size + Offset
+    remap_node = subrect_group.nodes.new(type = 'ShaderNodeVectorMath')
+    remap_node.location = (100, 100)
+    remap_node.operation = 'MULTIPLY_ADD'
+
+    # out_mix_node - out of the image if it isn't inside
+    out_mix_node = subrect_group.nodes.new(type = 'ShaderNodeMix')
+    out_mix_node.location = (400, 0)
+    out_mix_node.data_type = 'VECTOR'
+    out_mix_node.clamp_factor = True
+    out_mix_node.inputs[4].default_value = (-1.0, -1.0, 0.0) # A vector
+
+    link = subrect_group.links.new
+    link(group_in.outputs["Vector"], one_minus_node.inputs[1])
+    link(group_in.outputs["Vector"], min_node.inputs[0])
+    link(one_minus_node.outputs["Vector"], min_node.inputs[1])
+    link(min_node.outputs["Vector"], sep_node.inputs["Vector"])
+    link(sep_node.outputs["X"], min_xy_node.inputs[0])
+    link(sep_node.outputs["Y"], min_xy_node.inputs[1])
+    link(min_xy_node.outputs["Value"], inside_node.inputs[0])
+    link(group_in.outputs["Vector"], remap_node.inputs[0])
+    link(group_in.outputs["Size"], remap_node.inputs[1])
+    link(group_in.outputs["Offset"], remap_node.inputs[2])
+    link(inside_node.outputs["Value"], out_mix_node.inputs["Factor"])
+    link(remap_node.outputs["Vector"], out_mix_node.inputs[5]) # B vector
+    link(out_mix_node.outputs[1], group_out.inputs["Vector"]) # Result vector
+
+    return subrect_group
+
+
+def insert_sticker_subrect_node(node_tree = None, sticker_name = "sticker", offset = (0.0, 0.0), size = (1.0, 1.0)):
+    """Inserts the sticker _subrect node between its mapping and image nodes
+    or updates it if it exists
+    node_tree    -- the main node tree
+    sticker_name -- the name of the sticker
+    offset       -- the (x, y) corner of the sub-rectangle in the image [0, 1]
+    size         -- the (width, height) of the sub-rectangle in the image [0, 1]
+    returns:
+    subrect_node -- the group node
+    """
+
+    subrect_node = node_tree.nodes.get(f"{sticker_name}_subrect")
+    if subrect_node is None:
+        if not SUBRECT_GROUP_NAME in bpy.data.node_groups:
+            create_sticker_subrect_group(SUBRECT_GROUP_NAME)
+
+        map_node = node_tree.nodes[f"{sticker_name}_mapping"]
+        img_node = node_tree.nodes[f"{sticker_name}_image"]
+
+        subrect_node = node_tree.nodes.new('ShaderNodeGroup')
+        subrect_node.name = f"{sticker_name}_subrect"
+        subrect_node.node_tree = bpy.data.node_groups[SUBRECT_GROUP_NAME]
+        subrect_node.location.x = map_node.location.x
+        subrect_node.location.y = map_node.location.y - 400
+
+        node_tree.links.new(map_node.outputs["Vector"], subrect_node.inputs["Vector"])
+        node_tree.links.new(subrect_node.outputs["Vector"], img_node.inputs["Vector"])
+
+    subrect_node.inputs["Offset"].default_value = (offset[0], offset[1], 0.0)
+    subrect_node.inputs["Size"].default_value = (size[0], size[1], 1.0)
+    return subrect_node
+
+
+def set_sticker_mapping_trim(node_tree = None, sticker_name = "sticker", offset = (0.0, 0.0), size = (1.0, 1.0)):
+    """Compensates in the sticker _mapping node the crop of a trimmed image,
+    the sticker covers the same place of the surface as the whole image
+    node_tree    -- the main node tree
+    sticker_name -- the name of the sticker
+    offset       -- the (x, y) corner of the crop in the original image [0, 1]
+    size         -- the (width, height) of the crop in the original image [0, 1]
+    returns:
+    map_node     -- the mapping node
+    """
+
+    map_node = node_tree.nodes[f"{sticker_name}_mapping"]
+    # (R(p) + 0.5 - offset) / size == R(p / size) + (0.5 - offset) / size
+    map_node.inputs["Location"].default_value[0] = (0.5 - offset[0]) / size[0]
+    map_node.inputs["Location"].default_value[1] = (0.5 - offset[1]) / size[1]
+    map_node.inputs["Scale"].default_value[0] = 1.0 / size[0]
+    map_node.inputs["Scale"].default_value[1] = 1.0 / size[1]
+    return map_node
+
+
 def remove_all_the_nodes_from_sticker(sticker_name, material, node_name_list, select = False):
     """Once disconnected remove all the shader nodes for this sticker
     sticker_name   -- the name of the sticker
@@ -420,7 +630,7 @@ def remove_all_the_nodes_from_sticker(sticker_name, material, node_name_list, se
 #     node = node_tree.nodes[0]
     
 #     node.name = f"{mat_name}_BSDRF"
-#     select_all_nodes_connected(node, nodelist)
+#     nodelist.extend(get_upstream_nodes(node))
 #     for nod in reversed(nodelist):
 #         mat_copy.node_tree.nodes.remove(nod)
 
@@ -582,6 +792,62 @@ def set_driven_key_for_mapping_rotateZ(node = None, obj = None):
     driver.driver.expression = "radians(-(rotz)) + 0.0"
 
 
+def set_driven_key_for_normal_location(node = None, obj = None):
+
+    ''' Add the combine XYZ node drivers with the world location of the point
+        one unit over the base node along its Z axis (where the normal node is
+        in the full rig), read from the base node world matrix. The RNA path
+        indexes the matrix column first: matrix_world[3] is the location and
+        matrix_world[2] the Z axis
+        node -- the combine XYZ node
+        obj  -- the target object "driver_obj" (base_node)
+    '''
+
+    for ndx in range(3):
+        driver = node.inputs[ndx].driver_add("default_value")
+
+        axis = driver.driver.variables.new()
+        axis.name = "axis"
+        axis.type = 'SINGLE_PROP'
+        axis.targets[0].id_type = 'OBJECT'
+        axis.targets[0].id = obj
+        axis.targets[0].data_path = f"matrix_world[2][{ndx}]"
+
+        loc = driver.driver.variables.new()
+        loc.name = "loc"
+        loc.type = 'SINGLE_PROP'
+        loc.targets[0].id_type = 'OBJECT'
+        loc.targets[0].id = obj
+        loc.targets[0].data_path = f"matrix_world[3][{ndx}]"
+        driver.driver.expression = "loc + axis"
+
+
+def set_driven_key_for_sprite_cell(node = None, obj = None, columns = 1, rows = 1):
+
+    ''' Add the drivers to the _subrect node Offset to show the sprite sheet
+        cell of the active_frame (1 is the top left cell)
+        node    -- the _subrect node
+        obj     -- the target object "driver_obj" (base_node)
+        columns -- number of columns of the sheet
+        rows    -- number of rows of the sheet
+    '''
+
+    expressions = (
+        f"fmod(frame - 1, {columns}) / {columns}",
+        f"({rows} - 1 - floor((frame - 1) / {columns})) / {rows}",
+    )
+    for ndx, expression in enumerate(expressions):
+        driver = node.inputs["Offset"].driver_add("default_value", ndx)
+
+        frame = driver.driver.variables.new()
+        frame.name = "frame"
+        frame.type = 'SINGLE_PROP'
+        frame.targets[0].id_type = 'OBJECT'
+        frame.targets[0].id = obj
+        frame.targets[0].data_path = "active_frame"
+        driver.driver.expression = expression
+
+
 # ==== IMAGE SEQUENCE FUNCTIONS (AUX)
 
 def has_numbers(inputString):
@@ -592,6 +858,75 @@ def has_numbers(inputString):
     import re
     return bool(re.search(r'\d', inputString))
 
+def scan_image_sequence(filepath):
+
+    ''' Lists the directory of an image sequence once and gets all its data.
+        Only the trailing digits of the names are the frame number. The result
+        is cached by directory, name and directory mtime, so a second scan of
+        an unchanged directory doesn't touch the disk but for a stat
+        filepath  -- the path to one of the images in the sequence must have a number before extension
+    returns:
+        None if the name has no number, else a dict with
+        files       -- the paths of the images sorted by frame number
+        frames      -- the sorted frame numbers
+        count       -- the number of images
+        first, last -- the first and last frame numbers (None if no images)
+        gaps        -- the missing frame numbers between first and last
+        padding     -- the digits of the numbers, None if they are mixed
+        consecutive -- True if there are images and no gaps
+    '''
+    basedir, filename = os.path.split(filepath)
+    filename_noext, ext = os.path.splitext(filename)
+    filename_nodigits = filename_noext.rstrip(digits)
+
+    if len(filename_nodigits) == len(filename_noext):
+        # input isn't from a sequence
+        return None
+
+    basedir = basedir or "."
+    try:
+        mtime = os.stat(basedir).st_mtime_ns
+    except OSError:
+        return None
+
+    key = (os.path.abspath(basedir), filename_nodigits, ext)
+    cached = _sequence_scan_cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    found = {}
+    paddings = set()
+    start, end = len(filename_nodigits), -len(ext) if ext else None
+    with os.scandir(basedir) as entries:
+        for entry in entries:
+            name = entry.name
+            if not (name.startswith(filename_nodigits) and name.endswith(ext)):
+                continue
+            number = name[start:end]
+            if not number.isdigit() or not entry.is_file():
+                continue
+            found[int(number)] = entry.path
+            paddings.add(len(number))
+
+    frames = sorted(found)
+    gaps = []
+    if frames:
+        present = set(frames)
+        gaps = [frame for frame in range(frames[0], frames[-1] + 1) if frame not in present]
+
+    scan = {
+        "files": [found[frame] for frame in frames],
+        "frames": frames,
+        "count": len(frames),
+        "first": frames[0] if frames else None,
+        "last": frames[-1] if frames else None,
+        "gaps": gaps,
+        "padding": paddings.pop() if len(paddings) == 1 else None,
+        "consecutive": bool(frames) and not gaps,
+    }
+    _sequence_scan_cache[key] = (mtime, scan)
+    return scan
+
 def check_image_file_sequence(image_name):
 
     ''' Check if the selected image belongs to a sequence
@@ -599,75 +934,34 @@ def check_image_file_sequence(image_name):
     returns:
         len(imagelist) -- the number of images in the sequence
         firstframe     -- the firstframe number of the images
+        consecutive    -- True if the images have consecutive numbers
     '''     
-    if not has_numbers(image_name):
+    scan = scan_image_sequence(image_name)
+    if not scan or not scan["count"]:
         return None, None, None
-    imagelist = image_sequence_resolve_all(image_name)
-    firstframe = image_sequence_get_first_frame(image_name)
-    consecutive = check_if_images_in_sequence_are_consecutive(image_name)
-    if not imagelist:
-        return None, None, None
-    else:
-        return len(imagelist), firstframe, consecutive
+    return scan["count"], scan["first"], scan["consecutive"]
 
 def image_sequence_resolve_all(filepath):
     
     ''' Gets de list of images in a sequence
         filepath  -- the path to one of the images in the sequence must have a number before extension
     returns:
-        the list of images in the sequence
+        the list of images in the sequence sorted by frame number
     '''    
-    import os
-
-    basedir, filename = os.path.split(filepath)
-    filename_noext, ext = os.path.splitext(filename)
-
-    from string import digits
-    if isinstance(filepath, bytes):
-        digits = digits.encode()
-    filename_nodigits = filename_noext.rstrip(digits)
-
-    if len(filename_nodigits) == len(filename_noext):
-        # input isn't from a sequence
-        return []
-
-    return [
-        f.path
-        for f in os.scandir(basedir)
-        if f.is_file() and
-           f.name.startswith(filename_nodigits) and
-           f.name.endswith(ext) and
-           f.name[len(filename_nodigits):-len(ext) if ext else -1].isdigit()
-    ]
+    scan = scan_image_sequence(filepath)
+    return list(scan["files"]) if scan else []
     
 def image_sequence_get_first_frame(filepath):
     ''' Returns the first frame computing the numerical extensions in a file sequence
         filepath       -- the path to one of the images in the sequence must have a number before extension
     returns:
-        the firstframe number 
+        the firstframe number, -2 if the name has no number, -1 if there are no images
     '''    
-    import os
-
-    basedir, filename = os.path.split(filepath)
-    filename_noext, ext = os.path.splitext(filename)
-
-    from string import digits
-    if isinstance(filepath, bytes):
-        digits = digits.encode()
-    filename_nodigits = filename_noext.rstrip(digits)
-
-    if len(filename_nodigits) == len(filename_noext):
+    scan = scan_image_sequence(filepath)
+    if scan is None:
         # input isn't from a sequence
         return -2
-    
-    contador = []
-    for f in os.scandir(basedir):
-        if f.is_file() and f.name.startswith(filename_nodigits) and f.name.endswith(ext):
-            contador.append(int(''.join(filter(lambda i: i.isdigit(), f.name))))        
-    if contador:
-        return (min(contador))
-    else:
-        return -1
+    return scan["first"] if scan["count"] else -1
 
 def check_if_images_in_sequence_are_consecutive(filepath):
     ''' check if the images are consecutive frames
@@ -675,28 +969,8 @@ def check_if_images_in_sequence_are_consecutive(filepath):
     returns:
         True if the images are consecutive
     '''    
-    import os
-
-    basedir, filename = os.path.split(filepath)
-    filename_noext, ext = os.path.splitext(filename)
-
-    from string import digits
-    if isinstance(filepath, bytes):
-        digits = digits.encode()
-    filename_nodigits = filename_noext.rstrip(digits)
-
-    if len(filename_nodigits) == len(filename_noext):
-        # input isn't from a sequence
-        return False
-    
-    contador = []
-    for f in os.scandir(basedir):
-        if f.is_file() and f.name.startswith(filename_nodigits) and f.name.endswith(ext):
-            contador.append(int(''.join(filter(lambda i: i.isdigit(), f.name))))        
-    if contador:
-        return sorted(contador) == list(range(min(contador), max(contador)+1))
-    else:
-        return False
+    scan = scan_image_sequence(filepath)
+    return bool(scan) and scan["consecutive"]
 
 
 # ==== SHADERNODES FUNCTIONS (AUX) - GETTERS AND SETTERS
@@ -792,26 +1066,68 @@ def get_node_connected_to_output(node = None, outputkey = "Base Color"):
     return to_node
 
 
-def select_all_nodes_connected(node_in, nodelist):
-    """Auxiliar to create_material_for_sticker_plane. Dectects inputs in a node 
-    and add de nodes_form to node list recursively
-    
-    node_in  -- node to evaulate
-    nodelist -- list to add the inputs nodes to delete
+def get_upstream_links_index(node_tree):
+    """Builds an index of the node links by destination node. It walks
+    node_tree.links once, so the upstream queries don't need to ask every
+    socket for its links (each socket.links lookup scans the whole tree)
+
+    node_tree -- the node_tree to index
 
     returns:
-    a list of nodes to delete in nodelist
-    """ 
-    for n_inputs in node_in.inputs:
-        for node_links in n_inputs.links:
-            current_node = node_links.from_node
-            print(f"going from {node_in.name} to {current_node.name}")
-            if not (current_node in nodelist):            
-                nodelist.append(current_node)
-            else:
-                print("It's repeated!!")
-            select_all_nodes_connected(current_node, nodelist)
-   
+    a dict {to_node_name: [from_node, ...]} to use with get_upstream_nodes
+    """
+    links_index = {}
+    for link in node_tree.links:
+        links_index.setdefault(link.to_node.name, []).append(link.from_node)
+    return links_index
+
+
+def get_upstream_nodes(node_in, links_index = None):
+    """Gets all the nodes connected (directly or not) to the inputs of node_in.
+    Every node is visited only once and the graph is walked with an explicit
+    stack, so the cost is linear in nodes and links whatever the stack depth
+
+    node_in     -- node to evaluate
+    links_index -- the index returned by get_upstream_links_index. Build it once
+                   and pass it along when doing several queries on the same tree
+
+    returns:
+    the list of upstream nodes (node_in not included) in depth-first order
+    """
+    if links_index is None:
+        links_index = get_upstream_links_index(node_in.id_data)
+
+    nodelist = []
+    visited = {node_in.name}
+    stack = [node_in]
+    while stack:
+        current = stack.pop()
+        from_nodes = links_index.get(current.name, [])
+        # reversed to keep the same order as the inputs are visited
+        for from_node in reversed(from_nodes):
+            if from_node.name in visited:
+                continue
+            visited.add(from_node.name)
+            nodelist.append(from_node)
+            stack.append(from_node)
+    return nodelist
+
+
+def get_sticker_shader_node_names(sticker_name, node_tree = None):
+    """Gets the names of the shadernodes that belong to the sticker
+    sticker_name -- the name of the sticker
+    node_tree    -- if given, the optional nodes the sticker has in it are added
+    returns:
+    the list of node names
+    """
+
+    names = [f"{sticker_name}{suffix}" for suffix in STICKER_NODE_SUFFIXES]
+    if node_tree is not None:
+        for suffix in STICKER_OPTIONAL_NODE_SUFFIXES:
+            if f"{sticker_name}{suffix}" in node_tree.nodes:
+                names.append(f"{sticker_name}{suffix}")
+    return names
+
 
 def get_all_shader_nodes_from_a_sticker(node_tree, sticker_name, select = False):
 
@@ -822,8 +1138,7 @@ def get_all_shader_nodes_from_a_sticker(node_tree, sticker_name, select = False)
     True or False
     """   
     
-    sticker_shader_nodes = [f"{sticker_name}_group", f"{sticker_name}_image", f"{sticker_name}_mapping",
-                            f"{sticker_name}_obj_coords", f"{sticker_name}_combine_XYZ", f"{sticker_name}_mix_node", ]
+    sticker_shader_nodes = get_sticker_shader_node_names(sticker_name, node_tree)
     selected_stickers = []
     for stick in sticker_shader_nodes:
         node = node_tree.nodes[stick]
@@ -871,6 +1186,30 @@ def get_near_up_stickernode(material = None, sticker_name = ""):
             return node
     return None
             
+def get_sticker_stack(material = None, sticker_name = ""):
+
+    """Gets the stickers of the mix chain where the sticker is connected
+    material     -- material where the sticker nodes are
+    sticker_name -- the name of a sticker of the chain
+    returns:
+    the list of sticker names from the downmost to the topmost
+    """
+
+    below = []
+    node = get_near_down_stickernode(material, sticker_name)
+    while node:
+        below.append(node.name.replace("_mix_node", ""))
+        node = get_near_down_stickernode(material, below[-1])
+
+    above = []
+    node = get_near_up_stickernode(material, sticker_name)
+    while node:
+        above.append(node.name.replace("_mix_node", ""))
+        node = get_near_up_stickernode(material, above[-1])
+
+    return below[::-1] + [sticker_name] + above
+
+            
 # ==== SHADERNODES FUNCTIONS (AUX) - CHECKERS
 
 def check_if_is_there_a_node_connected(node = None, inputkey = "Base Color"):
@@ -978,6 +1317,63 @@ def disconnect_sticker_material(sticker_name, material):
     #https://blender.stackexchange.com/questions/141911/remove-node-links-by-python
 
 
+def splice_out_stickers(material = None, sticker_names = (), relayout = True):
+    """Takes many stickers out of their mix chains in a single pass. Each
+    sticker that stays is linked to the nearest one below that stays, so a run
+    of removed stickers costs 2 link edits whatever its length. The stickers
+    below move up a slot per removed sticker above them. The removed sticker
+    nodes are left in the node tree
+    material      -- the material where the stickers are connected
+    sticker_names -- the names of the stickers to take out
+    relayout      -- if False the stickers below are not moved
+    returns:
+    the number of link edits
+    """
+
+    node_tree = material.node_tree
+    nodes = node_tree.nodes
+    links = node_tree.links
+
+    removed = set(sticker_names)
+    pending = set(removed)
+    edits = 0
+    while pending:
+        stack = get_sticker_stack(material, pending.pop())
+        pending.difference_update(stack)
+
+        below_socket = nodes[f"{stack[0]}_mix_node"].inputs["B"].links[0].from_socket
+        base_node = below_socket.node
+        gap = False
+        for name in stack:
+            if name in removed:
+                gap = True
+                continue
+            if gap:
+                links.new(below_socket, nodes[f"{name}_mix_node"].inputs["B"])
+                links.new(below_socket, nodes[f"{name}_group"].inputs["Base Color"])
+                edits += 2
+                gap = False
+            below_socket = nodes[f"{name}_mix_node"].outputs["Result"]
+        # the topmost was removed, what stays below feeds the main node
+        if gap:
+            for link in list(nodes[f"{stack[-1]}_mix_node"].outputs["Result"].links):
+                links.new(below_socket, link.to_socket)
+                edits += 1
+
+        if not relayout:
+            continue
+        # a slot up is (600, -450)
+        above = 0
+        for name in reversed(stack):
+            if name in removed:
+                above += 1
+            elif above:
+                moving_all_nodes_from_a_sticker(node_tree, name, 600 * above, -450 * above, False)
+        if above:
+            moving_all_nodes_connected(base_node, 600 * above, -450 * above)
+    return edits
+
+
 
 def interchange_sticker_connections_and_positions(material = None, sticker_name = "", up=False):
     """Switchs positions between to stickers
@@ -1058,6 +1454,67 @@ def interchange_sticker_connections_and_positions(material = None, sticker_name
         moving_all_nodes_from_a_sticker(node_tree, sticker_name, -600, 450, True) #up node
        
         
+def move_sticker_to_position(material = None, sticker_name = "", position = -1):
+    """Moves the sticker to any position of its mix chain. The sticker is taken
+    out and spliced in at the new position with at most 6 link edits, whatever
+    the distance. Only the locations of the stickers passed over change
+    material     -- the material where the sticker is connected
+    sticker_name -- the name of the sticker to move
+    position     -- 0 is the downmost, negative values count from the topmost (-1)
+    returns:
+    True if the sticker was moved, False if it was at that position yet
+    """
+
+    node_tree = material.node_tree
+    nodes = node_tree.nodes
+    links = node_tree.links
+
+    stack = get_sticker_stack(material, sticker_name)
+    current = stack.index(sticker_name)
+    if position < 0:
+        position += len(stack)
+    position = max(0, min(len(stack) - 1, position))
+    if position == current:
+        return False
+
+    mix_node = nodes[f"{sticker_name}_mix_node"]
+    group_node = nodes[f"{sticker_name}_group"]
+
+    # taking the sticker out, what is below feeds what was above it
+    below_socket = mix_node.inputs["B"].links[0].from_socket
+    for link in list(mix_node.outputs["Result"].links):
+        links.new(below_socket, link.to_socket)
+
+    # the neighbours at the new position
+    rest = [name for name in stack if name != sticker_name]
+    if position > 0:
+        lower_socket = nodes[f"{rest[position - 1]}_mix_node"].outputs["Result"]
+    else:
+        lower_socket = nodes[f"{rest[0]}_mix_node"].inputs["B"].links[0].from_socket
+    if position < len(rest):
+        upper_sockets = [nodes[f"{rest[position]}_mix_node"].inputs["B"],
+                         nodes[f"{rest[position]}_group"].inputs["Base Color"]]
+    else:
+        upper_sockets = [link.to_socket for link in nodes[f"{rest[-1]}_mix_node"].outputs["Result"].links]
+
+    # splicing it in
+    links.new(lower_socket, mix_node.inputs["B"])
+    links.new(lower_socket, group_node.inputs["Base Color"])
+    for socket in upper_sockets:
+        links.new(mix_node.outputs["Result"], socket)
+
+    # a slot up is (600, -450), the stickers passed over move a slot the other way
+    step = position - current
+    sign = 1 if step > 0 else -1
+    passed = stack[current + 1:position + 1] if step > 0 else stack[position:current]
+    for node in nodes:
+        node.select = False
+    for name in passed:
+        moving_all_nodes_from_a_sticker(node_tree, name, -600 * sign, 450 * sign, False)
+    moving_all_nodes_from_a_sticker(node_tree, sticker_name, 600 * step, -450 * step, True)
+    return True
+
+
 def moving_all_nodes_from_a_sticker(node_tree, sticker_name, offset_X, offset_Y, select = False):
     """ moving all the nodes conected to a node_in 
     node_tree  -- the node_tree where the nodes to mov are
@@ -1078,28 +1535,20 @@ def moving_all_nodes_from_a_sticker(node_tree, sticker_name, offset_X, offset_Y,
         nod.select = select
 
  
-def moving_all_nodes_connected(node_in, offset_X, offset_Y):
+def moving_all_nodes_connected(node_in, offset_X, offset_Y, links_index = None):
     """ moving all the nodes conected to a node_in 
-    node_in  -- the node where the other nodes are connected in
-    offset_X -- the offsetX to move (positive or negative)
-    offset_Y -- the offsetY to move (positive or negative)
+    node_in     -- the node where the other nodes are connected in
+    offset_X    -- the offsetX to move (positive or negative)
+    offset_Y    -- the offsetY to move (positive or negative)
+    links_index -- optional index from get_upstream_links_index to reuse
     result:
     the nodes are moved
     """
 
-    # Eliminamos todas las conexiones y nodos
-    node = node_in
-    
-    nodelist=[]
-    
-    select_all_nodes_connected(node, nodelist)
+    nodelist = get_upstream_nodes(node_in, links_index)
     for nod in reversed(nodelist):
         final_X = nod.location.x + offset_X
         final_Y = nod.location.y + offset_Y
         nod.location.x = final_X
         nod.location.y = final_Y
         nod.select = True  
-
-
-
-
@@ -0,0 +1,174 @@
+"""
+[Blender and Python] Texture memory library for Stickers Antaruxa
+Juan R Nouche - January 2025
+Email: juan.nouche@antaruxa.com
+A Blender python functions library to report the memory used by the
+sticker images and fit them into a budget
+Antaruxa Stickers - Blender python texture memory library
+Copyright (c) 2025 Antaruxa
+--------
+"""
+
+
+import bpy
+
+from stickers_blender.common.version1_0_1.material_funcs import (
+    get_sticker_shader_node_names,
+    scan_image_sequence,
+)
+from stickers_blender.common.version1_0_1.atlas_funcs import get_material_atlas_image
+from stickers_blender.common.version1_0_1.image_funcs import (
+    HASH_PROPERTY,
+    HASH_SOURCE_PROPERTY,
+    read_image_pixels,
+    write_image_pixels,
+)
+from stickers_blender.common.version1_0_1.proxy_funcs import PROXY_OF_PROPERTY
+from stickers_blender.common.version1_0_1.sticker_registry import get_all_stickers
+
+
+# == GLOBAL VARIABLES
+
+# the last report made, drawn by the panel
+_last_report = None
+
+
+# ==== INTERNAL FUNCTIONS (AUX)
+
+def _get_frame_count(image):
+    if image.source != 'SEQUENCE':
+        return 1
+    scan = scan_image_sequence(bpy.path.abspath(image.filepath, library = image.library))
+    return scan["count"] if scan and scan["count"] else 1
+
+
+def _convert_to_8_bit(image):
+    """Replaces a float image by an 8 bit one with the same pixels
+    returns:
+    the new image
+    """
+    width, height = image.size
+    pixels = read_image_pixels(image)
+    byte_image = bpy.data.images.new(f"{image.name}_8bit", width, height, alpha = True, float_buffer = False)
+    byte_image.colorspace_settings.name = image.colorspace_settings.name
+    byte_image.alpha_mode = image.alpha_mode
+    write_image_pixels(byte_image, pixels)
+    for key in image.keys():
+        if key not in (HASH_PROPERTY, HASH_SOURCE_PROPERTY):
+            byte_image[key] = image[key]
+    image.user_remap(byte_image)
+    name = image.name
+    bpy.data.images.remove(image)
+    byte_image.name = name
+    return byte_image
+
+
+# ==== EXTERNAL FUNCTIONS
+
+def get_image_memory_info(image):
+    """Gets the size data of an image. Blender keeps the decoded pixels as
+    RGBA, 1 byte per channel or 4 if float, whatever the file channels
+    image -- the image datablock
+    returns:
+    dict with name, width, height, channels, bit_depth (per channel), frames,
+    packed_size and decoded_size (bytes, all the frames of a sequence)
+    """
+    width, height = image.size
+    channels = image.channels
+    frames = _get_frame_count(image)
+    frame_size = width * height * 4 * (4 if image.is_float else 1)
+    return {
+        "name": image.name,
+        "width": width,
+        "height": height,
+        "channels": channels,
+        "bit_depth": image.depth // channels if channels else 0,
+        "frames": frames,
+        "packed_size": image.packed_file.size if image.packed_file else 0,
+        "decoded_size": frame_size * frames,
+    }
+
+
+def get_sticker_memory_report(scene = None):
+    """Lists the images used by the stickers, each image attributed to the
+    stickers whose image node uses it (see get_sticker_shader_node_names)
+    scene -- the scene owning the sticker registry (current scene if None)
+    returns:
+    dict with images {image name: info with stickers and materials},
+    materials {material name: decoded bytes}, total (decoded bytes) and
+    packed (bytes), an image used by many stickers is counted once
+    """
+    images = {}
+    materials = {}
+    for sticker_name, handles in get_all_stickers(scene).items():
+        material = handles.get("material")
+        if material is None or material.node_tree is None:
+            continue
+        nodes = material.node_tree.nodes
+        for node_name in get_sticker_shader_node_names(sticker_name, material.node_tree):
+            image = getattr(nodes.get(node_name), "image", None)
+            if image is None:
+                continue
+            info = images.get(image.name)
+            if info is None:
+                info = images[image.name] = get_image_memory_info(image)
+                info["stickers"] = []
+                info["materials"] = []
+            info["stickers"].append(sticker_name)
+            if material.name not in info["materials"]:
+                info["materials"].append(material.name)
+                materials[material.name] = materials.get(material.name, 0) + info["decoded_size"]
+
+    report = {
+        "images": images,
+        "materials": materials,
+        "total": sum(info["decoded_size"] for info in images.values()),
+        "packed": sum(info["packed_size"] for info in images.values()),
+    }
+    global _last_report
+    _last_report = report
+    return report
+
+
+def get_last_memory_report():
+    """Gets the last report made by get_sticker_memory_report or None
+    """
+    return _last_report
+
+
+def fit_sticker_images_to_budget(budget, scene = None):
+    """Makes the still sticker images that use more memory than the budget
+    smaller: the float images are converted to 8 bit and then the size is
+    halved until they fit, and they are packed. The atlas images, the proxies
+    and the sequences are not changed
+    budget -- max decoded bytes of an image
+    scene  -- the scene owning the sticker registry (current scene if None)
+    returns:
+    list of (image name, bytes before, bytes after)
+    """
+    atlases = {get_material_atlas_image(handles["material"])
+               for handles in get_all_stickers(scene).values() if handles.get("material")}
+
+    changed = []
+    for name, info in get_sticker_memory_report(scene)["images"].items():
+        image = bpy.data.images.get(name)
+        if info["decoded_size"] <= budget or image is None or image in atlases:
+            continue
+        if image.source not in ('FILE', 'GENERATED') or image.get(PROXY_OF_PROPERTY):
+            continue
+
+        if image.is_float:
+            image = _convert_to_8_bit(image)
+        width, height = image.size
+        while width * height * 4 > budget and min(width, height) > 1:
+            width, height = max(1, width // 2), max(1, height // 2)
+        if (width, height) != tuple(image.size):
+            image.scale(width, height)
+            image.pack()
+            # the content is not the one of the file anymore
+            if HASH_PROPERTY in image:
+                del image[HASH_PROPERTY]
+        changed.append((name, info["decoded_size"], get_image_memory_info(image)["decoded_size"]))
+
+    get_sticker_memory_report(scene)
+    return changed
@@ -0,0 +1,212 @@
+"""
+[Blender and Python] Stage timing for Stickers Antaruxa
+Juan R Nouche - January 2025
+Email: juan.nouche@antaruxa.com
+Times the stages of the sticker creation and the shadernode functions
+and writes them as a Chrome trace (chrome://tracing, Perfetto). While it
+is disabled the functions are the original ones, there is no overhead
+Antaruxa Stickers - Blender python stage timing
+Copyright (c) 2025 Antaruxa
+--------
+"""
+
+
+import os
+import sys
+import json
+import time
+import inspect
+import threading
+import functools
+import importlib
+
+import bpy
+
+
+# == GLOBAL VARIABLES
+
+# environment variable enabling the profiling when the add-on is registered,
+# "1" or the path of the trace file
+PROFILE_ENV = "STICKERS_PROFILE"
+
+DEFAULT_TRACE_FILE = "//sticker_trace.json"
+
+# stages shown in the summary
+SUMMARY_STAGES = 5
+
+_PACKAGE = __name__.rpartition(".")[0]
+
+# {module: function names timed, None for all the functions of the module}
+PROFILED_FUNCTIONS = {
+    "material_funcs": None,
+    "sticker_funcs": ("get_selected_vertices", "create_custom_circle", "create_empty",
+                      "create_constraint_to_object", "set_driven_key_for_scaleX_and_scaleY",
+                      "get_sticker_collection"),
+    "image_funcs": ("hash_image_file", "store_image_in_cache", "load_image_deduplicated",
+                    "trim_image_files"),
+    "atlas_funcs": ("add_sticker_to_atlas", "remove_stickers_from_atlas"),
+    "sprite_sheet_funcs": ("build_sprite_sheet",),
+    "surface_binding": ("bind_sticker_to_surface",),
+    "sticker_registry": ("register_sticker",),
+    "sticker_class": ("remove_stickers", "remove_stickers_shadernodes"),
+}
+
+# Sticker methods timed, the stages of create_sticker
+PROFILED_METHODS = (
+    "create_sticker",
+    "set_object_mode",
+    "build_sticker",
+    "create_and_parent_base_sticker_node",
+    "create_and_parent_calcnormal_node",
+    "create_projection_empty_and_parent",
+    "trim_sticker_image",
+    "load_sticker_image",
+    "create_sticker_shadernodes",
+)
+
+_enabled = False
+_trace_file = None
+# [(owner, attribute name, original value), ...] to undo the patching
+_patched = []
+# [(stage, start, duration, thread id), ...] since the last trace written
+_events = []
+
+
+# ==== INTERNAL FUNCTIONS (AUX)
+
+def _timed(function, stage):
+    """Wraps a function to record its wall time
+    """
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _events.append((stage, start, time.perf_counter() - start, threading.get_ident()))
+    return timed
+
+
+def _get_trace_path(filepath):
+    filepath = filepath or _trace_file or DEFAULT_TRACE_FILE
+    if filepath.startswith("//") and not bpy.data.filepath:
+        # the .blend is not saved, there is no folder to be relative to
+        return os.path.join(bpy.app.tempdir, filepath[2:])
+    return bpy.path.abspath(filepath)
+
+
+# ==== EXTERNAL FUNCTIONS
+
+def is_profiling_enabled():
+    return _enabled
+
+
+def enable_profiling(trace_file = None):
+    """Replaces the profiled functions and Sticker methods by timed ones, in
+    their module and in every add-on module that imported them
+    trace_file -- where write_profile_trace writes by default
+    """
+    global _enabled, _trace_file
+    _trace_file = trace_file or _trace_file
+    if _enabled:
+        return
+
+    timed = {}
+    for short_name, names in PROFILED_FUNCTIONS.items():
+        module = importlib.import_module(f"{_PACKAGE}.{short_name}")
+        if names is None:
+            names = [name for name, value in vars(module).items()
+                     if inspect.isfunction(value) and value.__module__ == module.__name__]
+        for name in names:
+            function = getattr(module, name)
+            timed[function] = _timed(function, f"{short_name}.{name}")
+
+    sticker_class = importlib.import_module(f"{_PACKAGE}.sticker_class").Sticker
+    for name in PROFILED_METHODS:
+        method = sticker_class.__dict__[name]
+        _patched.append((sticker_class, name, method))
+        setattr(sticker_class, name, _timed(method, f"Sticker.{name}"))
+
+    # the functions are imported by name, every reference is replaced
+    for module_name, module in list(sys.modules.items()):
+        if module is None or not module_name.startswith(_PACKAGE.partition(".")[0] + "."):
+            continue
+        for name, value in list(vars(module).items()):
+            if inspect.isfunction(value) and value in timed:
+                _patched.append((module, name, value))
+                setattr(module, name, timed[value])
+
+    _enabled = True
+
+
+def disable_profiling():
+    """Puts the original functions back, the stages recorded are kept
+    """
+    global _enabled
+    for owner, name, value in reversed(_patched):
+        setattr(owner, name, value)
+    _patched.clear()
+    _enabled = False
+
+
+def get_profile_summary():
+    """Gets the stages recorded since the last trace written
+    returns:
+    dict with wall (seconds from the first start to the last end) and stages,
+    list of (stage, calls, seconds) from the slowest, the nested stages are
+    counted in their callers too
+    """
+    if not _events:
+        return {"wall": 0.0, "stages": []}
+
+    totals = {}
+    for stage, start, duration, thread in _events:
+        calls, seconds = totals.get(stage, (0, 0.0))
+        totals[stage] = (calls + 1, seconds + duration)
+
+    first = min(start for stage, start, duration, thread in _events)
+    last = max(start + duration for stage, start, duration, thread in _events)
+    stages = sorted(((stage, calls, seconds) for stage, (calls, seconds) in totals.items()),
+                    key = lambda item: item[2], reverse = True)
+    return {"wall": last - first, "stages": stages}
+
+
+def write_profile_trace(filepath = None):
+    """Writes the stages recorded since the last call as a Chrome trace and
+    forgets them
+    filepath -- the .json file (the one given to enable_profiling if None)
+    returns:
+    (path written, one line summary with the slowest stages)
+    """
+    summary = get_profile_summary()
+    pid = os.getpid()
+    trace = {
+        "traceEvents": [
+            {"name": stage, "cat": "stickers", "ph": "X", "pid": pid, "tid": thread,
+             "ts": start * 1e6, "dur": duration * 1e6}
+            for stage, start, duration, thread in _events
+        ],
+        "displayTimeUnit": "ms",
+    }
+
+    path = _get_trace_path(filepath)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok = True)
+    with open(path, "w") as f:
+        json.dump(trace, f)
+    _events.clear()
+
+    slowest = ", ".join(f"{stage} {seconds:.3f} s ({calls})"
+                        for stage, calls, seconds in summary["stages"][:SUMMARY_STAGES])
+    return path, f"Sticker profile: {summary['wall']:.3f} s. Slowest: {slowest or 'nothing recorded'}."
+
+
+# ==== HANDLERS
+
+def register():
+    if os.environ.get(PROFILE_ENV):
+        value = os.environ[PROFILE_ENV]
+        enable_profiling(None if value.lower() in ("1", "true", "yes", "on") else value)
+
+
+def unregister():
+    disable_profiling()
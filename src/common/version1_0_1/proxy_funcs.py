@@ -0,0 +1,343 @@
+"""
+[Blender and Python] Viewport proxies for Stickers Antaruxa
+Juan R Nouche - January 2025
+Email: juan.nouche@antaruxa.com
+Builds downscaled copies of the sticker images and sequence frames in
+background Blender processes, cached on disk. The sticker image nodes use
+them in the viewport and the original images in the final renders
+Antaruxa Stickers - Blender python viewport proxies
+Copyright (c) 2025 Antaruxa
+--------
+"""
+
+
+import os
+import hashlib
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import bpy
+from bpy.app.handlers import persistent
+
+from stickers_blender.common.version1_0_1.material_funcs import scan_image_sequence
+from stickers_blender.common.version1_0_1.image_funcs import hash_image
+from stickers_blender.common.version1_0_1.sticker_registry import get_all_stickers
+
+
+# == GLOBAL VARIABLES
+
+PROXY_FACTORS = {'HALF': 2, 'QUARTER': 4}
+
+PROXY_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+
+# files scaled by each background Blender, starting it costs more than
+# scaling an image
+PROXY_BATCH_SIZE = 32
+
+# custom properties linking the original image and its proxy
+PROXY_PROPERTY = "sticker_proxy"
+PROXY_OF_PROPERTY = "sticker_proxy_of"
+
+# script run by the background Blender processes:
+# -- factor source proxy source proxy ...
+_PROXY_SCRIPT = """
+import os, sys, bpy
+args = sys.argv[sys.argv.index("--") + 1:]
+factor = int(args[0])
+for ndx in range(1, len(args), 2):
+    source, proxy = args[ndx], args[ndx + 1]
+    image = bpy.data.images.load(source)
+    width, height = image.size
+    image.scale(max(1, width // factor), max(1, height // factor))
+    temporary = proxy + ".tmp"
+    image.filepath_raw = temporary
+    image.save()
+    bpy.data.images.remove(image)
+    os.replace(temporary, proxy)
+"""
+
+# [(material name, node name, proxy image name)] swapped while rendering
+_render_swaps = []
+
+
+# ==== INTERNAL FUNCTIONS (AUX)
+
+def _proxy_folder(source, proxy_dir, factor):
+    """Gets the folder of the proxies of the images in the source folder,
+    the proxies keep the file names so the sequences keep their numbers
+    """
+    source_dir = os.path.dirname(os.path.abspath(source))
+    key = hashlib.blake2b(source_dir.encode(), digest_size = 8).hexdigest()
+    return os.path.join(bpy.path.abspath(proxy_dir), f"{key}_{factor}")
+
+
+def _is_fresh(source, proxy):
+    return os.path.isfile(proxy) and os.path.getmtime(proxy) >= os.path.getmtime(source)
+
+
+def _get_image_sources(image, proxy_dir):
+    """Gets the files of an image, the frames of a sequence. A packed image
+    without its file is written in the proxy folder first
+    returns:
+    list of paths
+    """
+    filepath = bpy.path.abspath(image.filepath, library = image.library)
+    if image.source == 'SEQUENCE':
+        scan = scan_image_sequence(filepath)
+        return scan["files"] if scan else []
+
+    if os.path.isfile(filepath):
+        return [filepath]
+    if image.packed_file is None:
+        return []
+
+    content_hash = hash_image(image)
+    if content_hash is None:
+        return []
+    extension = os.path.splitext(filepath)[1] or ".png"
+    source = os.path.join(bpy.path.abspath(proxy_dir), "packed", f"{content_hash}{extension}")
+    if not os.path.isfile(source):
+        os.makedirs(os.path.dirname(source), exist_ok = True)
+        with open(source, "wb") as f:
+            f.write(image.packed_file.data)
+    return [source]
+
+
+def _run_proxy_batch(blender, factor, pairs):
+    """Scales a batch of images in a background Blender
+    pairs -- list of (source, proxy) paths
+    returns:
+    the number of proxies written
+    """
+    args = [str(factor)]
+    for source, proxy in pairs:
+        args += [source, proxy]
+    subprocess.run([blender, "--background", "--factory-startup",
+                    "--python-expr", _PROXY_SCRIPT, "--", *args],
+                   capture_output = True)
+    return sum(1 for source, proxy in pairs if _is_fresh(source, proxy))
+
+
+def _get_original_image(image):
+    if image is None:
+        return None
+    original = image.get(PROXY_OF_PROPERTY)
+    return bpy.data.images.get(original) if original else image
+
+
+# ==== EXTERNAL FUNCTIONS
+
+def get_sticker_image_nodes(scene = None):
+    """Gets the image nodes of the stickers reading files
+    scene -- the scene owning the sticker registry (current scene if None)
+    returns:
+    dict {original image: [image nodes]}
+    """
+    nodes_by_image = {}
+    for name, handles in get_all_stickers(scene).items():
+        material = handles.get("material")
+        if material is None or material.node_tree is None:
+            continue
+        node = material.node_tree.nodes.get(f"{name}_image")
+        image = _get_original_image(getattr(node, "image", None))
+        if image is None or image.source not in ('FILE', 'SEQUENCE'):
+            continue
+        nodes_by_image.setdefault(image, []).append(node)
+    return nodes_by_image
+
+
+def get_proxy_jobs(images, proxy_dir, factor):
+    """Lists the proxy files of the images. It uses bpy, call it before
+    building the proxies in background
+    images    -- the original images
+    proxy_dir -- the proxy cache folder
+    factor    -- the proxies are 1/factor of the original size
+    returns:
+    list of dict with image (name), sources and proxies (paths)
+    """
+    jobs = []
+    for image in images:
+        sources = _get_image_sources(image, proxy_dir)
+        if not sources:
+            continue
+        folder = _proxy_folder(sources[0], proxy_dir, factor)
+        proxies = [os.path.join(folder, os.path.basename(source)) for source in sources]
+        jobs.append({"image": image.name, "sources": sources, "proxies": proxies})
+    return jobs
+
+
+class ProxyBuild(object):
+    """Builds the proxy files that are missing or older than their image with
+    a pool of background Blender processes. It doesn't use bpy, the operator
+    polls it from a timer
+    """
+
+    def __init__(self, jobs, factor, blender, workers = PROXY_WORKERS):
+        self.jobs    = jobs
+        self.factor  = factor
+        self.blender = blender
+        self.workers = workers
+        self.error   = None
+        self.total   = 0
+        self.built   = 0
+
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target = self._run, daemon = True)
+        self._thread.start()
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+    @property
+    def progress(self):
+        """Built fraction of the proxies, from 0.0 to 1.0
+        """
+        return self.built / self.total if self.total else 1.0
+
+    def cancel(self):
+        """Stops launching batches, the running ones finish in background
+        """
+        self._cancelled.set()
+
+    def _run(self):
+        pairs = []
+        for job in self.jobs:
+            for source, proxy in zip(job["sources"], job["proxies"]):
+                if not _is_fresh(source, proxy):
+                    pairs.append((source, proxy))
+        self.total = len(pairs)
+        if not pairs:
+            return
+
+        try:
+            for folder in {os.path.dirname(proxy) for source, proxy in pairs}:
+                os.makedirs(folder, exist_ok = True)
+        except OSError as error:
+            self.error = f"Can't create the proxy folder: {error}"
+            return
+
+        batches = [pairs[ndx:ndx + PROXY_BATCH_SIZE] for ndx in range(0, len(pairs), PROXY_BATCH_SIZE)]
+        pool = ThreadPoolExecutor(max_workers = self.workers)
+        try:
+            futures = [pool.submit(self._run_batch, batch) for batch in batches]
+            for future in futures:
+                self.built += future.result()
+        finally:
+            pool.shutdown(wait = False, cancel_futures = True)
+
+        if self._cancelled.is_set():
+            self.error = "Cancelled."
+        elif self.built < self.total:
+            self.error = f"{self.total - self.built} proxies could not be built."
+
+    def _run_batch(self, batch):
+        if self._cancelled.is_set():
+            return 0
+        return _run_proxy_batch(self.blender, self.factor, batch)
+
+
+def assign_proxies(jobs, nodes_by_image):
+    """Makes the sticker image nodes use the proxies built
+    jobs           -- the jobs of the built proxies (see get_proxy_jobs)
+    nodes_by_image -- dict {original image: [image nodes]}
+    returns:
+    the number of images using a proxy
+    """
+    count = 0
+    for job in jobs:
+        image = bpy.data.images.get(job["image"])
+        if image is None or not all(os.path.isfile(proxy) for proxy in job["proxies"]):
+            continue
+
+        proxy = bpy.data.images.get(image.get(PROXY_PROPERTY, ""))
+        proxy_path = job["proxies"][0]
+        if proxy is None:
+            proxy = bpy.data.images.load(filepath = proxy_path, check_existing = False)
+            proxy.name = f"{image.name}_proxy"
+        elif os.path.abspath(bpy.path.abspath(proxy.filepath)) != os.path.abspath(proxy_path):
+            proxy.filepath = proxy_path
+        else:
+            proxy.reload()
+        proxy.source = image.source
+        proxy.alpha_mode = image.alpha_mode
+        proxy.colorspace_settings.name = image.colorspace_settings.name
+        proxy[PROXY_OF_PROPERTY] = image.name
+        image[PROXY_PROPERTY] = proxy.name
+
+        for node in nodes_by_image.get(image, []):
+            node.image = proxy
+        count += 1
+    return count
+
+
+def clear_proxies(scene = None):
+    """Makes the sticker image nodes use the original images again and
+    removes the proxy images (the files stay in the cache)
+    scene -- the scene owning the sticker registry (current scene if None)
+    returns:
+    the number of proxy images removed
+    """
+    for image, nodes in get_sticker_image_nodes(scene).items():
+        for node in nodes:
+            node.image = image
+
+    count = 0
+    for proxy in list(bpy.data.images):
+        if proxy.get(PROXY_OF_PROPERTY):
+            original = bpy.data.images.get(proxy[PROXY_OF_PROPERTY])
+            if original is not None and PROXY_PROPERTY in original:
+                del original[PROXY_PROPERTY]
+            bpy.data.images.remove(proxy)
+            count += 1
+    return count
+
+
+# ==== HANDLERS
+
+@persistent
+def _proxies_render_init(scene, *args):
+    # once per render job, not for every frame of an animation
+    _render_swaps.clear()
+    for material in bpy.data.materials:
+        if material.node_tree is None:
+            continue
+        for node in material.node_tree.nodes:
+            proxy = getattr(node, "image", None)
+            if proxy is None or not proxy.get(PROXY_OF_PROPERTY):
+                continue
+            original = bpy.data.images.get(proxy[PROXY_OF_PROPERTY])
+            if original is not None:
+                node.image = original
+                _render_swaps.append((material.name, node.name, proxy.name))
+
+
+@persistent
+def _proxies_render_end(scene, *args):
+    for material_name, node_name, proxy_name in _render_swaps:
+        material = bpy.data.materials.get(material_name)
+        proxy = bpy.data.images.get(proxy_name)
+        node = material.node_tree.nodes.get(node_name) if material else None
+        if node is not None and proxy is not None:
+            node.image = proxy
+    _render_swaps.clear()
+
+
+_render_handlers = (
+    (bpy.app.handlers.render_init, _proxies_render_init),
+    (bpy.app.handlers.render_complete, _proxies_render_end),
+    (bpy.app.handlers.render_cancel, _proxies_render_end),
+)
+
+
+def register():
+    for handler, function in _render_handlers:
+        if function not in handler:
+            handler.append(function)
+
+
+def unregister():
+    for handler, function in _render_handlers:
+        if function in handler:
+            handler.remove(function)
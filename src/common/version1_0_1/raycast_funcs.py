@@ -0,0 +1,130 @@
+"""
+[Blender and Python] Raycast library for Stickers Antaruxa
+Juan R Nouche - January 2025
+Email: juan.nouche@antaruxa.com
+A Blender python functions library to find the surface point under the
+mouse with a BVH tree cached per evaluated mesh
+Antaruxa Stickers - Blender python raycast library
+Copyright (c) 2025 Antaruxa
+--------
+"""
+
+
+import bpy
+from bpy.app.handlers import persistent
+from bpy_extras import view3d_utils
+from mathutils.bvhtree import BVHTree
+
+
+# == GLOBAL VARIABLES
+
+# {object session_uid: (BVHTree in object space, frame)}, a tree is dropped
+# when the geometry of its object changes, moving the object doesn't need a
+# new one. The frame is None for objects whose mesh doesn't deform
+_bvh_cache = {}
+
+
+# ==== INTERNAL FUNCTIONS (AUX)
+
+def _get_deform_frame(obj):
+    """Gets the frame the evaluated mesh of an object depends on
+    obj -- the mesh object
+    returns:
+    the current frame if the mesh is deformed (modifiers or shape keys) else None
+    """
+    shape_keys = getattr(obj.data, "shape_keys", None)
+    if len(obj.modifiers) == 0 and shape_keys is None:
+        return None
+    return bpy.context.scene.frame_current
+
+
+# ==== EXTERNAL FUNCTIONS
+
+def get_object_bvh(obj, depsgraph = None):
+    """Gets the BVH tree of the evaluated mesh of an object, building it
+    only the first time (and again on other frames if the mesh deforms)
+    obj       -- the mesh object
+    depsgraph -- the evaluated depsgraph (the current one if None)
+    returns:
+    the BVHTree in object space
+    """
+    frame = _get_deform_frame(obj)
+    cached = _bvh_cache.get(obj.session_uid)
+    if cached is None or cached[1] != frame:
+        depsgraph = depsgraph or bpy.context.evaluated_depsgraph_get()
+        cached = (BVHTree.FromObject(obj, depsgraph), frame)
+        _bvh_cache[obj.session_uid] = cached
+    return cached[0]
+
+
+def raycast_object_surface(region, region_3d, coord, obj):
+    """Casts a ray from the view through a region point to an object
+    region    -- the 3d view WINDOW region
+    region_3d -- the 3d view data of the region (space_data.region_3d)
+    coord     -- (x, y) position in the region
+    obj       -- the mesh object to hit
+    returns:
+    the world location hit or None
+    """
+    origin = view3d_utils.region_2d_to_origin_3d(region, region_3d, coord)
+    direction = view3d_utils.region_2d_to_vector_3d(region, region_3d, coord)
+
+    matrix = obj.matrix_world
+    matrix_inv = matrix.inverted()
+    local_origin = matrix_inv @ origin
+    local_direction = (matrix_inv.to_3x3() @ direction).normalized()
+
+    location, normal, index, distance = get_object_bvh(obj).ray_cast(local_origin, local_direction)
+    if location is None:
+        return None
+    return matrix @ location
+
+
+def clear_bvh_cache(obj = None):
+    """Drops the cached trees
+    obj -- only the tree of this object (all if None)
+    """
+    if obj is None:
+        _bvh_cache.clear()
+    else:
+        _bvh_cache.pop(obj.session_uid, None)
+
+
+# ==== HANDLERS
+
+@persistent
+def _bvh_cache_depsgraph_update(scene, depsgraph):
+    if not _bvh_cache:
+        return
+    for update in depsgraph.updates:
+        if update.is_updated_geometry and isinstance(update.id, bpy.types.Object):
+            _bvh_cache.pop(update.id.original.session_uid, None)
+
+
+@persistent
+def _bvh_cache_invalidate(*args):
+    clear_bvh_cache()
+
+
+_invalidate_handlers = (
+    bpy.app.handlers.load_post,
+    bpy.app.handlers.undo_post,
+    bpy.app.handlers.redo_post,
+)
+
+
+def register():
+    for handler in _invalidate_handlers:
+        if _bvh_cache_invalidate not in handler:
+            handler.append(_bvh_cache_invalidate)
+    if _bvh_cache_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_bvh_cache_depsgraph_update)
+
+
+def unregister():
+    for handler in _invalidate_handlers:
+        if _bvh_cache_invalidate in handler:
+            handler.remove(_bvh_cache_invalidate)
+    if _bvh_cache_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_bvh_cache_depsgraph_update)
+    clear_bvh_cache()
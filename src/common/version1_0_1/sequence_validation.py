@@ -0,0 +1,120 @@
+"""
+[Blender and Python] Sequence validation for Stickers Antaruxa
+Juan R Nouche - January 2025
+Email: juan.nouche@antaruxa.com
+Checks all the frames of an image sequence in background threads, so
+Blender keeps responding with huge sequences on network storage
+Antaruxa Stickers - Blender python sequence validation
+Copyright (c) 2025 Antaruxa
+--------
+"""
+
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from stickers_blender.common.version1_0_1.material_funcs import scan_image_sequence
+from stickers_blender.common.version1_0_1.sticker_funcs import is_valid_image_imghdr
+
+
+# == GLOBAL VARIABLES
+
+VALIDATION_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+
+# how many bad frames are listed in the error message
+MAX_REPORTED_FRAMES = 20
+
+
+# ==== INTERNAL FUNCTIONS (AUX)
+
+def _check_frame_file(path):
+    """Checks the header of a frame file
+    path -- the frame path
+    returns:
+    None if the frame is valid else the reason ("missing" or "corrupted")
+    """
+    try:
+        if not is_valid_image_imghdr(path):
+            return "corrupted"
+    except OSError:
+        return "missing"
+    return None
+
+
+class SequenceValidation(object):
+    """Scans an image sequence and checks the header of every frame with a
+    thread pool. It doesn't use bpy, the operator polls it from a timer
+    """
+
+    def __init__(self, img_filename, workers = VALIDATION_WORKERS):
+        self.img_filename = img_filename
+        self.workers      = workers
+        self.scan         = None
+        self.error        = None
+        self.total        = 0
+        self.checked      = 0
+        # [(frame, reason), ...]
+        self.bad_frames   = []
+
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target = self._run, daemon = True)
+        self._thread.start()
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+    @property
+    def progress(self):
+        """Checked fraction of the frames, from 0.0 to 1.0
+        """
+        return self.checked / self.total if self.total else 0.0
+
+    def cancel(self):
+        """Stops checking, the frames being checked finish in background
+        """
+        self._cancelled.set()
+
+    def get_error_message(self):
+        """Gets the message to report when the sequence can't be used
+        returns:
+        None if the sequence is valid else the message, with the bad frame numbers
+        """
+        if self.error is not None:
+            return self.error
+        if not self.bad_frames:
+            return None
+        bad_frames = sorted(self.bad_frames)
+        listed = ", ".join(f"{frame} ({reason})" for frame, reason in bad_frames[:MAX_REPORTED_FRAMES])
+        more = len(bad_frames) - MAX_REPORTED_FRAMES
+        if more > 0:
+            listed += f" and {more} more"
+        return f"{len(bad_frames)} bad frames in the sequence: {listed}."
+
+    def _run(self):
+        try:
+            scan = scan_image_sequence(self.img_filename)
+        except OSError as error:
+            self.error = f"Can't read the sequence folder: {error}"
+            return
+        if not scan or not scan["count"]:
+            self.error = "Can't detect an Image Sequence. Check the File Name."
+            return
+
+        self.scan = scan
+        self.total = scan["count"]
+        self.bad_frames = [(frame, "missing") for frame in scan["gaps"]]
+
+        pool = ThreadPoolExecutor(max_workers = self.workers)
+        try:
+            results = pool.map(_check_frame_file, scan["files"])
+            for frame, reason in zip(scan["frames"], results):
+                if self._cancelled.is_set():
+                    self.error = "Cancelled."
+                    break
+                if reason is not None:
+                    self.bad_frames.append((frame, reason))
+                self.checked += 1
+        finally:
+            pool.shutdown(wait = False, cancel_futures = True)
@@ -0,0 +1,98 @@
+"""
+[Blender and Python] Sprite sheet library for Stickers Antaruxa
+Juan R Nouche - January 2025
+Email: juan.nouche@antaruxa.com
+A Blender python functions library to turn the image sequence of a
+multi-pose sticker into a single sprite sheet image
+Antaruxa Stickers - Blender python sprite sheet library
+Copyright (c) 2025 Antaruxa
+--------
+"""
+
+
+import math
+
+import bpy
+import numpy as np
+
+from stickers_blender.common.version1_0_1.image_funcs import (
+    read_image_file_pixels,
+    write_image_pixels,
+)
+from stickers_blender.common.version1_0_1.material_funcs import (
+    scan_image_sequence,
+    insert_sticker_subrect_node,
+    set_driven_key_for_sprite_cell,
+)
+
+
+# == GLOBAL VARIABLES
+
+SPRITE_SHEET_MAX_SIZE = 16384
+
+
+# ==== EXTERNAL FUNCTIONS
+
+def get_sequence_frame_files(img_filename):
+    """Gets the files of an image sequence sorted by frame number
+    img_filename -- the path to one of the images in the sequence
+    returns:
+    the list of paths
+    """
+    scan = scan_image_sequence(img_filename)
+    return list(scan["files"]) if scan else []
+
+
+def build_sprite_sheet(img_filename, sticker_name):
+    """Builds a packed sprite sheet image with all the frames of a sequence,
+    from left to right and from top to bottom
+    img_filename -- the path to one of the images in the sequence
+    sticker_name -- the name of the sticker
+    returns:
+    (sheet_image, columns, rows) or None if the frames can't be in a sheet
+    (different sizes or too big)
+    """
+    files = get_sequence_frame_files(img_filename)
+    if not files:
+        return None
+
+    first = read_image_file_pixels(files[0])
+    height, width = first.shape[:2]
+    columns = math.ceil(math.sqrt(len(files)))
+    rows = math.ceil(len(files) / columns)
+    if columns * width > SPRITE_SHEET_MAX_SIZE or rows * height > SPRITE_SHEET_MAX_SIZE:
+        return None
+
+    sheet_pixels = np.zeros((rows * height, columns * width, 4), dtype = np.float32)
+    for ndx, path in enumerate(files):
+        pixels = first if ndx == 0 else read_image_file_pixels(path)
+        if pixels.shape != first.shape:
+            return None
+        # blender images start at the bottom row, the first frame goes on top
+        x = (ndx % columns) * width
+        y = (rows - 1 - ndx // columns) * height
+        sheet_pixels[y:y + height, x:x + width] = pixels
+
+    sheet = bpy.data.images.new(f"{sticker_name}_sprite_sheet", columns * width, rows * height, alpha = True)
+    write_image_pixels(sheet, sheet_pixels)
+    return sheet, columns, rows
+
+
+def connect_sprite_sheet(material, sticker_name, base_node, columns, rows, frame_count, firstframe):
+    """Makes the sticker active_frame select a cell of its sprite sheet.
+    The image node must have the sheet as a still image
+    material     -- the material with the sticker nodes
+    sticker_name -- the name of the sticker
+    base_node    -- the sticker base node with the active_frame property
+    columns      -- number of columns of the sheet
+    rows         -- number of rows of the sheet
+    frame_count  -- number of frames in the sheet
+    firstframe   -- the number of the first image of the sequence
+    """
+    base_node["frame_count"] = frame_count
+    base_node["active_frame"] = 1
+    base_node["initial_frame"] = firstframe
+
+    subrect_node = insert_sticker_subrect_node(material.node_tree, sticker_name,
+                                               (0.0, (rows - 1) / rows), (1.0 / columns, 1.0 / rows))
+    set_driven_key_for_sprite_cell(subrect_node, base_node, columns, rows)
@@ -0,0 +1,424 @@
+"""
+[Blender and Python] Batch creation library for Stickers Antaruxa
+Juan R Nouche - January 2025
+Email: juan.nouche@antaruxa.com
+A Blender python functions library to create many stickers
+from a JSON or CSV manifest in a single pass
+Antaruxa Stickers - Blender python batch creation library
+Copyright (c) 2025 Antaruxa
+--------
+"""
+
+
+import os
+import csv
+import json
+
+import bpy
+from mathutils import (Vector)
+
+from stickers_blender.common.version1_0_1.sticker_class import (
+    Sticker,
+    remove_stickers,
+)
+from stickers_blender.common.version1_0_1.sticker_registry import get_sticker
+from stickers_blender.common.version1_0_1.material_edit import (
+    sticker_material_edit,
+    defer_material_edit,
+)
+from stickers_blender.common.version1_0_1.sticker_funcs import (
+    is_valid_image_extension,
+    is_valid_image_imghdr,
+    check_if_sticker_name_exists,
+    get_vertex_translate_vector,
+)
+from stickers_blender.common.version1_0_1.material_funcs import (
+    check_image_file_sequence,
+    create_default_base_color_node,
+    moving_all_nodes_connected,
+    moving_all_nodes_from_a_sticker,
+    get_sticker_shader_node_names,
+    get_upstream_nodes,
+)
+
+
+# == GLOBAL VARIABLES
+
+# manifest keys and the type of their values
+MANIFEST_FIELDS = {
+    "action": str,
+    "file": str,
+    "name": str,
+    "object": str,
+    "vertex": int,
+    "point": Vector,
+    "image": str,
+    "is_sequence": bool,
+    "is_multi_pose": bool,
+    "atlas": bool,
+    "sprite_sheet": bool,
+    "driver_free": bool,
+    "surface_binding": bool,
+    "rigged": bool,
+    "alpha_trim": bool,
+    "lean_rig": bool,
+    "ScaleX": float,
+    "ScaleY": float,
+    "Rotate": int,
+    "transparency": float,
+    "flip_X": bool,
+    "flip_Y": bool,
+}
+
+# actions a manifest entry can ask for, "create" if not set
+MANIFEST_ACTIONS = {"create", "update", "remove"}
+
+# base node properties a manifest entry can set
+STICKER_VALUES = ("ScaleX", "ScaleY", "Rotate", "transparency")
+
+# the offset the stickers below are moved when a sticker is added on top
+RELAYOUT_OFFSET = (-600, 450)
+
+
+# ==== INTERNAL FUNCTIONS (AUX)
+
+def _to_bool(value):
+    """Converts a manifest value (bool, number or CSV string) into a bool
+    """
+    if isinstance(value, str):
+        return value.strip().lower() in {"1", "true", "yes", "y"}
+    return bool(value)
+
+
+def _normalize_entry(raw):
+    """Converts the values of a raw manifest entry to their types
+    raw -- dict read from the JSON or CSV manifest
+    returns:
+    the entry with only the known keys and typed values
+    """
+    entry = {}
+    for key, kind in MANIFEST_FIELDS.items():
+        value = raw.get(key)
+        if value is None or value == "":
+            continue
+        if kind is bool:
+            entry[key] = _to_bool(value)
+        elif kind is Vector:
+            if isinstance(value, str):
+                value = value.replace(",", " ").split()
+            entry[key] = Vector([float(v) for v in value])
+        else:
+            entry[key] = kind(value)
+
+    # CSV manifests give the point in three columns
+    if "point" not in entry and raw.get("point_x") not in (None, ""):
+        entry["point"] = Vector((float(raw["point_x"]), float(raw["point_y"]), float(raw["point_z"])))
+
+    return entry
+
+
+def _make_room_for_stickers(node_tree, created):
+    """Moves the existing shadernodes once for all the new stickers of a material
+    created -- list of (entry, Sticker) of the stickers built
+    """
+    if not created:
+        return
+    main_node = node_tree.nodes[0]
+    input_conn = "Base Color"
+    if not main_node.inputs[input_conn].links:
+        create_default_base_color_node(node_tree, created[0][0]["name"], input_conn)
+
+    count = len(created)
+    moving_all_nodes_connected(main_node, RELAYOUT_OFFSET[0] * count, RELAYOUT_OFFSET[1] * count)
+
+
+def _place_new_stickers(node_tree, created):
+    """Places the shadernodes of the new stickers of a material in their slots
+    created -- list of (entry, Sticker), the stickers whose shadernodes failed are skipped
+    """
+    entries = [entry for entry, sticker in created if sticker.error is None]
+    # the first sticker created is the downmost one
+    for ndx, entry in enumerate(entries):
+        slots = len(entries) - 1 - ndx
+        moving_all_nodes_from_a_sticker(node_tree, entry["name"],
+                                        RELAYOUT_OFFSET[0] * slots, RELAYOUT_OFFSET[1] * slots)
+
+    # the room made for the stickers that failed is given back
+    missing = len(created) - len(entries)
+    if missing:
+        new_nodes = set()
+        for entry in entries:
+            new_nodes.update(get_sticker_shader_node_names(entry["name"], node_tree))
+        for node in get_upstream_nodes(node_tree.nodes[0]):
+            if node.name not in new_nodes:
+                node.location.x -= RELAYOUT_OFFSET[0] * missing
+                node.location.y -= RELAYOUT_OFFSET[1] * missing
+
+    for node in node_tree.nodes:
+        node.select = False
+
+
+def _set_values_of_new_sticker(sticker, entry):
+    """Sets the manifest values of a new sticker once its shadernodes exist
+    (the flips change its mapping node). If it fails the sticker is discarded
+    """
+    if sticker.error is not None:
+        return
+    try:
+        set_sticker_values_from_entry(sticker.base_node, entry)
+    except Exception as error:
+        sticker.error = str(error)
+        sticker.discard_sticker()
+        raise
+
+
+def _collect_new_sticker_results(results, created):
+    """Adds the (name, error) of the new stickers to the results once their
+    shadernodes are done
+    """
+    for entry, sticker in created:
+        results.append((entry["name"], sticker.error))
+
+
+# ==== EXTERNAL FUNCTIONS
+
+def read_sticker_manifest(filepath):
+    """Reads a sticker manifest. A JSON file must contain a list of entries (or a
+    dict with a "stickers" list), a CSV file an entry per row with a header.
+    Known keys: action (create, update or remove), file, name, object, vertex
+    or point (x y z, or point_x, point_y and point_z columns in CSV), image,
+    is_sequence, is_multi_pose, atlas, sprite_sheet, driver_free,
+    surface_binding, rigged, alpha_trim, lean_rig, ScaleX, ScaleY, Rotate, transparency,
+    flip_X and flip_Y
+    filepath -- path to the .json or .csv manifest
+    returns:
+    the list of entries with typed values
+    """
+    filepath = bpy.path.abspath(filepath)
+    if filepath.lower().endswith(".csv"):
+        with open(filepath, newline = "") as f:
+            raw_entries = list(csv.DictReader(f))
+    else:
+        with open(filepath) as f:
+            raw_entries = json.load(f)
+        if isinstance(raw_entries, dict):
+            raw_entries = raw_entries.get("stickers", [])
+
+    return [_normalize_entry(raw) for raw in raw_entries]
+
+
+def check_manifest_entry(entry, used_names):
+    """Checks a manifest entry before creating anything
+    entry      -- a typed manifest entry
+    used_names -- set with the sticker names already used in the manifest
+    returns:
+    None if the entry is valid else a string with the error
+    """
+    name = entry.get("name")
+    if not name:
+        return "the sticker needs a name"
+    if name in used_names or check_if_sticker_name_exists(name):
+        return f"there is a sticker named {name} yet"
+
+    obj = bpy.data.objects.get(entry.get("object", ""))
+    if obj is None or obj.type != 'MESH':
+        return f"the object {entry.get('object')} must be a mesh"
+    if not obj.material_slots or obj.material_slots[0].material is None:
+        return f"the object {obj.name} has no material"
+
+    if "vertex" in entry:
+        if not 0 <= entry["vertex"] < len(obj.data.vertices):
+            return f"the vertex {entry['vertex']} is not in {obj.name}"
+    elif "point" not in entry:
+        return "the sticker needs a vertex or a point"
+
+    img_filename = bpy.path.abspath(entry.get("image", ""))
+    if not os.path.exists(img_filename):
+        return f"the filename {img_filename} does not exist"
+    if not is_valid_image_extension(img_filename):
+        return "the image must have this extension: .png"
+    if not is_valid_image_imghdr(img_filename):
+        return f"the file {img_filename} is not an image or is corrupted"
+    if entry.get("is_sequence") and entry.get("is_multi_pose"):
+        return "choose only one of these: is_sequence or is_multi_pose"
+
+    return None
+
+
+def create_stickers_from_manifest(entries, image_cache_dir = None, trim_cache_dir = None):
+    """Creates all the stickers of a manifest in a single pass: one switch to
+    object mode and the shadernodes of each material are moved only once.
+    It doesn't push any undo step, the operator calling it pushes just one.
+    The stickers whose shadernodes fail are discarded and reported
+    entries         -- list of typed entries (see read_sticker_manifest)
+    image_cache_dir -- shared image cache folder, None to pack the images
+    trim_cache_dir  -- folder for the trimmed images, None for the default one
+    returns:
+    a list of (name, error) tuples, error is None for the stickers created.
+    Inside an open sticker_material_edit block the new stickers are added to
+    the list when the block ends
+    """
+    results = []
+    used_names = set()
+    by_material = {}
+
+    for entry in entries:
+        error = check_manifest_entry(entry, used_names)
+        img_offset = img_firstframe = None
+        if error is None and (entry.get("is_sequence") or entry.get("is_multi_pose")):
+            img_filename = bpy.path.abspath(entry["image"])
+            img_offset, img_firstframe, consecutive = check_image_file_sequence(img_filename)
+            if not img_offset:
+                error = "can't detect an image sequence"
+            elif not consecutive:
+                error = "the images in the sequence must have consecutive numbers"
+        if error is not None:
+            results.append((entry.get("name"), error))
+            continue
+
+        used_names.add(entry["name"])
+        entry["img_offset"] = img_offset
+        entry["img_firstframe"] = img_firstframe
+        material = bpy.data.objects[entry["object"]].material_slots[0].material
+        by_material.setdefault(material, []).append(entry)
+
+    if not by_material:
+        return results
+
+    # a single mode switch for all the stickers
+    if bpy.context.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+
+    # the shadernodes of all the stickers are created in one batch, each
+    # material shader is compiled once
+    with sticker_material_edit():
+        all_created = []
+        for material, material_entries in by_material.items():
+            # room only for the stickers built, the list is filled before the
+            # edits are applied
+            created = []
+            defer_material_edit(_make_room_for_stickers, material.node_tree, created)
+
+            for entry in material_entries:
+                sticker, error = build_sticker_from_entry(entry, image_cache_dir, trim_cache_dir)
+                if error is not None:
+                    results.append((entry["name"], error))
+                    continue
+                defer_material_edit(_set_values_of_new_sticker, sticker, entry)
+                created.append((entry, sticker))
+
+            defer_material_edit(_place_new_stickers, material.node_tree, created)
+            all_created.extend(created)
+
+        defer_material_edit(_collect_new_sticker_results, results, all_created)
+
+    return results
+
+
+def build_sticker_from_entry(entry, image_cache_dir = None, trim_cache_dir = None):
+    """Builds the objects of a sticker from a checked manifest entry, in object
+    mode and without moving the other shadernodes. Its shadernodes are created
+    when the open sticker_material_edit block ends (at once if none)
+    entry           -- a typed and checked manifest entry
+    image_cache_dir -- shared image cache folder, None to pack the images
+    trim_cache_dir  -- folder for the trimmed images, None for the default one
+    returns:
+    (Sticker, None) if it is built else (None, a string with the error)
+    """
+    obj = bpy.data.objects[entry["object"]]
+    sticker = Sticker('CREATE', obj)
+    sticker.sticker_name    = entry["name"]
+    sticker.is_seq          = entry.get("is_sequence", False)
+    sticker.is_control_anim = entry.get("is_multi_pose", False)
+    sticker.img_offset      = entry.get("img_offset")
+    sticker.img_firstframe  = entry.get("img_firstframe")
+    sticker.set_options(use_atlas = entry.get("atlas", False),
+                        use_sprite_sheet = entry.get("sprite_sheet", False),
+                        use_driver_free = entry.get("driver_free", False),
+                        use_surface_binding = entry.get("surface_binding", False),
+                        use_rigged = entry.get("rigged", False),
+                        image_cache_dir = image_cache_dir,
+                        use_alpha_trim = entry.get("alpha_trim", False),
+                        trim_cache_dir = trim_cache_dir,
+                        use_lean_rig = entry.get("lean_rig", False))
+
+    if "vertex" in entry:
+        location = get_vertex_translate_vector(obj, entry["vertex"])
+    else:
+        location = entry["point"]
+
+    try:
+        sticker.build_sticker(location, bpy.path.abspath(entry["image"]), relayout = False)
+    except Exception as error:
+        # the sticker has been discarded
+        return None, sticker.error or str(error)
+
+    return sticker, None
+
+
+def set_sticker_values_from_entry(base_node, entry):
+    """Sets the base node properties given in a manifest entry
+    base_node -- the sticker base node
+    entry     -- a typed manifest entry
+    """
+    for prop in STICKER_VALUES:
+        if prop in entry:
+            base_node[prop] = entry[prop]
+    # the flip setters mirror the mapping each time, only when it changes
+    for prop in ("flip_X", "flip_Y"):
+        if prop in entry and getattr(base_node, prop) != entry[prop]:
+            setattr(base_node, prop, entry[prop])
+
+
+def update_sticker_from_entry(entry):
+    """Updates the properties of an existing sticker from a manifest entry
+    entry -- a typed manifest entry
+    returns:
+    None if the sticker is updated else a string with the error
+    """
+    sticker = get_sticker(entry.get("name", ""))
+    if sticker is None:
+        return f"can't find the sticker {entry.get('name')}"
+    set_sticker_values_from_entry(sticker["base_node"], entry)
+    return None
+
+
+def apply_sticker_manifest(entries, image_cache_dir = None):
+    """Applies a manifest with create, update and remove actions. The updates
+    are done in the manifest order, then all the removed stickers are taken
+    out together (see remove_stickers) and all the new stickers are created
+    in a single pass (see create_stickers_from_manifest)
+    entries         -- list of typed entries (see read_sticker_manifest)
+    image_cache_dir -- shared image cache folder, None to pack the images
+    returns:
+    a list of (name, action, error) tuples, error is None when it worked
+    """
+    results = []
+    creates = []
+    removes = []
+    # the removes and the creates edit the materials in a single batch
+    with sticker_material_edit():
+        for entry in entries:
+            name = entry.get("name")
+            action = entry.get("action", "create")
+            if action == "create":
+                creates.append(entry)
+            elif action == "update":
+                results.append((name, action, update_sticker_from_entry(entry)))
+            elif action == "remove":
+                removes.append(name)
+            else:
+                results.append((name, action, f"unknown action, it must be one of {sorted(MANIFEST_ACTIONS)}"))
+
+        # all the removes in one go, each mix chain is relinked once
+        removed = remove_stickers(removes)
+        for name in removes:
+            results.append((name, "remove", None if name in removed else f"can't find the sticker {name}"))
+
+        created = create_stickers_from_manifest(creates, image_cache_dir)
+
+    # the creates are known once the block has applied the edits
+    for name, error in created:
+        results.append((name, "create", error))
+
+    return results
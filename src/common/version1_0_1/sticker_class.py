@@ -30,7 +30,9 @@ from stickers_blender.common.version1_0_1.sticker_funcs import (
     check_if_sticker_name_exists,
     add_driver_to_object,
     create_custom_circle,
+    get_sticker_collection,
     get_vertex_translate_vector,
+    get_selected_vertices,
     set_driven_key_for_scaleX_and_scaleY, 
 )
 
@@ -42,9 +44,49 @@ from stickers_blender.common.version1_0_1.material_funcs import (
     get_main_material_node_tree,
     # for plane deactivate in this version
     # create_material_for_sticker_plane,
-    disconnect_sticker_material,
+    splice_out_stickers,
     remove_all_the_nodes_from_sticker,
     check_image_file_sequence,
+    get_sticker_shader_node_names,
+    scan_image_sequence,
+    set_sticker_mapping_trim,
+)
+
+from stickers_blender.common.version1_0_1.atlas_funcs import (
+    add_sticker_to_atlas,
+    remove_stickers_from_atlas,
+    get_material_atlas_image,
+)
+
+from stickers_blender.common.version1_0_1.image_funcs import (
+    load_image_deduplicated,
+    trim_image_files,
+)
+
+from stickers_blender.common.version1_0_1.proxy_funcs import (
+    PROXY_PROPERTY,
+    PROXY_OF_PROPERTY,
+)
+
+from stickers_blender.common.version1_0_1.sprite_sheet_funcs import (
+    build_sprite_sheet,
+    connect_sprite_sheet,
+)
+
+from stickers_blender.common.version1_0_1.surface_binding import (
+    bind_sticker_to_surface,
+    mark_surface_bindings_dirty,
+)
+
+from stickers_blender.common.version1_0_1.material_edit import (
+    defer_material_edit,
+    add_material_edit_rollback,
+)
+
+from stickers_blender.common.version1_0_1.sticker_registry import (
+    register_sticker,
+    unregister_sticker,
+    get_sticker,
 )
 
 
@@ -54,21 +96,137 @@ from stickers_blender.common.version1_0_1.material_funcs import (
 # return values
 NO_VERTEX_SELECTED       = -1
 NO_MESH_SELECTED         = -2
-NO_EDITMODE              = -3
 MORE_THAN_1_VTX_SELECTED = -4
 MORE_THAN_1_OBJ_SELECTED = -5
 SEL_SHOULD_BE_A_MESH     = -6
+STICKER_NOT_FOUND        = -7
+STICKER_NOT_CREATED      = -8
 ALL_DONE                 = 0
 
 
 
+def remove_sticker(stickername):
+    """Removes a sticker: its objects, its shadernodes and the data only it used
+    stickername -- the name of the sticker
+
+    returns:
+    ALL_DONE or STICKER_NOT_FOUND
+    """
+
+    if not remove_stickers([stickername]):
+        return STICKER_NOT_FOUND
+    return ALL_DONE
+
+
+def remove_sticker_objects(sticker_objs):
+    """Removes the objects of stickers and the meshes and actions only they used
+    sticker_objs -- the objects to remove
+    """
+
+    owned = set()
+    for obj in sticker_objs:
+        if obj.data is not None:
+            owned.add(obj.data)
+        if obj.animation_data is not None and obj.animation_data.action is not None:
+            owned.add(obj.animation_data.action)
+    bpy.data.batch_remove(sticker_objs)
+    bpy.data.batch_remove([data for data in owned if data.users == 0])
+
+
+def remove_stickers(sticker_names, scene = None, relayout = True):
+    """Removes many stickers at once: their objects, the meshes and actions
+    nothing else uses and their shadernodes, taken out of each material mix
+    chain in a single pass. Only the data the stickers owned is freed, there
+    is no orphans purge of the whole file
+    sticker_names -- the names of the stickers
+    scene         -- the scene owning the sticker registry (current scene if None)
+    relayout      -- if False the shadernodes of the other stickers are not moved
+
+    returns:
+    the list of the stickers removed, the names not found are skipped
+    """
+
+    removed = []
+    sticker_objs = []
+    names_by_material = {}
+    for stickername in dict.fromkeys(sticker_names):
+        sticker = get_sticker(stickername, scene)
+        if sticker is None:
+            continue
+        removed.append(stickername)
+        for key in ("base_node", "normal_node", "projection_node"):
+            if sticker[key] is not None:
+                sticker_objs.append(sticker[key])
+        if sticker["material"] is not None:
+            names_by_material.setdefault(sticker["material"], []).append(stickername)
+    if not removed:
+        return removed
+
+    remove_sticker_objects(sticker_objs)
+
+    for stickername in removed:
+        unregister_sticker(stickername, scene)
+    mark_surface_bindings_dirty()
+
+    for main_material, stickernames in names_by_material.items():
+        if main_material.node_tree is not None:
+            defer_material_edit(remove_stickers_shadernodes, main_material, stickernames, relayout)
+
+    return removed
+
+
+def remove_stickers_shadernodes(main_material, sticker_names, relayout = True):
+    """Disconnects and removes the shadernodes of many stickers of a material,
+    then frees the images (and their proxies) nothing else uses. The stickers
+    whose shadernodes creation failed half way are removed too
+    main_material -- the material with the sticker nodes
+    sticker_names -- the names of the stickers
+    relayout      -- if False the shadernodes of the other stickers are not moved
+    """
+
+    node_tree = main_material.node_tree
+    nodes = node_tree.nodes
+    shader_nodes = {}
+    for stickername in sticker_names:
+        node_names = [node_name for node_name in get_sticker_shader_node_names(stickername, node_tree)
+                      if node_name in nodes]
+        if node_names:
+            shader_nodes[stickername] = node_names
+    # only the stickers linked in a mix chain are taken out of it
+    chained = [name for name in shader_nodes
+               if f"{name}_mix_node" in nodes and nodes[f"{name}_mix_node"].inputs["B"].is_linked]
+
+    remove_stickers_from_atlas(main_material, list(shader_nodes))
+    splice_out_stickers(main_material, chained, relayout)
+
+    images = set()
+    for stickername, sticker_shader_nodes in shader_nodes.items():
+        for node_name in sticker_shader_nodes:
+            image = getattr(nodes.get(node_name), "image", None)
+            if image is not None:
+                images.add(image)
+        remove_all_the_nodes_from_sticker(stickername, main_material, sticker_shader_nodes, False)
+    for node in nodes:
+        node.select = False
+
+    unused = set()
+    for image in images:
+        original = bpy.data.images.get(image.get(PROXY_OF_PROPERTY, "")) or image
+        proxy = bpy.data.images.get(original.get(PROXY_PROPERTY, ""))
+        # the original of a proxied image has no users, it goes with its proxy
+        pair = [original] if proxy is None else [original, proxy]
+        if all(img.users == 0 for img in pair):
+            unused.update(pair)
+    bpy.data.batch_remove(unused)
+
+
 class Sticker(object):
     
 
-    def __init__(self, mode = 'CREATE'):
+    def __init__(self, mode = 'CREATE', obj = None):
         
         if mode == 'CREATE':  # modo create inicializamos variables
-            self.current_obj = bpy.context.active_object
+            self.current_obj = obj if obj is not None else bpy.context.active_object
             object_type = getattr(self.current_obj, 'type', '')
             if object_type != 'MESH':
                 print("NO MESH SELECTED")
@@ -79,7 +237,7 @@ class Sticker(object):
             self.sticker_name       = ""
             self.current_mesh       = None
 
-            self.anchor_vertex      = None
+            self.anchor_index       = None
             self.anchor_empty       = None
             self.base_node          = None
             self.calcnormal_node    = None
@@ -89,12 +247,25 @@ class Sticker(object):
             self.material_node_tree = None
             self.sticker_image      = None
             self.is_seq             = False
+            self.use_atlas          = False
+            self.use_sprite_sheet   = False
+            self.use_driver_free    = False
+            self.use_surface_binding = False
+            self.use_rigged         = False
+            self.image_cache_dir    = None
+            self.use_alpha_trim     = False
+            self.use_lean_rig       = False
+            self.trim_cache_dir     = "//sticker_trim/"
             self.input_conn         = "Base Color"
+            # the error of the shadernodes creation if it failed
+            self.error              = None
     
-    def create_sticker(self, name = "sticker-default", img_filename = "//", is_seq = False, is_control_anim = False, img_offset = None, img_firstframe = None):
+    def create_sticker(self, name = "sticker-default", img_filename = "//", is_seq = False, is_control_anim = False, img_offset = None, img_firstframe = None, use_atlas = False, use_sprite_sheet = False, use_driver_free = False, use_surface_binding = False, use_rigged = False, image_cache_dir = None, use_alpha_trim = False, trim_cache_dir = None, use_lean_rig = False):
         """Create a complete sticker structure
         """    
         
+        self.set_options(use_atlas, use_sprite_sheet, use_driver_free, use_surface_binding, use_rigged,
+                         image_cache_dir, use_alpha_trim, trim_cache_dir, use_lean_rig)
 
         selected_objs        = bpy.context.selected_objects
         self.sticker_name    = name
@@ -109,15 +280,12 @@ class Sticker(object):
         elif self.current_obj == None or self.current_obj.type != 'MESH':
             return NO_MESH_SELECTED     
        
-        elif self.current_obj.mode != 'EDIT':
-            return NO_EDITMODE
-
         else:
-           
 
-            self.current_mesh = mesh = bmesh.from_edit_mesh(self.current_obj.data)
-            selected_verts = list(filter(lambda v: v.select, mesh.verts))
-            numvertex = len(selected_verts)
+            # the anchor is the selected vertex, in edit mode or the
+            # selection stored in the mesh when in object mode
+            indices, positions = get_selected_vertices(self.current_obj)
+            numvertex = len(indices)
 
             if numvertex <= 0:
                 return NO_VERTEX_SELECTED            
@@ -128,37 +296,18 @@ class Sticker(object):
 
                 else:
                     
-                    self.anchor_vertex = selected_verts[0]
-                    self.create_and_parent_base_sticker_node(self.sticker_name)
-                    self.create_and_parent_calcnormal_node(self.sticker_name)
-                    self.create_projection_empty_and_parent(self.sticker_name)
-
-                    head, tail = os.path.split(img_filename)
-                    #reusing a single image if it exists
-                    if tail in bpy.data.images and not (is_seq or is_control_anim):
-                        self.sticker_image=bpy.data.images[tail]
-                    else:
-                        self.sticker_image = bpy.data.images.load(filepath = img_filename)
-                        self.sticker_image.pack()
-                        
-                    self.material_node_tree = get_main_material_node_tree(self.current_obj)
-                    main_material = self.current_obj.material_slots[0].material
-                   
-                    create_sticker_material_nodes( main_material,
-                                                  self.material_node_tree, 
-                                                  self.sticker_name, 
-                                                  self.base_node.name, 
-                                                  self.sticker_image, 
-                                                  self.input_conn,
-                                                  self.is_seq,
-                                                  self.is_control_anim,
-                                                  self.img_offset,
-                                                  self.img_firstframe,
-                                                  )
-                    #creates the plane deactivated in this version
-                    #self.create_and_parent_the_aux_plane(self.sticker_name) 
-
-                    bpy.ops.object.mode_set(mode='OBJECT', toggle=False) #exit to object mode
+                    self.anchor_index = int(indices[0])
+                    location = Vector(positions[0])
+
+                    # exit to object mode before building, rigged stickers need the evaluated mesh
+                    self.set_object_mode()
+                    try:
+                        main_material = self.build_sticker(location, img_filename)
+                    except Exception as error:
+                        # the sticker has been discarded
+                        self.error = self.error or str(error)
+                    if self.error is not None:
+                        return STICKER_NOT_CREATED
                     
                     for node in main_material.node_tree.nodes:
                         node.select = False
@@ -166,6 +315,212 @@ class Sticker(object):
                     
                     return ALL_DONE
 
+    def set_options(self, use_atlas = False, use_sprite_sheet = False, use_driver_free = False, use_surface_binding = False, use_rigged = False, image_cache_dir = None, use_alpha_trim = False, trim_cache_dir = None, use_lean_rig = False):
+        """Sets the creation options of the sticker (see create_sticker)
+        """
+
+        self.use_atlas        = use_atlas
+        self.use_sprite_sheet = use_sprite_sheet
+        self.use_driver_free  = use_driver_free
+        self.use_surface_binding = use_surface_binding
+        self.use_rigged       = use_rigged
+        self.image_cache_dir  = image_cache_dir
+        self.use_alpha_trim   = use_alpha_trim
+        self.use_lean_rig     = use_lean_rig
+        if trim_cache_dir:
+            self.trim_cache_dir = trim_cache_dir
+
+    def set_object_mode(self):
+        """Switchs the object to object mode if it is in edit mode
+        """
+
+        if self.current_obj.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+
+    def build_sticker(self, location, img_filename, relayout = True):
+        """Creates the sticker objects, image and shadernodes at a world location.
+        It doesn't check the selection nor switch the object mode, so it can be
+        used for many stickers in a row (see sticker_batch)
+        location     -- Vector with the world position of the anchor
+        img_filename -- the path to the image (or first image of the sequence)
+        relayout     -- if False the existing shadernodes are not moved to make
+                        room for the new ones, the caller will do it once
+
+        returns:
+        the main material where the sticker nodes have been created
+        """
+
+        # the helpers go to the sticker collection of the object
+        self.collection = get_sticker_collection(self.current_obj)
+
+        try:
+            main_material = self.build_sticker_objects(location, img_filename, relayout)
+        except Exception:
+            # nothing half built is left, the name can be used again
+            self.discard_sticker()
+            raise
+
+        return main_material
+
+    def build_sticker_objects(self, location, img_filename, relayout):
+        """Auxiliar to build_sticker, the arguments are the same
+        """
+
+        self.create_and_parent_base_sticker_node(self.sticker_name, location)
+        if self.use_lean_rig:
+            # the base node is the projection frame, it has no normal node
+            set_driven_key_for_scaleX_and_scaleY(self.base_node, self.base_node)
+        else:
+            self.create_and_parent_calcnormal_node(self.sticker_name)
+            self.create_projection_empty_and_parent(self.sticker_name)
+
+        is_seq, is_control_anim = self.is_seq, self.is_control_anim
+        in_atlas = self.use_atlas and not (is_seq or is_control_anim)
+
+        trim = None
+        if self.use_alpha_trim:
+            trim = self.trim_sticker_image(img_filename)
+            if trim:
+                img_filename = trim[0]
+
+        sprite_sheet = None
+        if self.use_sprite_sheet and is_control_anim:
+            sprite_sheet = build_sprite_sheet(img_filename, self.sticker_name)
+        if sprite_sheet:
+            # the poses are cells of a still image, no sequence anymore
+            self.sticker_image = sprite_sheet[0]
+            is_control_anim = False
+        else:
+            self.sticker_image = self.load_sticker_image(img_filename, pack = not in_atlas)
+            
+        self.material_node_tree = get_main_material_node_tree(self.current_obj)
+        main_material = self.current_obj.material_slots[0].material
+
+        register_sticker(self.sticker_name, self.base_node, self.calcnormal_node,
+                         self.proj_empty, self.current_obj, main_material)
+        # if the sticker_material_edit block fails the sticker has no shadernodes
+        add_material_edit_rollback(self.discard_sticker)
+
+        # applied at once or with the other edits of the sticker_material_edit block
+        defer_material_edit(self.create_sticker_shadernodes, main_material, is_control_anim,
+                            relayout, trim, sprite_sheet, in_atlas)
+        #creates the plane deactivated in this version
+        #self.create_and_parent_the_aux_plane(self.sticker_name) 
+
+        return main_material
+
+    def discard_sticker(self, relayout = False):
+        """Removes what has been built of a sticker: its objects, its registry
+        entry, its shadernodes and its image if nothing else uses it
+        relayout -- if False the shadernodes of the other stickers are not moved
+        """
+
+        if get_sticker(self.sticker_name) is not None:
+            remove_stickers([self.sticker_name], relayout = relayout)
+        else:
+            remove_sticker_objects([obj for obj in (self.base_node, self.calcnormal_node, self.proj_empty)
+                                    if obj is not None])
+        self.base_node = self.calcnormal_node = self.proj_empty = None
+
+        if self.sticker_image is not None and self.sticker_image.users == 0:
+            bpy.data.images.remove(self.sticker_image)
+        self.sticker_image = None
+
+    def create_sticker_shadernodes(self, main_material, is_control_anim, relayout, trim, sprite_sheet, in_atlas):
+        """Creates the sticker shadernodes and connects them to its image. If
+        it fails the sticker is discarded and the error kept in self.error
+        main_material   -- the material of the sticker
+        is_control_anim -- False if the poses are in a sprite sheet
+        relayout        -- if False the existing shadernodes are not moved
+        trim            -- the alpha trim (see trim_sticker_image) or None
+        sprite_sheet    -- (sheet, columns, rows) or None
+        in_atlas        -- if True the still image is copied into the material atlas
+        """
+
+        try:
+            self.connect_sticker_shadernodes(main_material, is_control_anim, relayout,
+                                             trim, sprite_sheet, in_atlas)
+        except Exception as error:
+            self.error = str(error)
+            self.discard_sticker(relayout)
+            raise
+
+    def connect_sticker_shadernodes(self, main_material, is_control_anim, relayout, trim, sprite_sheet, in_atlas):
+        """Auxiliar to create_sticker_shadernodes, the arguments are the same
+        """
+
+        is_seq = self.is_seq
+
+        create_sticker_material_nodes( main_material,
+                                      self.material_node_tree, 
+                                      self.sticker_name, 
+                                      self.base_node.name, 
+                                      self.sticker_image, 
+                                      self.input_conn,
+                                      is_seq,
+                                      is_control_anim,
+                                      self.img_offset,
+                                      self.img_firstframe,
+                                      relayout = relayout,
+                                      driver_free = self.use_driver_free and not self.use_lean_rig,
+                                      lean_rig = self.use_lean_rig,
+                                      )
+
+        if trim:
+            set_sticker_mapping_trim(self.material_node_tree, self.sticker_name, trim[1], trim[2])
+
+        if sprite_sheet:
+            sheet, columns, rows = sprite_sheet
+            connect_sprite_sheet(main_material, self.sticker_name, self.base_node,
+                                 columns, rows, self.img_offset, self.img_firstframe)
+
+        if in_atlas:
+            # the still image is copied into the material atlas
+            source_image = self.sticker_image
+            if add_sticker_to_atlas(main_material, self.sticker_name, source_image):
+                self.sticker_image = get_material_atlas_image(main_material)
+                if source_image.users == 0:
+                    bpy.data.images.remove(source_image)
+            elif not (source_image.packed_file or self.image_cache_dir):
+                source_image.pack()
+
+    def trim_sticker_image(self, img_filename):
+        """Crops the transparent margin of the sticker image, the same for all
+        the images of a sequence
+        img_filename -- the path to the image (or first image of the sequence)
+
+        returns:
+        (first cropped file, offset, size) or None if there is nothing to crop
+        """
+
+        files = [img_filename]
+        if self.is_seq or self.is_control_anim:
+            scan = scan_image_sequence(img_filename)
+            if not scan or not scan["count"]:
+                return None
+            files = scan["files"]
+        return trim_image_files(files, self.trim_cache_dir)
+
+    def load_sticker_image(self, img_filename, pack = True):
+        """Loads the sticker image, a still image shares its datablock with
+        every image with the same content
+        img_filename -- the path to the image (or first image of the sequence)
+        pack         -- if True the new image is packed in the .blend, never
+                        when the sticker uses the shared image cache
+
+        returns:
+        the image datablock
+        """
+
+        #reusing a single image if one has the same content
+        if not (self.is_seq or self.is_control_anim):
+            return load_image_deduplicated(img_filename, pack, self.image_cache_dir)
+
+        image = bpy.data.images.load(filepath = img_filename)
+        if pack and not self.image_cache_dir:
+            image.pack()
+        return image
+
     def create_anchor_empty_and_parent(self, name="sticker"):
         """Creates an empty which will be used to anchoring the sticker
         name       -- Name of the sticker
@@ -175,12 +530,13 @@ class Sticker(object):
         """      
 
         self.anchor_empty = create_empty(f"{name}_anchor_vertex", self.collection, 'SPHERE')
-        parent_object_to_vertex_in_mesh(self.anchor_empty, self.current_obj, self.anchor_vertex.index)
+        parent_object_to_vertex_in_mesh(self.anchor_empty, self.current_obj, self.anchor_index)
         self.anchor_empty.hide_viewport = True
                 
-    def create_and_parent_base_sticker_node(self, name="sticker"):
+    def create_and_parent_base_sticker_node(self, name="sticker", location=None):
         """Creates an empty which will be used as base node for the sticker
         name       -- Name of the sticker
+        location   -- world location of the anchor, the anchor vertex one if None
 
         returns:
 
@@ -190,11 +546,11 @@ class Sticker(object):
         self.base_node = create_custom_circle(32,0.5, f"{name}_base_node", self.collection) 
 
         # Get location from the selected vertex
-        vector = get_vertex_translate_vector(self.current_obj, self.anchor_vertex.index)
-        print("vertex", self.anchor_vertex.index)
+        if location is None:
+            location = get_vertex_translate_vector(self.current_obj, self.anchor_index)
 
         # Move to vertex location
-        self.base_node.location = self.base_node.location + vector
+        self.base_node.location = self.base_node.location + location
 
         # # Applying location to deltas
         # self.base_node.select_set(True)
@@ -211,9 +567,19 @@ class Sticker(object):
         # parent_object_to_vertex_in_mesh(self.base_node, self.current_obj, self.anchor_vertex.index)
         # self.base_node.parent = self.current_obj
       
+        # Binding to a triangle of the mesh (of the deformed mesh if rigged),
+        # the shrinkwrap is the fallback
+        bound = False
+        if self.use_rigged:
+            bound = bind_sticker_to_surface(self.base_node, self.current_obj, location,
+                                            bpy.context.evaluated_depsgraph_get())
+        elif self.use_surface_binding:
+            bound = bind_sticker_to_surface(self.base_node, self.current_obj, location)
+
         # Constraining
-        create_constraint_to_object(self.base_node, self.current_obj, 'SHRINKWRAP', 'TRACK_Z', f"{name}_geo_shrinkwrap")
-        create_constraint_to_object(self.base_node, self.current_obj, 'TRACK_TO', 'TRACK_Y', f"{name}_geo_track_to")
+        if not bound:
+            create_constraint_to_object(self.base_node, self.current_obj, 'SHRINKWRAP', 'TRACK_Z', f"{name}_geo_shrinkwrap")
+            create_constraint_to_object(self.base_node, self.current_obj, 'TRACK_TO', 'TRACK_Y', f"{name}_geo_track_to")
 
         # Set default custom attributes        
         self.base_node['sticker_name'] = name
@@ -242,6 +608,12 @@ class Sticker(object):
         self.calcnormal_node.parent = self.base_node
         self.calcnormal_node.location = Vector((0.0, 0.0, 1.0))
         self.calcnormal_node.hide_viewport = True        
+
+        if self.use_driver_free:
+            # only translation in the world matrix, so its object coordinates
+            # in the shader are the shading point relative to it
+            create_constraint_to_object(self.calcnormal_node, None, 'LIMIT_ROTATION', '', f"{name}_normal_limit_rot")
+            create_constraint_to_object(self.calcnormal_node, None, 'LIMIT_SCALE', '', f"{name}_normal_limit_scale")
     
     def create_projection_empty_and_parent(self, name="sticker"):
         """Creates an empty which will be used to anchoring the sticker
@@ -12,8 +12,22 @@ import os, imghdr
 import bpy
 import bmesh
 import mathutils
+import numpy as np
 from mathutils import (Vector)
 
+from stickers_blender.common.version1_0_1.sticker_registry import (
+    get_sticker,
+    get_all_stickers,
+)
+
+# == GLOBAL VARIABLES
+
+# display shape shared by all the base nodes
+BASE_NODE_MESH_NAME = "Sticker Base Node Shape"
+
+# custom property of a mesh object pointing to the collection of its sticker helpers
+STICKER_COLLECTION_PROPERTY = "sticker_collection"
+
 # ==== INTERNAL FUNCTIONS (AUX)
 
 def interpolate_range(value, from_min, from_max, to_min, to_max):
@@ -74,6 +88,20 @@ def create_a_plane_mesh_with_uvs(x_segments, y_segments, size):
             
     return bm
 
+
+def _find_layer_collection(layer_collection, collection):
+    """Finds the layer collection of a collection in a view layer tree
+    returns:
+    the layer collection or None if the collection is not in the view layer
+    """
+    if layer_collection.collection == collection:
+        return layer_collection
+    for child in layer_collection.children:
+        found = _find_layer_collection(child, collection)
+        if found is not None:
+            return found
+    return None
+
 # ==== EXTERNAL FUNCTIONS CHEKINGS
 
 def is_valid_image_imghdr(file_name):
@@ -107,19 +135,116 @@ def is_there_file_on_path(file_name):
 
 def check_if_sticker_name_exists(name=""):
     """Check whether the sticker name is already used
-    name -- the name of the sticker. We will check if anchor_vertex exists
+    name -- the name of the sticker. We will check it in the sticker registry
     returns:
     bool      -- True or False
     """
      
-    # finding the objects that may be a sticker
-        
-    for obj in bpy.data.objects:
-        # check if the obj has the sticker_name property
-        if "sticker_name" in obj: 
-            if obj.sticker_name == name:
-                return True
-    return False
+    if get_sticker(name) is not None:
+        return True
+    # a base node out of the registry (from other scene) also takes the name
+    return f"{name}_base_node" in bpy.data.objects
+
+
+def get_unique_sticker_name(name = ""):
+    """Gets a sticker name not used yet, adding a number to the name if needed
+    name -- the wanted name of the sticker
+    returns:
+    name or name_001, name_002...
+    """
+
+    if not check_if_sticker_name_exists(name):
+        return name
+    ndx = 1
+    while check_if_sticker_name_exists(f"{name}_{ndx:03d}"):
+        ndx += 1
+    return f"{name}_{ndx:03d}"
+
+
+# ==== EXTERNAL FUNCTIONS HELPER COLLECTIONS
+
+def get_sticker_collection(obj, create = True):
+    """Gets the collection with the helper objects of the stickers pasted on an
+    object. It is created inside the object collection and excluded from the
+    view layers of the scene: the helpers are still evaluated, the sticker
+    shadernodes and drivers use them, but they cost no outliner nor viewport time
+    obj    -- the mesh object where the stickers are pasted
+    create -- if False None is returned when the object has no collection yet
+    returns:
+    the collection or None
+    """
+
+    coll = obj.get(STICKER_COLLECTION_PROPERTY)
+    if coll is not None or not create:
+        return coll
+
+    coll = bpy.data.collections.new(f"{obj.name}_stickers")
+    obj.users_collection[0].children.link(coll)
+    obj[STICKER_COLLECTION_PROPERTY] = coll
+    for view_layer in bpy.context.scene.view_layers:
+        show_sticker_collection(obj, False, view_layer)
+    return coll
+
+
+def show_sticker_collection(obj, show = True, view_layer = None):
+    """Includes or excludes the sticker helper collection of an object, all the
+    helpers of its stickers are shown or hidden with a single change
+    obj        -- the mesh object where the stickers are pasted
+    show       -- if False the collection is excluded from the view layer
+    view_layer -- the view layer (the current one if None)
+    returns:
+    True if done, False if the object has no collection in the view layer
+    """
+
+    coll = get_sticker_collection(obj, create = False)
+    if coll is None:
+        return False
+    view_layer = view_layer or bpy.context.view_layer
+    layer_coll = _find_layer_collection(view_layer.layer_collection, coll)
+    if layer_coll is None:
+        return False
+    layer_coll.exclude = not show
+    return True
+
+
+def is_sticker_collection_shown(obj, view_layer = None):
+    """Checks if the sticker helper collection of an object is in the view layer
+    obj        -- the mesh object where the stickers are pasted
+    view_layer -- the view layer (the current one if None)
+    returns:
+    True or False
+    """
+
+    coll = get_sticker_collection(obj, create = False)
+    if coll is None:
+        return False
+    layer_coll = _find_layer_collection((view_layer or bpy.context.view_layer).layer_collection, coll)
+    return layer_coll is not None and not layer_coll.exclude
+
+
+def collect_sticker_helpers(scene = None):
+    """Moves the helper objects of the stickers made by older versions into the
+    sticker collection of their object
+    scene -- the scene owning the sticker registry (current scene if None)
+    returns:
+    the number of helper objects moved
+    """
+
+    moved = 0
+    for handles in get_all_stickers(scene).values():
+        main_obj = handles.get("main_obj")
+        if main_obj is None:
+            continue
+        coll = get_sticker_collection(main_obj)
+        for key in ("base_node", "normal_node", "projection_node"):
+            helper = handles.get(key)
+            if helper is None or coll in helper.users_collection:
+                continue
+            for old_coll in list(helper.users_collection):
+                old_coll.objects.unlink(helper)
+            coll.objects.link(helper)
+            moved += 1
+    return moved
 
 
 # ==== EXTERNAL FUNCTIONS GEOMETRY
@@ -148,8 +273,37 @@ def create_a_plane_with_segments(x_segments, y_segments, size, name = "sticker",
     return obj
     #obj.show_name=True
     
+def get_base_node_mesh(segments=32, radius=0.5):
+    """Gets the circle shape shared by the base nodes, it is created once per
+    file with a fake user so removing the stickers never frees it
+    segments -- integer number of segments for the circle
+    radius   -- float number for the radius of the circle
+    returns:
+    me       -- the shared mesh
+    """
+
+    mesh_name = f"{BASE_NODE_MESH_NAME} {segments} {radius}"
+    me = bpy.data.meshes.get(mesh_name)
+    if me is not None and me.library is None:
+        return me
+
+    me = bpy.data.meshes.new(mesh_name)
+    bm = bmesh.new()
+    geom = bmesh.ops.create_circle(bm, 
+                cap_ends=False,
+                radius=radius,
+                segments=segments)
+    for v in geom["verts"]:
+        v.co.z += 0.2
+    bm.to_mesh(me)
+    bm.free()
+    me.use_fake_user = True
+    return me
+
+
 def create_custom_circle(segments=16,radius=1.0, name="sticker", coll = None):
-    """Creates the circle shape for the base node
+    """Creates the circle shape for the base node, all the base nodes share
+    the same mesh (see get_base_node_mesh)
     segments -- integer number of segments for the circle
     radius   -- float number for the radius of the circle
     name     -- the name of the sticker base node
@@ -157,33 +311,35 @@ def create_custom_circle(segments=16,radius=1.0, name="sticker", coll = None):
     obj      -- the cirlce created
     """
 
-    me = bpy.data.meshes.new(f"{name}_mesh")
-    obj = bpy.data.objects.new(name, me)
+    obj = bpy.data.objects.new(name, get_base_node_mesh(segments, radius))
     coll.objects.link(obj)
-    #new bmesh
-    bm = bmesh.new()
-    # load in a mesh
-    bm.from_mesh(me)
-
-    for i in range(1, 10):
-        # create circle
-        geom = bmesh.ops.create_circle(bm, 
-                    cap_ends=False,
-                    radius=radius,
-                    segments=segments)
-
-        verts = geom["verts"]
-        # translate verts
-        for v in verts:
-            v.co.z += 0.2
-            
-    # write back to mesh
-    bm.to_mesh(me)
 
     return obj
-    
-    
-    
+
+
+def share_base_node_meshes(segments=32, radius=0.5, scene = None):
+    """Makes the base nodes of the stickers made with their own circle mesh
+    use the shared one, the old meshes are removed if nothing else uses them
+    segments -- integer number of segments for the circle
+    radius   -- float number for the radius of the circle
+    scene    -- the scene owning the sticker registry (current scene if None)
+    returns:
+    the number of base nodes changed
+    """
+
+    me = get_base_node_mesh(segments, radius)
+    old_meshes = set()
+    changed = 0
+    for handles in get_all_stickers(scene).values():
+        base_node = handles.get("base_node")
+        if base_node is None or base_node.type != 'MESH' or base_node.data == me:
+            continue
+        old_meshes.add(base_node.data)
+        base_node.data = me
+        changed += 1
+    bpy.data.batch_remove([old for old in old_meshes if old.users == 0])
+    return changed
+
 
 def create_empty(name='vertex-parent',coll=None, type='PLAIN_AXES'):
     """Create a empty object to parent with vertex
@@ -245,6 +401,45 @@ def get_vertex_translate_vector(obj, index):
     v_global = obj.matrix_world @ v_local # global vertex coordinates
     return v_global
 
+
+def get_selected_vertices(obj):
+    """Gets the selected vertices of a mesh and their world positions without
+    walking the vertices in python. In edit mode the selection count comes from
+    the edit mesh and the active vertex of the select history is used when it
+    is the only one selected, else the edit mesh is written to the mesh and its
+    select and co attributes are read with foreach_get. In object mode the selection
+    stored in the mesh is used
+    obj        -- the mesh object
+    returns:
+    indices    -- numpy array with the selected vertex indices
+    positions  -- numpy array (N, 3) with their global positions
+    """
+    mesh = obj.data
+    matrix = np.array(obj.matrix_world, dtype = np.float64)
+
+    if obj.mode == 'EDIT':
+        count = mesh.total_vert_sel
+        if count == 0:
+            return np.empty(0, dtype = np.int64), np.empty((0, 3))
+        if count == 1:
+            bm = bmesh.from_edit_mesh(mesh)
+            active = bm.select_history.active
+            if isinstance(active, bmesh.types.BMVert) and active.select:
+                bm.verts.index_update()
+                position = matrix[:3, :3] @ np.array(active.co) + matrix[:3, 3]
+                return np.array([active.index]), position[None, :]
+        obj.update_from_editmode()
+
+    select = np.empty(len(mesh.vertices), dtype = bool)
+    mesh.vertices.foreach_get("select", select)
+    indices = np.flatnonzero(select)
+
+    coords = np.empty(len(mesh.vertices) * 3, dtype = np.float32)
+    mesh.vertices.foreach_get("co", coords)
+    coords = coords.reshape(-1, 3)[indices].astype(np.float64)
+    positions = coords @ matrix[:3, :3].T + matrix[:3, 3]
+    return indices, positions
+
         
 def create_constraint_to_object(obj = None, target_obj = None, kind = 'TRACK_TO', axis = 'TRACK_Y', name = 'default_constraint'):
     """Create a empty object to parent with vertex
@@ -273,6 +468,18 @@ def create_constraint_to_object(obj = None, target_obj = None, kind = 'TRACK_TO'
         #constraint.target_space='LOCAL'
         constraint.track_axis = axis
         constraint.up_axis = 'UP_Y'
+    elif kind == 'LIMIT_ROTATION':
+        # no world rotation at all
+        constraint.owner_space = 'WORLD'
+        constraint.use_limit_x = constraint.use_limit_y = constraint.use_limit_z = True
+    elif kind == 'LIMIT_SCALE':
+        # world scale 1.0 in every axis
+        constraint.owner_space = 'WORLD'
+        for axis_name in "xyz":
+            setattr(constraint, f"use_min_{axis_name}", True)
+            setattr(constraint, f"use_max_{axis_name}", True)
+            setattr(constraint, f"min_{axis_name}", 1.0)
+            setattr(constraint, f"max_{axis_name}", 1.0)
     else: # 'COPY_LOCATION'
         pass
             
@@ -0,0 +1,227 @@
+"""
+[Blender and Python] Sticker registry for Stickers Antaruxa
+Juan R Nouche - January 2025
+Email: juan.nouche@antaruxa.com
+A scene stored registry that maps every sticker name to its objects
+and material, so the operators don't need to scan bpy.data.objects
+Antaruxa Stickers - Blender python sticker registry
+Copyright (c) 2025 Antaruxa
+--------
+"""
+
+
+from fnmatch import fnmatchcase
+
+import bpy
+from bpy.app.handlers import persistent
+from bpy.props import PointerProperty
+
+
+class StickerRegistryEntry(bpy.types.PropertyGroup):
+    """One sticker in the scene registry, the entry name is the sticker name
+    """
+
+    base_node: PointerProperty(type = bpy.types.Object)
+    normal_node: PointerProperty(type = bpy.types.Object)
+    projection_node: PointerProperty(type = bpy.types.Object)
+    main_obj: PointerProperty(type = bpy.types.Object)
+    material: PointerProperty(type = bpy.types.Material)
+
+
+# == GLOBAL VARIABLES
+
+# python side indices {scene session_uid: {sticker_name: handles}}, a scene
+# missing must be rebuilt. They are dropped after undo, redo and file load
+# since the handles get invalid
+_indices = {}
+
+
+# ==== INTERNAL FUNCTIONS (AUX)
+
+def _handles_from_entry(entry):
+    """Converts a registry entry into a plain dict of handles
+    entry -- StickerRegistryEntry
+    returns:
+    dict with the sticker objects and material
+    """
+    return {
+        "name": entry.name,
+        "base_node": entry.base_node,
+        "normal_node": entry.normal_node,
+        "projection_node": entry.projection_node,
+        "main_obj": entry.main_obj,
+        "material": entry.material,
+    }
+
+
+def _scan_stickers_in_scene(scene):
+    """Fills the registry with the stickers created before the registry existed.
+    It is the only place where the scene objects are scanned and it runs once per scene
+    scene -- the scene owning the registry
+    """
+    registry = scene.sticker_registry
+    objs = scene.objects
+    for obj in objs:
+        if "sticker_name" not in obj:
+            continue
+        name = obj["sticker_name"]
+        if obj.name != f"{name}_base_node" or name in registry:
+            continue
+        main_obj = obj.parent
+        entry = registry.add()
+        entry.name = name
+        entry.base_node = obj
+        entry.normal_node = objs.get(f"{name}_normal_node")
+        entry.projection_node = objs.get(f"{name}_projection_node")
+        entry.main_obj = main_obj
+        entry.material = main_obj.active_material if main_obj else None
+
+
+def rebuild_sticker_registry(scene = None):
+    """Rebuilds the python index from the scene registry removing the
+    entries whose base node doesn't exist anymore or is not in the scene
+    scene -- the scene owning the registry (current scene if None)
+    returns:
+    the new index
+    """
+    scene = scene or bpy.context.scene
+    registry = scene.sticker_registry
+
+    if not scene.get("sticker_registry_scanned"):
+        _scan_stickers_in_scene(scene)
+        scene["sticker_registry_scanned"] = True
+
+    # removing backwards to keep the indices valid
+    objs = scene.objects
+    for ndx in reversed(range(len(registry))):
+        base_node = registry[ndx].base_node
+        if base_node is None or objs.get(base_node.name) != base_node:
+            registry.remove(ndx)
+
+    index = {entry.name: _handles_from_entry(entry) for entry in registry}
+    _indices[scene.session_uid] = index
+    return index
+
+
+def _get_index(scene = None):
+    """Gets the python index of a scene, rebuilding it if needed
+    """
+    scene = scene or bpy.context.scene
+    index = _indices.get(scene.session_uid)
+    if index is None:
+        return rebuild_sticker_registry(scene)
+    return index
+
+
+def mark_sticker_registry_dirty():
+    """Forces the indices of all the scenes to be rebuilt on the next lookup
+    """
+    _indices.clear()
+
+
+# ==== EXTERNAL FUNCTIONS
+
+def register_sticker(name, base_node, normal_node, projection_node, main_obj, material, scene = None):
+    """Adds a new sticker to the registry
+    name            -- the name of the sticker
+    base_node       -- the base node object
+    normal_node     -- the normal node object
+    projection_node -- the projection node object
+    main_obj        -- the object where the sticker is pasted
+    material        -- the material where the sticker nodes are
+    scene           -- the scene owning the registry (current scene if None)
+    """
+    scene = scene or bpy.context.scene
+    index = _get_index(scene)
+
+    entry = scene.sticker_registry.add()
+    entry.name = name
+    entry.base_node = base_node
+    entry.normal_node = normal_node
+    entry.projection_node = projection_node
+    entry.main_obj = main_obj
+    entry.material = material
+
+    index[name] = _handles_from_entry(entry)
+
+
+def unregister_sticker(name, scene = None):
+    """Removes a sticker from the registry
+    name  -- the name of the sticker
+    scene -- the scene owning the registry (current scene if None)
+    """
+    scene = scene or bpy.context.scene
+    index = _get_index(scene)
+    index.pop(name, None)
+
+    registry = scene.sticker_registry
+    ndx = registry.find(name)
+    if ndx >= 0:
+        registry.remove(ndx)
+
+
+def get_sticker(name, scene = None):
+    """Resolves a sticker by name in constant time
+    name  -- the name of the sticker
+    scene -- the scene owning the registry (current scene if None)
+    returns:
+    dict with name, base_node, normal_node, projection_node, main_obj and
+    material or None if there is no sticker with this name
+    """
+    handles = _get_index(scene).get(name)
+    if handles is None:
+        return None
+    try:
+        handles["base_node"].name
+    except (ReferenceError, AttributeError):
+        # the base node was deleted outside the add-on
+        handles = rebuild_sticker_registry(scene).get(name)
+    return handles
+
+
+def get_all_stickers(scene = None):
+    """Gets all the stickers in the registry
+    scene -- the scene owning the registry (current scene if None)
+    returns:
+    dict {sticker_name: handles}
+    """
+    return _get_index(scene)
+
+
+def find_stickers(pattern, scene = None):
+    """Gets the names of the stickers matching a pattern
+    pattern -- names or shell wildcards separated by commas ("tree_*, leaf_0?")
+    scene   -- the scene owning the registry (current scene if None)
+    returns:
+    list of sticker names in the registry order
+    """
+    patterns = [item.strip() for item in pattern.split(",") if item.strip()]
+    return [name for name in _get_index(scene)
+            if any(fnmatchcase(name, item) for item in patterns)]
+
+
+# ==== HANDLERS
+
+@persistent
+def _sticker_registry_invalidate(*args):
+    mark_sticker_registry_dirty()
+
+
+_handlers = (
+    bpy.app.handlers.load_post,
+    bpy.app.handlers.undo_post,
+    bpy.app.handlers.redo_post,
+)
+
+
+def register():
+    for handler in _handlers:
+        if _sticker_registry_invalidate not in handler:
+            handler.append(_sticker_registry_invalidate)
+
+
+def unregister():
+    for handler in _handlers:
+        if _sticker_registry_invalidate in handler:
+            handler.remove(_sticker_registry_invalidate)
+    mark_sticker_registry_dirty()
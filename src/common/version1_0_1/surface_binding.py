@@ -0,0 +1,453 @@
+"""
+[Blender and Python] Surface binding library for Stickers Antaruxa
+Juan R Nouche - January 2025
+Email: juan.nouche@antaruxa.com
+A Blender python functions library to bind the sticker base nodes to a
+triangle of the mesh with barycentric weights, instead of projecting them
+with a shrinkwrap constraint every frame. Rigged stickers are bound to the
+evaluated (deformed) mesh and their transforms can be baked to disk
+Antaruxa Stickers - Blender python surface binding library
+Copyright (c) 2025 Antaruxa
+--------
+"""
+
+
+import os
+
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+from mathutils import (Matrix, Vector)
+from mathutils.bvhtree import BVHTree
+from mathutils.interpolate import poly_3d_calc
+
+from stickers_blender.common.version1_0_1.sticker_registry import get_all_stickers
+
+
+# == GLOBAL VARIABLES
+
+# base node custom properties with the binding
+BIND_VERTS = "bind_verts"
+BIND_WEIGHTS = "bind_weights"
+# 'ORIGINAL' (vertices of the mesh) or 'EVALUATED' (vertices of the mesh
+# with its modifiers, rigged stickers), with the vertex count at bind time
+BIND_SPACE = "bind_space"
+BIND_VERTEX_COUNT = "bind_vertex_count"
+
+# scene custom property with the folder of the baked transforms
+CACHE_PROPERTY = "sticker_binding_cache"
+CACHE_PREFIX = "sticker_binding_"
+
+# {(main_obj_name, space): {"obj", "base_nodes", "verts", "weights", "frames",
+# "vertex_count", "stale"}}, None means it must be rebuilt from the registry.
+# A binding is stale while the evaluated mesh hasn't the vertices it was bound to
+_bindings = None
+
+# True while a render job runs, the bindings written are evaluated at once
+_rendering = False
+
+# frame whose transforms were read from the cache
+_cached_frame = None
+
+# frames closer than this are not written again
+FRAME_TOLERANCE = 1e-6
+
+
+# ==== INTERNAL FUNCTIONS (AUX)
+
+def _get_mesh_coords(mesh):
+    coords = np.empty(len(mesh.vertices) * 3, dtype = np.float32)
+    mesh.vertices.foreach_get("co", coords)
+    return coords.reshape(-1, 3)
+
+
+def _get_mesh_normals(mesh):
+    normals = np.empty(len(mesh.vertices) * 3, dtype = np.float32)
+    mesh.vertex_normals.foreach_get("vector", normals)
+    return normals.reshape(-1, 3)
+
+
+def _get_mesh_triangles(mesh):
+    mesh.calc_loop_triangles()
+    tris = np.empty(len(mesh.loop_triangles) * 3, dtype = np.int32)
+    mesh.loop_triangles.foreach_get("vertices", tris)
+    return tris.reshape(-1, 3)
+
+
+def _build_bindings():
+    """Groups the bound stickers of the registry by the object they are on
+    returns:
+    the new bindings dict
+    """
+    global _bindings
+
+    _bindings = {}
+    for handles in get_all_stickers().values():
+        base_node, main_obj = handles["base_node"], handles["main_obj"]
+        if base_node is None or main_obj is None or BIND_VERTS not in base_node:
+            continue
+        space = base_node.get(BIND_SPACE, 'ORIGINAL')
+        binding = _bindings.setdefault((main_obj.name, space), {"obj": main_obj, "base_nodes": [],
+                                                                "verts": [], "weights": [],
+                                                                "vertex_count": base_node.get(BIND_VERTEX_COUNT)})
+        binding["base_nodes"].append(base_node)
+        binding["verts"].append(list(base_node[BIND_VERTS]))
+        binding["weights"].append(list(base_node[BIND_WEIGHTS]))
+
+    for binding in _bindings.values():
+        binding["verts"] = np.array(binding["verts"], dtype = np.int32)
+        binding["weights"] = np.array(binding["weights"], dtype = np.float32)
+        binding["frames"] = None
+        binding["stale"] = False
+    return _bindings
+
+
+def _get_bindings():
+    if _bindings is None:
+        return _build_bindings()
+    return _bindings
+
+
+def _update_binding(binding, mesh):
+    """Writes the surface frame of every base node whose frame changed
+    binding -- one entry of the bindings dict
+    mesh    -- the mesh with the current vertex positions, it must have the
+               vertex indices of the original mesh
+    returns:
+    the number of base nodes written
+    """
+    frames = compute_surface_frames(_get_mesh_coords(mesh), _get_mesh_normals(mesh),
+                                    binding["verts"], binding["weights"],
+                                    binding["obj"].matrix_world.to_scale())
+    previous = binding["frames"]
+    if previous is None:
+        changed = range(len(frames))
+    else:
+        changed = np.nonzero(np.abs(frames - previous).max(axis = (1, 2)) > FRAME_TOLERANCE)[0]
+
+    for ndx in changed:
+        binding["base_nodes"][ndx].matrix_parent_inverse = Matrix(frames[ndx].tolist())
+    binding["frames"] = frames
+    binding["stale"] = False
+    return len(changed)
+
+
+# ==== EXTERNAL FUNCTIONS
+
+def compute_surface_frames(coords, normals, verts, weights, scale = (1.0, 1.0, 1.0)):
+    """Computes the transform of many stickers from their binding in a single
+    vectorized pass. The Z axis follows the interpolated normal and the X axis
+    the first edge of the triangle, so the sticker turns with the surface. The
+    frame undoes the object scale, the base node keeps its own size
+    coords  -- (V, 3) vertex positions in object space
+    normals -- (V, 3) vertex normals in object space
+    verts   -- (N, 3) vertex indices of every sticker triangle
+    weights -- (N, 3) barycentric weights of every sticker
+    scale   -- the object world scale
+    returns:
+    (N, 4, 4) array with the matrices in object space
+    """
+    scale = np.asarray(scale, dtype = np.float32)
+    points = np.einsum("ni,nij->nj", weights, coords[verts])
+
+    # the axes are built in the scaled object space, where the angles are the
+    # world ones: the normals scale by the inverse, the edges by the scale
+    z_axis = np.einsum("ni,nij->nj", weights, normals[verts]) / scale
+    length = np.linalg.norm(z_axis, axis = 1)
+    z_axis[length == 0.0] = (0.0, 0.0, 1.0)
+    z_axis /= np.maximum(length, 1e-12)[:, None]
+
+    # the triangle edge projected on the tangent plane
+    edge = (coords[verts[:, 1]] - coords[verts[:, 0]]) * scale
+    x_axis = edge - np.einsum("ni,ni->n", edge, z_axis)[:, None] * z_axis
+    length = np.linalg.norm(x_axis, axis = 1)
+
+    # degenerate triangles: the X axis of the rotation from +Z to the normal
+    # (Rodrigues), 180 degrees around X if opposite
+    x, y, z = z_axis.T
+    flipped = z < -0.999999
+    k = np.where(flipped, 0.0, 1.0 / np.where(flipped, 1.0, 1.0 + z))
+    minimal = np.stack((1.0 - x * x * k, -x * y * k, -x), axis = 1)
+    minimal[flipped] = (1.0, 0.0, 0.0)
+    degenerate = length < 1e-12
+    x_axis[degenerate] = minimal[degenerate]
+    x_axis /= np.maximum(np.linalg.norm(x_axis, axis = 1), 1e-12)[:, None]
+    y_axis = np.cross(z_axis, x_axis)
+
+    frames = np.zeros((len(points), 4, 4), dtype = np.float32)
+    frames[:, :3, 0] = x_axis
+    frames[:, :3, 1] = y_axis
+    frames[:, :3, 2] = z_axis
+    # the parent world matrix scales the rows back
+    frames[:, :3, :3] /= scale[:, None]
+    frames[:, :3, 3] = points
+    frames[:, 3, 3] = 1.0
+    return frames
+
+
+def bind_sticker_to_surface(base_node, obj, location, depsgraph = None):
+    """Binds a base node to the nearest triangle of the object mesh. The base
+    node must be parented to obj, its location is reset and its surface
+    frame is kept in matrix_parent_inverse
+    base_node -- the sticker base node
+    obj       -- the mesh object where the sticker is pasted
+    location  -- world location of the anchor
+    depsgraph -- if given the sticker is bound to the evaluated mesh loop
+                 triangles (rigged sticker), obj must be in object mode
+    returns:
+    True if the base node is bound, False if the mesh has no faces
+    """
+    if depsgraph is None:
+        mesh = obj.data
+        base_node[BIND_SPACE] = 'ORIGINAL'
+    else:
+        mesh = obj.evaluated_get(depsgraph).data
+        base_node[BIND_SPACE] = 'EVALUATED'
+    base_node[BIND_VERTEX_COUNT] = len(mesh.vertices)
+    coords = _get_mesh_coords(mesh)
+    tris = _get_mesh_triangles(mesh)
+    if not len(tris):
+        return False
+
+    bvh = BVHTree.FromPolygons(coords.tolist(), tris.tolist(), all_triangles = True)
+    nearest, normal, ndx, distance = bvh.find_nearest(obj.matrix_world.inverted() @ location)
+    if nearest is None:
+        return False
+
+    tri = tris[ndx]
+    weights = poly_3d_calc([Vector(coords[vert]) for vert in tri], nearest)
+    base_node[BIND_VERTS] = [int(vert) for vert in tri]
+    base_node[BIND_WEIGHTS] = [float(weight) for weight in weights]
+    base_node.location = (0.0, 0.0, 0.0)
+
+    frame = compute_surface_frames(coords, _get_mesh_normals(mesh),
+                                   np.array([tri]), np.array([weights], dtype = np.float32),
+                                   obj.matrix_world.to_scale())[0]
+    base_node.matrix_parent_inverse = Matrix(frame.tolist())
+
+    mark_surface_bindings_dirty()
+    return True
+
+
+def update_surface_bindings(depsgraph = None, objs = None):
+    """Rebuilds the transform of all the bound stickers, one vectorized pass
+    per mesh, reading each evaluated mesh once. The stickers bound to the
+    original mesh use the evaluated one when it keeps its vertices (shape keys,
+    armature...), the rigged ones need the same vertices they were bound to
+    depsgraph -- the evaluated depsgraph (the current one if None)
+    objs      -- only update the stickers on these objects (all if None)
+    returns:
+    the number of base nodes written
+    """
+    depsgraph = depsgraph or bpy.context.evaluated_depsgraph_get()
+    names = None if objs is None else {obj.name for obj in objs}
+    written = 0
+
+    for (name, space), binding in list(_get_bindings().items()):
+        if names is not None and name not in names:
+            continue
+        try:
+            obj = binding["obj"]
+            if obj.mode == 'EDIT':
+                continue
+            mesh = obj.evaluated_get(depsgraph).data
+            if len(mesh.vertices) != binding["vertex_count"]:
+                if space == 'EVALUATED':
+                    # the modifiers changed the topology, the binding is stale
+                    # and its last frames must not be used (see bake)
+                    if not binding["stale"]:
+                        print(f"Sticker bindings on {name} are stale: the mesh has "
+                              f"{len(mesh.vertices)} vertices, {binding['vertex_count']} when bound")
+                    binding["frames"] = None
+                    binding["stale"] = True
+                    continue
+                mesh = obj.data
+            written += _update_binding(binding, mesh)
+        except ReferenceError:
+            # a sticker or its object was deleted, next call rebuilds, the
+            # other meshes are updated anyway
+            mark_surface_bindings_dirty()
+            continue
+    return written
+
+
+def bake_surface_bindings(scene, directory, frame_start, frame_end):
+    """Bakes the transforms of all the bound stickers to a file per frame, the
+    scene reads them back instead of evaluating the meshes (render farms)
+    scene       -- the scene to bake
+    directory   -- the folder for the .npz files
+    frame_start -- first frame to bake
+    frame_end   -- last frame to bake
+    returns:
+    (number of frames baked, [(frame, object name), ...] of the stale
+    bindings, not written in those frames)
+    """
+    directory = bpy.path.abspath(directory)
+    os.makedirs(directory, exist_ok = True)
+    clear_surface_binding_cache(scene)
+
+    stale = []
+    frame_current = scene.frame_current
+    for frame in range(frame_start, frame_end + 1):
+        # the frame change handler updates the bindings
+        scene.frame_set(frame)
+        names, frames = [], []
+        for (name, space), binding in _get_bindings().items():
+            if binding["stale"]:
+                stale.append((frame, name))
+            if binding["frames"] is None:
+                continue
+            names += [base_node.name for base_node in binding["base_nodes"]]
+            frames.append(binding["frames"])
+        if not frames:
+            frames = [np.zeros((0, 4, 4), dtype = np.float32)]
+        np.savez(os.path.join(directory, f"{CACHE_PREFIX}{frame:06d}.npz"),
+                 names = np.array(names, dtype = str), frames = np.concatenate(frames))
+    scene.frame_set(frame_current)
+
+    scene[CACHE_PROPERTY] = bpy.path.relpath(directory) if bpy.data.filepath else directory
+    return frame_end - frame_start + 1, stale
+
+
+def clear_surface_binding_cache(scene):
+    """Stops reading the baked transforms, the files are not removed
+    scene -- the scene with the cache
+    """
+    global _cached_frame
+    if CACHE_PROPERTY in scene:
+        del scene[CACHE_PROPERTY]
+    _cached_frame = None
+
+
+def load_cached_surface_frames(scene, frame):
+    """Sets the base node transforms baked for a frame
+    scene -- the scene with the cache
+    frame -- the frame to read
+    returns:
+    True if the frame was in the cache
+    """
+    global _cached_frame
+
+    directory = scene.get(CACHE_PROPERTY)
+    if not directory:
+        return False
+    path = os.path.join(bpy.path.abspath(directory), f"{CACHE_PREFIX}{frame:06d}.npz")
+    if not os.path.isfile(path):
+        return False
+
+    objs = bpy.data.objects
+    with np.load(path) as cache:
+        for name, matrix in zip(cache["names"], cache["frames"]):
+            base_node = objs.get(str(name))
+            if base_node is not None:
+                base_node.matrix_parent_inverse = Matrix(matrix.tolist())
+    _cached_frame = frame
+    return True
+
+
+def mark_surface_bindings_dirty():
+    """Forces the bindings to be read again from the stickers
+    """
+    global _bindings
+    _bindings = None
+
+
+# ==== HANDLERS
+
+@persistent
+def _surface_bindings_frame_change_pre(scene, depsgraph = None):
+    # the baked transforms are set before the evaluation, so it happens once
+    global _cached_frame
+    _cached_frame = None
+    if scene.get(CACHE_PROPERTY):
+        load_cached_surface_frames(scene, scene.frame_current)
+
+
+@persistent
+def _surface_bindings_frame_change(scene, depsgraph = None):
+    if _cached_frame == scene.frame_current:
+        return
+    if get_all_stickers(scene):
+        written = update_surface_bindings(depsgraph)
+        # a render syncs the depsgraph evaluated for the frame, the base nodes
+        # written are evaluated before it, or they would lag one frame
+        if written and _rendering and depsgraph is not None:
+            depsgraph.update()
+
+
+@persistent
+def _surface_bindings_render_init(*args):
+    global _rendering
+    _rendering = True
+
+
+@persistent
+def _surface_bindings_render_end(*args):
+    global _rendering
+    _rendering = False
+
+
+@persistent
+def _surface_bindings_depsgraph_update(scene, depsgraph):
+    # only the meshes whose geometry changed, the base nodes updated by us
+    # are transform updates and don't come back here
+    if _cached_frame == scene.frame_current:
+        return
+    bindings = _get_bindings()
+    if not bindings:
+        return
+    names = {name for name, space in bindings}
+    objs = [update.id.original for update in depsgraph.updates
+            if update.is_updated_geometry and isinstance(update.id, bpy.types.Object)
+            and update.id.name in names]
+    if objs:
+        update_surface_bindings(depsgraph, objs)
+
+
+@persistent
+def _surface_bindings_invalidate(*args):
+    mark_surface_bindings_dirty()
+
+
+_invalidate_handlers = (
+    bpy.app.handlers.load_post,
+    bpy.app.handlers.undo_post,
+    bpy.app.handlers.redo_post,
+)
+
+_render_handlers = (
+    (bpy.app.handlers.render_init, _surface_bindings_render_init),
+    (bpy.app.handlers.render_complete, _surface_bindings_render_end),
+    (bpy.app.handlers.render_cancel, _surface_bindings_render_end),
+)
+
+
+def register():
+    for handler in _invalidate_handlers:
+        if _surface_bindings_invalidate not in handler:
+            handler.append(_surface_bindings_invalidate)
+    if _surface_bindings_frame_change_pre not in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.append(_surface_bindings_frame_change_pre)
+    if _surface_bindings_frame_change not in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.append(_surface_bindings_frame_change)
+    if _surface_bindings_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_surface_bindings_depsgraph_update)
+    for handler, function in _render_handlers:
+        if function not in handler:
+            handler.append(function)
+
+
+def unregister():
+    for handler in _invalidate_handlers:
+        if _surface_bindings_invalidate in handler:
+            handler.remove(_surface_bindings_invalidate)
+    if _surface_bindings_frame_change_pre in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.remove(_surface_bindings_frame_change_pre)
+    if _surface_bindings_frame_change in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.remove(_surface_bindings_frame_change)
+    if _surface_bindings_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_surface_bindings_depsgraph_update)
+    for handler, function in _render_handlers:
+        if function in handler:
+            handler.remove(function)
+    mark_surface_bindings_dirty()